@@ -1,8 +1,21 @@
 # core/admin.py
 
 from django.contrib import admin
-from .models import Client, Invoice, Expense
+from .models import Client, Invoice, Expense, Job, VendorRule
 
 admin.site.register(Client)
 admin.site.register(Invoice)
-admin.site.register(Expense)
\ No newline at end of file
+admin.site.register(Expense)
+
+
+@admin.register(VendorRule)
+class VendorRuleAdmin(admin.ModelAdmin):
+    list_display = ['keyword', 'vendor', 'category', 'priority']
+    list_editable = ['priority']
+    search_fields = ['keyword', 'vendor', 'category']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'progress', 'created_at', 'finished_at']
+    list_filter = ['status', 'task']
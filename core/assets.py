@@ -0,0 +1,212 @@
+# core/assets.py
+
+import gzip
+import hashlib
+import json
+import mimetypes
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import HttpResponse
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional, without it only gzip copies are written
+    brotli = None
+
+FRONTEND_DIR = Path(__file__).resolve().parent / 'frontend'
+STATIC_DIR = Path(__file__).resolve().parent / 'static'
+
+# Tailwind sources, built into one purged and minified stylesheet by build_assets
+TAILWIND_CONFIG = FRONTEND_DIR / 'tailwind.config.js'
+TAILWIND_INPUT = FRONTEND_DIR / 'app.css'
+TAILWIND_OUTPUT = STATIC_DIR / 'core' / 'css' / 'app.css'
+
+# third party scripts, downloaded once by build_assets and committed, so deployments never fetch them
+VENDOR = {
+    'core/vendor/chart.umd.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.js',
+}
+
+STYLESHEET = 'core/css/app.css'
+TAILWIND_PLAY_CDN = 'https://cdn.tailwindcss.com'
+
+
+def stylesheet_built():
+    # app.css is only there once build_assets has run, in core/static or collected to STATIC_ROOT
+    return bool(finders.find(STYLESHEET)) or staticfiles_storage.exists(STYLESHEET)
+
+
+def tailwind_source():
+    # the stylesheet's Tailwind input, compiled in the browser by the Play CDN until app.css is built
+    return TAILWIND_INPUT.read_text()
+
+
+COMPRESSIBLE = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml'}
+MIN_COMPRESS_SIZE = 512  # bytes, smaller files gain less than the extra header costs
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]  # in order of preference
+
+FOREVER = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+
+
+def compress(path):
+    """
+    Writes .gz (and with brotli installed .br) copies next to a collected text file, when they are smaller.
+    """
+    path = Path(path)
+    if path.suffix not in COMPRESSIBLE or path.stat().st_size < MIN_COMPRESS_SIZE:
+        return []
+    data = path.read_bytes()
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data) * 0.95:
+            target = path.with_name(path.name + suffix)
+            target.write_bytes(compressed)
+            written.append(target)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic writes content hashed copies (app.3f2a9c81d0e4.css) plus precompressed .gz/.br copies
+    of them. Templates get the hashed URLs through {% static %}.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        # only after every pass, CSS files are rewritten until their url()s point at hashed names
+        for hashed_name in hashed:
+            compress(self.path(hashed_name))
+
+    def url_converter(self, name, hashed_files, template=None):
+        convert = super().url_converter(name, hashed_files, template)
+
+        def converter(matchobj):
+            try:
+                return convert(matchobj)
+            except ValueError:
+                # a url() to a file that isn't collected is left as written
+                return matchobj.group(0)
+
+        return converter
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # not collected (the test suite, a checkout without collectstatic): the plain URL still works
+            return name
+
+
+class Asset:
+    def __init__(self, path, immutable):
+        self.content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        self.bodies = {None: path.read_bytes()}
+        for encoding, suffix in ENCODINGS:
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file():
+                self.bodies[encoding] = variant.read_bytes()
+        self.etag = f'"{hashlib.sha1(self.bodies[None]).hexdigest()[:20]}"'
+        self.cache_control = FOREVER if immutable else REVALIDATE
+
+    def body(self, accept_encoding):
+        """
+        (content encoding, bytes) of the best copy the client accepts.
+        """
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in self.bodies and encoding in accepted:
+                return encoding, self.bodies[encoding]
+        return None, self.bodies[None]
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        encoding, *params = [param.strip() for param in part.split(';')]
+        quality = next((param[2:] for param in params if param.startswith('q=')), '1')
+        try:
+            if float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding.lower())
+    return accepted
+
+
+class StaticAssetsMiddleware:
+    """
+    Serves what collectstatic wrote to STATIC_ROOT: hashed names with a one year immutable Cache-Control,
+    everything else revalidated, and the .br or .gz copy when the browser accepts it.
+    Files are read once and kept in memory. Only active once STATIC_ROOT has a manifest,
+    in development runserver keeps serving static files from the apps.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        root = getattr(settings, 'STATIC_ROOT', None)
+        manifest = Path(root or '') / ManifestStaticFilesStorage.manifest_name
+        if not root or not manifest.is_file():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.root = str(root)
+        self.prefix = settings.STATIC_URL
+        self.hashed = set(json.loads(manifest.read_text())['paths'].values())
+        self.assets = {}  # name -> Asset, the collected files are a fixed set
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    def asset(self, name):
+        if name not in self.assets:
+            try:
+                path = Path(safe_join(self.root, name))
+            except SuspiciousFileOperation:  # outside STATIC_ROOT
+                return None
+            if not path.is_file():
+                return None
+            self.assets[name] = Asset(path, immutable=name in self.hashed)
+        return self.assets[name]
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return None
+        asset = self.asset(request.path[len(self.prefix):])
+        if asset is None:
+            return None
+
+        if asset.etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+        else:
+            encoding, body = asset.body(request.headers.get('Accept-Encoding', ''))
+            response = HttpResponse(body if request.method == 'GET' else b'', content_type=asset.content_type)
+            response['Content-Length'] = len(body)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = asset.etag
+        response['Cache-Control'] = asset.cache_control
+        response['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,48 @@
+# core/conditional.py
+
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import fragments
+
+# kind -> when one row last changed, matching what its fragment shows
+MODIFIED = {
+    'invoice': lambda invoice: max(invoice.updated_at, invoice.client.updated_at),
+    'expense': lambda expense: expense.updated_at,
+}
+
+
+def row_validators(kind, objects, *extra):
+    """
+    (etag, last_modified) for a response made of `kind` rows: a hash of the row template, every row's
+    id and version and `extra` (query parameters, the next cursor), and the newest row change.
+    Hashing the ids notices rows leaving or entering the list, which a max(updated_at)/count pair can miss.
+    """
+    _, template_digest = fragments.row_template(kind)
+    version = fragments.ROWS[kind][1]
+    digest = hashlib.sha1(template_digest.encode())
+    for part in extra:
+        digest.update(f'\0{part}'.encode())
+    for obj in objects:
+        digest.update(f'\0{obj.pk}:{version(obj)}'.encode())
+    modified = [MODIFIED[kind](obj) for obj in objects]
+    last_modified = int(max(modified).timestamp()) if modified else None
+    return f'"{kind}-{digest.hexdigest()[:20]}"', last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """
+    A 304 (or 412) response when the request's validators still match, else None.
+    """
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def add_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # revalidated on every use, the browser then answers HTMX from its cache on a 304
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,12 @@
+# core/context_processors.py
+
+from core import assets
+
+
+def frontend(request):
+    # callables, so only templates that use them look at the disk
+    return {
+        'stylesheet_built': assets.stylesheet_built,
+        'tailwind_source': assets.tailwind_source,
+        'tailwind_play_cdn': assets.TAILWIND_PLAY_CDN,
+    }
@@ -0,0 +1,130 @@
+# core/exports.py
+
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Expense, Invoice
+
+# (column name, ORM lookup) per export
+INVOICE_COLUMNS = [
+    ('invoice_number', 'invoice_number'),
+    ('title', 'title'),
+    ('status', 'status'),
+    ('amount', 'amount'),
+    ('due_date', 'due_date'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('client_name', 'client__name'),
+    ('client_email', 'client__email'),
+    ('client_phone', 'client__phone'),
+    ('client_address', 'client__address'),
+]
+
+EXPENSE_COLUMNS = [
+    ('title', 'title'),
+    ('amount', 'amount'),
+    ('expense_date', 'expense_date'),
+    ('category', 'category'),
+    ('created_at', 'created_at'),
+    ('is_duplicate', 'is_duplicate'),
+]
+
+CHUNK_SIZE = 2000  # rows fetched from the database cursor at a time
+ROWS_PER_WRITE = 500  # rows encoded into each chunk of the response
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def invoice_rows(start=None, end=None, status=None):
+    invoices = Invoice.objects.order_by('pk')
+    if start:
+        invoices = invoices.filter(created_at__date__gte=start)
+    if end:
+        invoices = invoices.filter(created_at__date__lte=end)
+    if status:
+        invoices = invoices.filter(status=status)
+    # values_list + iterator: plain tuples straight off the cursor, no model instances and no result cache
+    return invoices.values_list(*[lookup for _, lookup in INVOICE_COLUMNS]).iterator(chunk_size=CHUNK_SIZE)
+
+
+def expense_rows(start=None, end=None, category=None):
+    expenses = Expense.objects.order_by('pk')
+    if start:
+        expenses = expenses.filter(expense_date__gte=start)
+    if end:
+        expenses = expenses.filter(expense_date__lte=end)
+    if category:
+        expenses = expenses.filter(category__iexact=category)
+    return expenses.values_list(*[lookup for _, lookup in EXPENSE_COLUMNS]).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Echo:
+    # csv.writer target that hands back what was written instead of storing it
+    def write(self, value):
+        return value
+
+
+def csv_stream(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in columns])
+    chunk = []
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= ROWS_PER_WRITE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def ndjson_stream(columns, rows):
+    names = [name for name, _ in columns]
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n')
+        if len(chunk) >= ROWS_PER_WRITE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream(export_format, columns, rows):
+    if export_format == 'ndjson':
+        return ndjson_stream(columns, rows)
+    return csv_stream(columns, rows)
+
+
+# serving a chunk generator under ASGI
+
+_DONE = object()
+
+
+async def aiterate(chunks):
+    """
+    Async iterator over a sync chunk generator. Each chunk is made with sync_to_async on the thread
+    that runs sync code, so the database cursor stays on its connection and one chunk is in memory at a time.
+    """
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            await sync_to_async(chunks.close)()
+
+
+def for_request(request, chunks):
+    """
+    Streaming content for `request`. Given a sync iterator, the ASGI handler would collect it whole
+    into a list before sending, so ASGI requests get it wrapped in aiterate().
+    """
+    return aiterate(chunks) if isinstance(request, ASGIRequest) else chunks
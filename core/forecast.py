@@ -0,0 +1,152 @@
+# core/forecast.py
+#
+# Cash-flow forecast: SENT invoices are expected on their due date (overdue ones today), recurring
+# expenses are estimated per category from the last months and spread over the days of each month,
+# and the tax pool accrues TAX_RATE of everything collected. The projection runs on NumPy arrays,
+# one element per day of the horizon, so years of it take a few milliseconds.
+
+from datetime import date
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Expense, Invoice, InvoiceMonthlyRollup
+from .rollups import TAX_RATE
+
+FORECAST_MONTHS = 24
+LOOKBACK_MONTHS = 12  # months of expense history the recurring estimates come from
+RECURRING_SHARE = 0.5  # a category is recurring when it had expenses in at least this share of those months
+UNCATEGORIZED = 'Uncategorized'
+
+
+def day_offsets(dates, start):
+    # days from `start`, dates as datetime64[D]
+    return (dates - np.datetime64(start, 'D')).astype(np.int64)
+
+
+def horizon(start, months):
+    """
+    The days of the forecast: from `start` to the end of the month `months` months later.
+    """
+    end = (start.replace(day=1) + relativedelta(months=months + 1))
+    return np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D'))
+
+
+def daily_inflows(start, days, due, amounts):
+    """
+    Expected collections per day: each invoice on its due date, overdue ones on the first day.
+    Invoices due after the horizon are left out.
+    """
+    offsets = np.maximum(day_offsets(due, start), 0)
+    inside = offsets < days
+    return np.bincount(offsets[inside], weights=amounts[inside], minlength=days)
+
+
+def recurring_expenses(start, dates, category_codes, amounts, category_count, lookback=LOOKBACK_MONTHS):
+    """
+    Median monthly spend per category over the `lookback` full months before `start`, 0 for categories
+    that had expenses in fewer than RECURRING_SHARE of those months (one-offs).
+    """
+    first = np.datetime64(start, 'M') - lookback
+    months = (dates.astype('datetime64[M]') - first).astype(np.int64)
+    inside = (months >= 0) & (months < lookback)
+    cells = category_codes[inside] * lookback + months[inside]
+    totals = np.bincount(cells, weights=amounts[inside], minlength=category_count * lookback)
+    totals = totals.reshape(category_count, lookback)
+    recurring = (totals > 0).mean(axis=1) >= RECURRING_SHARE
+    return np.where(recurring, np.median(totals, axis=1), 0.0)
+
+
+def project(start, months, due, invoice_amounts, expense_dates, expense_categories, expense_amounts,
+            categories, opening_balance=0.0, opening_tax_pool=0.0, tax_rate=float(TAX_RATE)):
+    """
+    The forecast from arrays: invoice due dates and amounts, expense dates, category codes (indexes into
+    `categories`) and amounts. Returns the daily and monthly series as arrays plus the recurring estimates.
+    """
+    days = horizon(start, months)
+    inflow = daily_inflows(start, len(days), due, invoice_amounts)
+
+    monthly_estimates = recurring_expenses(start, expense_dates, expense_categories, expense_amounts, len(categories))
+    day_months = days.astype('datetime64[M]')
+    days_in_month = ((day_months + 1).astype('datetime64[D]') - day_months.astype('datetime64[D]')).astype(np.int64)
+    outflow = monthly_estimates.sum() / days_in_month
+
+    balance = opening_balance + np.cumsum(inflow - outflow)
+    tax_pool = opening_tax_pool + np.cumsum(inflow) * tax_rate
+
+    # per month: sums of the flows, balances at the month's last day
+    month_starts = np.flatnonzero(np.r_[True, day_months[1:] != day_months[:-1]])
+    month_ends = np.r_[month_starts[1:], len(days)] - 1
+    return {
+        'days': days,
+        'inflow': inflow,
+        'outflow': outflow,
+        'balance': balance,
+        'tax_pool': tax_pool,
+        'available': balance - tax_pool,
+        'months': day_months[month_starts],
+        'monthly_inflow': np.add.reduceat(inflow, month_starts),
+        'monthly_outflow': np.add.reduceat(outflow, month_starts),
+        'monthly_balance': balance[month_ends],
+        'monthly_tax_pool': tax_pool[month_ends],
+        'recurring': {
+            category: float(estimate)
+            for category, estimate in zip(categories, monthly_estimates) if estimate
+        },
+    }
+
+
+def load(start, lookback=LOOKBACK_MONTHS):
+    """
+    The forecast's inputs from the database, summed per day in SQL so only a few thousand rows
+    leave it: outstanding invoices by due date, recent expenses by day and category, and the
+    opening balance (all PAID income less all expenses).
+    """
+    invoices = list(
+        Invoice.objects.filter(status=Invoice.SENT)
+        .values_list('due_date').annotate(total=Sum('amount')).order_by()
+    )
+    since = start.replace(day=1) - relativedelta(months=lookback)
+    expenses = list(
+        Expense.objects.filter(expense_date__gte=since, expense_date__lt=start)
+        .values_list('expense_date', 'category').annotate(total=Sum('amount')).order_by()
+    )
+    categories = sorted({category or UNCATEGORIZED for _, category, _ in expenses})
+    codes = {category: code for code, category in enumerate(categories)}
+
+    income = InvoiceMonthlyRollup.objects.filter(status=Invoice.PAID).aggregate(total=Sum('total'))['total'] or 0
+    spent = Expense.objects.aggregate(total=Sum('amount'))['total'] or 0
+    return {
+        'due': np.array([due for due, _ in invoices], dtype='datetime64[D]'),
+        'invoice_amounts': np.array([total for _, total in invoices], dtype=np.float64),
+        'expense_dates': np.array([day for day, _, _ in expenses], dtype='datetime64[D]'),
+        'expense_categories': np.array([codes[category or UNCATEGORIZED] for _, category, _ in expenses], dtype=np.int64),
+        'expense_amounts': np.array([total for _, _, total in expenses], dtype=np.float64),
+        'categories': categories,
+        'opening_balance': float(income - spent),
+        'opening_tax_pool': float(income * TAX_RATE),
+    }
+
+
+def forecast(start=None, months=FORECAST_MONTHS):
+    start = start or timezone.localdate()
+    return project(start, months, **load(start))
+
+
+def monthly_rows(result):
+    # one dict per month for templates and JSON
+    return [
+        {
+            'month': date.fromisoformat(f'{month}-01'),
+            'inflow': round(float(inflow), 2),
+            'outflow': round(float(outflow), 2),
+            'balance': round(float(balance), 2),
+            'tax_pool': round(float(tax_pool), 2),
+        }
+        for month, inflow, outflow, balance, tax_pool in zip(
+            result['months'], result['monthly_inflow'], result['monthly_outflow'],
+            result['monthly_balance'], result['monthly_tax_pool'],
+        )
+    ]
@@ -18,7 +18,8 @@ class InvoiceForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['client'].queryset = Client.objects.all()
+        if 'client' in self.fields:  # the CSV import resolves clients itself, see imports.py
+            self.fields['client'].queryset = Client.objects.all()
         if not self.instance.pk:
             self.fields['due_date'].initial = now().date()
 
@@ -31,4 +32,9 @@ class ExpenseForm(forms.ModelForm):
             'amount': forms.NumberInput(attrs={'class': 'block w-full p-2 border border-gray-300 rounded-md'}),
             'expense_date': forms.DateInput(attrs={'type': 'date', 'class': 'block w-full p-2 border border-gray-300 rounded-md'}),
             'category': forms.TextInput(attrs={'class': 'block w-full p-2 border border-gray-300 rounded-md', 'placeholder': 'e.g., Software, Travel'}),
-        }
\ No newline at end of file
+        }
+
+class ClientForm(forms.ModelForm):
+    class Meta:
+        model = Client
+        fields = ['name', 'email', 'phone', 'address']
@@ -0,0 +1,92 @@
+# core/fragments.py
+
+import hashlib
+import re
+
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+CACHE_ALIAS = 'fragments'
+
+# kind -> (row template, version of one object)
+ROWS = {
+    'invoice': (
+        'core/partials/invoice_item.html',
+        # the row shows the client's name too, so a client edit is a new version as well
+        lambda invoice: f'{invoice.updated_at.isoformat()}/{invoice.client.updated_at.isoformat()}',
+    ),
+    'expense': (
+        'core/partials/expense_item.html',
+        lambda expense: expense.updated_at.isoformat(),
+    ),
+}
+
+_templates = {}
+
+
+def row_template(kind):
+    """
+    The compiled row template and a hash of its source, so changed templates never get old fragments
+    from a file or Redis cache that outlived the deploy. Loaded once per process.
+    """
+    if kind not in _templates:
+        template = get_template(ROWS[kind][0])
+        digest = hashlib.sha1(template.template.source.encode()).hexdigest()[:8]
+        _templates[kind] = template, digest
+    return _templates[kind]
+
+
+def cache_key(kind, pk):
+    return f'{kind}-row:{row_template(kind)[1]}:{pk}'
+
+
+def render_fresh(kind, obj):
+    template, _ = row_template(kind)
+    return template.render({kind: obj})
+
+
+def render_rows(kind, objects):
+    """
+    Sets `row_html` on every object: cached fragments come from one get_many, only new or
+    changed rows are rendered, and those are written back with one set_many.
+    Returns the objects as a list.
+    """
+    objects = list(objects)
+    cache = caches[CACHE_ALIAS]
+    version = ROWS[kind][1]
+    keys = {obj.pk: cache_key(kind, obj.pk) for obj in objects}
+    cached = cache.get_many(keys.values())
+
+    missing = {}
+    for obj in objects:
+        key = keys[obj.pk]
+        current = version(obj)
+        entry = cached.get(key)
+        if entry and entry[0] == current:
+            obj.row_html = mark_safe(entry[1])
+            continue
+        obj.row_html = render_fresh(kind, obj)
+        missing[key] = (current, obj.row_html)
+    if missing:
+        cache.set_many(missing)
+    return objects
+
+
+def render_row(kind, obj):
+    return render_rows(kind, [obj])[0].row_html
+
+
+def oob(row_html):
+    """
+    A cached row marked as an HTMX out-of-band swap, replacing the element with its id wherever it is on the page.
+    """
+    return mark_safe(re.sub(r'<(\w+)', r'<\1 hx-swap-oob="true"', row_html, count=1))
+
+
+def invalidate(kind, pk):
+    caches[CACHE_ALIAS].delete(cache_key(kind, pk))
+
+
+def invalidate_many(kind, pks):
+    caches[CACHE_ALIAS].delete_many([cache_key(kind, pk) for pk in pks])
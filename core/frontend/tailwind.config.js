@@ -0,0 +1,16 @@
+// core/frontend/tailwind.config.js
+//
+// Tailwind v3 config for the standalone CLI, see the build_assets command.
+// Only classes found in these files end up in core/static/core/css/app.css,
+// so class names must appear whole in the source, never put together at runtime.
+
+module.exports = {
+  content: [
+    './core/templates/**/*.html',
+    './core/forms.py',
+  ],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
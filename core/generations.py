@@ -0,0 +1,20 @@
+# core/generations.py
+#
+# Stamps in the CacheGeneration table, changed whenever the data behind a cache goes stale.
+# Kept in the database, so a change made by a job worker or another web process is seen by all of them.
+
+import time
+
+from .models import CacheGeneration
+
+
+def current(key):
+    # one lookup on the unique key
+    return CacheGeneration.objects.filter(key=key).values_list('value', flat=True).first() or 0
+
+
+def bump(key):
+    # a timestamp rather than a counter, a rolled back or recreated row never brings an old value back
+    stamp = time.time_ns()
+    if not CacheGeneration.objects.filter(key=key).update(value=stamp):
+        CacheGeneration.objects.bulk_create([CacheGeneration(key=key, value=stamp)], ignore_conflicts=True)
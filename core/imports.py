@@ -0,0 +1,260 @@
+# core/imports.py
+
+import csv
+from collections import defaultdict
+from decimal import Decimal
+from functools import partial
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, localdate, make_aware
+
+from . import numbering, receipts, reports, rollups, search
+from .forms import ClientForm, ExpenseForm, InvoiceForm
+from .models import Client, Expense, Invoice
+from .receipt_engine import fingerprint
+
+BATCH_SIZE = 1000
+KINDS = ['clients', 'invoices', 'expenses']
+
+
+class BatchValidationMixin:
+    """
+    Form validation without the per-row uniqueness queries, uniqueness is checked once per batch instead.
+    """
+
+    def validate_unique(self):
+        pass
+
+
+class ClientImportForm(BatchValidationMixin, ClientForm):
+    pass
+
+
+class ExpenseImportForm(BatchValidationMixin, ExpenseForm):
+    pass
+
+
+class InvoiceImportForm(BatchValidationMixin, InvoiceForm):
+    # the client is resolved by email per batch, so InvoiceForm's client dropdown is left out,
+    # and rows without an invoice_number get the next one before they are validated, see number_invoices()
+    class Meta(InvoiceForm.Meta):
+        fields = [field for field in InvoiceForm.Meta.fields if field != 'client'] + ['invoice_number']
+
+
+class ImportResult:
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.rejected = []  # (line number, errors, row)
+        self.skipped = []  # (line number, reason, row), valid rows left out, like duplicate expenses
+        self.flagged = 0  # duplicate expenses imported with is_duplicate set
+
+    def reject(self, line, errors, row):
+        self.rejected.append((line, errors, row))
+
+    def skip(self, line, reason, row):
+        self.skipped.append((line, reason, row))
+
+
+def validated(form_class, batch, result, check=None):
+    """
+    Runs every row through its own bound form and yields (line, row, unsaved instance) for the valid ones.
+    `check(row)` can return extra errors that are reported along with the form's.
+    """
+    for line, row in batch:
+        form = form_class(row)
+        errors = [] if form.is_valid() else [form_errors(form)]
+        if check:
+            errors += check(row)
+        if errors:
+            result.reject(line, '; '.join(errors), row)
+            continue
+        yield line, row, form.instance
+
+
+def form_errors(form):
+    return '; '.join(f"{field}: {' '.join(errors)}" for field, errors in form.errors.items())
+
+
+def clean_created_at(value):
+    """
+    Optional historical invoice date, as YYYY-MM-DD or a full datetime.
+    """
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError
+        parsed = parse_datetime(f'{day.isoformat()}T00:00:00')
+    return make_aware(parsed) if is_naive(parsed) else parsed
+
+
+def backdate(model, dated):
+    """
+    Sets created_at on freshly bulk created rows from [(instance, created_at)].
+    auto_now_add always stamps "now" on insert, so historical dates are written afterwards
+    with one executemany rather than bulk_update's per-row CASE expression.
+    """
+    if not dated:
+        return
+    for instance, created_at in dated:
+        instance.created_at = created_at
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {model._meta.db_table} SET created_at = %s WHERE id = %s',
+            [(connection.ops.adapt_datetimefield_value(created_at), instance.pk) for instance, created_at in dated],
+        )
+
+
+def number_invoices(batch):
+    """
+    Gives rows without an invoice_number the next one, like invoices created on the site.
+    Numbers are reserved in transactions of their own (numbering.py), so this runs before the batch's.
+    """
+    for _, row in batch:
+        if not row.get('invoice_number'):
+            try:
+                created_at = clean_created_at(row.get('created_at', ''))
+            except ValueError:  # the row is rejected, its number becomes a gap
+                created_at = None
+            row['invoice_number'] = numbering.next_invoice_number(created_at and localdate(created_at))
+
+
+# per kind batch importers, each gets [(line number, row dict)] and returns the rows it stored
+
+def import_clients(batch, result):
+    valid = list(validated(ClientImportForm, batch, result))
+
+    # one query for the whole batch instead of one unique check per row
+    existing = set(Client.objects.filter(email__in=[client.email for _, _, client in valid]).values_list('email', flat=True))
+    clients = []
+    for line, row, client in valid:
+        if client.email in existing:
+            result.reject(line, f"email: A client with email {client.email} already exists.", row)
+            continue
+        existing.add(client.email)
+        clients.append(client)
+
+    Client.objects.bulk_create(clients)
+    return clients
+
+
+def import_expenses(batch, result, on_duplicate=None):
+    """
+    Expenses already stored, or repeated earlier in the file, are skipped or imported and flagged
+    like duplicate receipts, see receipts.duplicate_policy().
+    """
+    on_duplicate = receipts.duplicate_policy(on_duplicate)
+    valid = list(validated(ExpenseImportForm, batch, result))
+
+    # bulk_create skips Expense.save(), so fingerprint here, and check the batch against the table once
+    for _, _, expense in valid:
+        expense.fingerprint = fingerprint(expense.title, expense.amount, expense.expense_date)
+    known = receipts.existing_fingerprints([expense.fingerprint for _, _, expense in valid])
+    expenses = []
+    for line, row, expense in valid:
+        if expense.fingerprint in known:
+            if on_duplicate == receipts.SKIP_DUPLICATES:
+                result.skip(line, f"Duplicate of an expense already imported: {expense.title}, {expense.amount}.", row)
+                continue
+            expense.is_duplicate = True
+            result.flagged += 1
+        known.add(expense.fingerprint)
+        expenses.append(expense)
+    Expense.objects.bulk_create(expenses)
+    reports.invalidate()  # bulk_create sends no signals
+    return expenses
+
+
+def import_invoices(batch, result):
+    # one query resolves every client email in the batch
+    emails = {row.get('client_email', '') for _, row in batch}
+    clients = {client.email: client for client in Client.objects.filter(email__in=emails)}
+
+    def check(row):
+        errors = []
+        if row.get('client_email', '') not in clients:
+            errors.append(f"client_email: No client with email '{row.get('client_email', '')}'.")
+        try:
+            clean_created_at(row.get('created_at', ''))
+        except ValueError:
+            errors.append("created_at: Enter a valid date.")
+        return errors
+
+    valid = []
+    for line, row, invoice in validated(InvoiceImportForm, batch, result, check):
+        invoice.client = clients[row['client_email']]
+        valid.append((line, row, invoice, clean_created_at(row.get('created_at', ''))))
+
+    # invoice numbers are unique: check the batch against the table once
+    numbers = [invoice.invoice_number for _, _, invoice, _ in valid]
+    taken = set(Invoice.objects.filter(invoice_number__in=numbers).values_list('invoice_number', flat=True))
+    invoices = []
+    dated = []
+    for line, row, invoice, created_at in valid:
+        if invoice.invoice_number in taken:
+            result.reject(line, f"invoice_number: Invoice {invoice.invoice_number} already exists.", row)
+            continue
+        taken.add(invoice.invoice_number)
+        invoices.append(invoice)
+        if created_at:
+            dated.append((invoice, created_at))
+
+    Invoice.objects.bulk_create(invoices)
+
+    backdate(Invoice, dated)
+
+    # bulk_create sends no signals: update the dashboard rollups, search index and reports once per batch
+    deltas = defaultdict(lambda: (Decimal('0'), 0))
+    for invoice in invoices:
+        month, status, amount = rollups.snapshot(invoice)
+        total, count = deltas[(month, status)]
+        deltas[(month, status)] = (total + amount, count + 1)
+    rollups.apply_deltas(deltas)
+    search.index_invoices([invoice.pk for invoice in invoices])
+    reports.invalidate()
+    return invoices
+
+
+IMPORTERS = {
+    'clients': import_clients,
+    'invoices': import_invoices,
+    'expenses': import_expenses,
+}
+
+
+def import_csv(kind, lines, batch_size=BATCH_SIZE, progress=None, on_duplicate=None):
+    """
+    Streams CSV text lines (with a header row) into `kind` records, batch by batch.
+    Each batch is validated, stored with bulk_create and committed in its own transaction,
+    so a bad row only rejects itself. `progress(result)` is called after every batch.
+    `on_duplicate` applies to expenses, see import_expenses().
+    """
+    importer = IMPORTERS[kind]
+    if kind == 'expenses':
+        importer = partial(importer, on_duplicate=on_duplicate)
+    result = ImportResult()
+    reader = csv.DictReader(lines)
+
+    while True:
+        # line numbers count the header as line 1
+        batch = [
+            (reader.line_num, {key.strip(): (value or '').strip() for key, value in row.items() if key})
+            for row in islice(reader, batch_size)
+        ]
+        if not batch:
+            break
+        if kind == 'invoices':
+            number_invoices(batch)
+        with transaction.atomic():
+            stored = importer(batch, result)
+        result.processed += len(batch)
+        result.imported += len(stored)
+        if progress:
+            progress(result)
+
+    return result
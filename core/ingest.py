@@ -0,0 +1,177 @@
+# core/ingest.py
+
+import email
+import multiprocessing
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from email import policy
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.html import strip_tags
+from django.utils.timezone import now
+
+from . import receipts, reports
+from .models import Expense
+from .receipt_engine import init_worker, parse_many
+
+BATCH_SIZE = 500
+TEXT_SUFFIXES = ('.txt', '.eml', '.mbox')
+
+
+# reading receipts from uploads, one at a time
+
+def message_text(message):
+    body = message.get_body(preferencelist=('plain', 'html'))
+    if body is None:
+        return ''
+    text = body.get_content()
+    if body.get_content_type() == 'text/html':
+        text = strip_tags(text)
+    return text
+
+
+def message_source(message, fallback):
+    return str(message.get('subject') or fallback)
+
+
+def iter_mbox(lines, name='mbox'):
+    """
+    Yields (source, text) per message of an mbox, reading it line by line
+    so only one message is held in memory at a time.
+    """
+    message_lines = []
+    count = 0
+
+    def finish():
+        message = email.message_from_bytes(b''.join(message_lines[1:]), policy=policy.default)
+        return message_source(message, f'{name} #{count}'), message_text(message)
+
+    for line in lines:
+        if line.startswith(b'From ') and message_lines:
+            count += 1
+            yield finish()
+            message_lines = []
+        message_lines.append(line)
+    if message_lines:
+        count += 1
+        yield finish()
+
+
+def iter_zip(fileobj):
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or not name.lower().endswith(TEXT_SUFFIXES):
+                continue
+            with archive.open(info) as member:
+                yield from iter_file(member, name)
+
+
+def iter_file(fileobj, name):
+    """
+    Yields (source, text) for every receipt in an uploaded .mbox, .zip, .eml or plain text file.
+    """
+    lower = name.lower()
+    if lower.endswith('.mbox'):
+        yield from iter_mbox(fileobj, name)
+    elif lower.endswith('.zip'):
+        yield from iter_zip(fileobj)
+    elif lower.endswith('.eml'):
+        message = email.message_from_binary_file(fileobj, policy=policy.default)
+        yield message_source(message, name), message_text(message)
+    else:
+        yield name, fileobj.read().decode('utf-8', errors='replace')
+
+
+# parsing and saving
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def parse_batches(batches, today, workers):
+    """
+    Yields parsed batches in input order. With workers, batches are parsed in a process
+    pool with a bounded number in flight, so a huge mailbox is never read ahead fully.
+    """
+    rules = receipts.rules()
+    if workers <= 1:
+        init_worker(rules)
+        for batch in batches:
+            yield parse_many(batch, today)
+        return
+
+    # spawned, not forked: imports run in job worker threads, which a fork would copy mid-flight
+    spawn = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(rules,), mp_context=spawn) as pool:
+        in_flight = deque()
+        for batch in batches:
+            in_flight.append(pool.submit(parse_many, batch, today))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def save_batch(parsed, on_duplicate, files=None):
+    """
+    Bulk inserts the receipts that have an amount and returns one report row per receipt.
+    Duplicates (already stored, or repeated within the batch) are skipped or flagged.
+    `files` maps sources to stored receipt files (receipt_files.py) to attach.
+    """
+    files = files or {}
+    known = receipts.existing_fingerprints([receipt.fingerprint for _, receipt in parsed])
+    report = []
+    expenses = []
+    for source, receipt in parsed:
+        row = {
+            'source': source,
+            'title': receipt.title,
+            'category': receipt.category,
+            'amount': receipt.amount,
+            'expense_date': receipt.expense_date,
+        }
+        duplicate = receipt.fingerprint in known
+        if not receipt.amount:
+            row['status'] = 'failed'
+            row['error'] = "Could not find a valid total amount in the receipt text."
+        elif duplicate and on_duplicate == receipts.SKIP_DUPLICATES:
+            row['status'] = 'duplicate'
+        else:
+            row['status'] = 'flagged' if duplicate else 'created'
+            expenses.append(Expense(
+                title=receipt.title,
+                amount=receipt.amount,
+                expense_date=receipt.expense_date,
+                category=receipt.category,
+                fingerprint=receipt.fingerprint,
+                is_duplicate=duplicate,
+                receipt=files.get(source),
+            ))
+            known.add(receipt.fingerprint)
+        report.append(row)
+
+    with transaction.atomic():
+        Expense.objects.bulk_create(expenses)
+    if expenses:
+        reports.invalidate()  # bulk_create sends no signals
+    return report
+
+
+def ingest(receipt_iter, batch_size=BATCH_SIZE, workers=None, on_duplicate=None):
+    """
+    Parses and stores a stream of (source, text) receipts and yields a report row per receipt.
+    Each batch is written with one bulk insert in its own transaction.
+    """
+    if workers is None:
+        workers = getattr(settings, 'RECEIPT_INGEST_WORKERS', None) or os.cpu_count()
+    on_duplicate = receipts.duplicate_policy(on_duplicate)
+    today = now().date()
+    for parsed in parse_batches(chunked(receipt_iter, batch_size), today, workers):
+        yield from save_batch(parsed, on_duplicate)
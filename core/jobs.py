@@ -0,0 +1,263 @@
+# core/jobs.py
+
+import logging
+import os
+import shutil
+import socket
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('core.jobs')
+
+TASKS = {}
+
+
+class Task:
+    def __init__(self, name, func, priority, max_attempts, template, context):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.template = template
+        self.context = context
+
+
+def task(name, priority=100, max_attempts=3, template=None, context=None):
+    """
+    Registers `func(job, **payload)` as a background task. Whatever it returns is stored as the job's
+    JSON result and shown with `template`, `context(result)` turns it into that template's context.
+    """
+    def register(func):
+        TASKS[name] = Task(name, func, priority, max_attempts, template, context)
+        return func
+    return register
+
+
+def enqueue(name, /, priority=None, **payload):
+    spec = TASKS[name]
+    return Job.objects.create(
+        task=name,
+        payload=payload,
+        priority=spec.priority if priority is None else priority,
+        max_attempts=spec.max_attempts,
+    )
+
+
+# files
+
+def files_dir():
+    path = Path(getattr(settings, 'JOB_FILES_DIR', settings.BASE_DIR / 'job_files'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def spool(upload):
+    """
+    Copies an uploaded file to disk for a job to read later, the request's temporary file is gone by then.
+    """
+    uploads = files_dir() / 'uploads'
+    uploads.mkdir(exist_ok=True)
+    path = uploads / f'{uuid.uuid4().hex}{Path(upload.name).suffix}'
+    with open(path, 'wb') as spooled:
+        for chunk in upload.chunks():
+            spooled.write(chunk)
+    return str(path)
+
+
+def result_path(job, filename):
+    path = files_dir() / str(job.pk) / filename
+    path.parent.mkdir(exist_ok=True)
+    return path
+
+
+def result_file(job):
+    # the file a finished job wrote, if any
+    if job.status != Job.DONE or not (job.result or {}).get('file'):
+        return None
+    path = files_dir() / job.result['file']
+    return path if path.is_file() else None
+
+
+def file_result(path, **extra):
+    # result of a task that wrote `path` (from result_path)
+    return {'file': str(Path(path).relative_to(files_dir())), 'filename': Path(path).name, **extra}
+
+
+# running jobs
+
+def lease():
+    return timedelta(seconds=getattr(settings, 'JOB_LEASE', 300))
+
+
+def retry_delay(attempts):
+    # 10s, 20s, 40s, ... with the default JOB_RETRY_DELAY
+    return timedelta(seconds=getattr(settings, 'JOB_RETRY_DELAY', 10) * 2 ** (attempts - 1))
+
+
+def set_progress(job, done, total=None, message=''):
+    """
+    Reports how far a running job is. Also renews the job's lease, so a long job calling this
+    regularly is never taken for one whose worker died. Unchanged progress is written at most
+    once per half lease.
+    """
+    percent = min(99, done * 100 // total) if total else job.progress
+    now = timezone.now()
+    unchanged = (percent, message) == (job.progress, job.message)
+    if unchanged and job.locked_until and now < job.locked_until - lease() / 2:
+        return
+    job.progress, job.message, job.locked_until = percent, message[:200], now + lease()
+    Job.objects.filter(pk=job.pk, worker=job.worker).update(
+        progress=job.progress, message=job.message, locked_until=job.locked_until,
+    )
+
+
+def claim(worker):
+    """
+    Marks the most urgent due job as running for `worker` and returns it, or None when nothing is due.
+    The conditional UPDATE is the lock: when another worker got there first, the next job is tried.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('priority', 'id')
+    while True:
+        pk = due.values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            worker=worker,
+            started_at=now,
+            locked_until=now + lease(),
+            progress=0,
+            message='',
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+
+
+def run(job):
+    """
+    Runs a claimed job. A failed attempt is queued again after a growing delay until max_attempts.
+    """
+    spec = TASKS.get(job.task)
+    started = perf_counter()
+    # a worker whose lease ran out doesn't overwrite the attempt that replaced it
+    mine = Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker)
+    try:
+        if spec is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        result = spec.func(job, **job.payload)
+    except Exception:
+        now = timezone.now()
+        changes = {'error': traceback.format_exc(), 'worker': '', 'locked_until': None}
+        if spec is not None and job.attempts < job.max_attempts:
+            changes.update(status=Job.QUEUED, run_after=now + retry_delay(job.attempts))
+        else:
+            changes.update(status=Job.FAILED, finished_at=now)
+        mine.update(**changes)
+        logger.exception("Job %s #%s failed (attempt %s of %s)", job.task, job.pk, job.attempts, job.max_attempts)
+        return False
+
+    mine.update(
+        status=Job.DONE, result=result, progress=100, message='', error='',
+        finished_at=timezone.now(), locked_until=None,
+    )
+    logger.info("Job %s #%s done in %.1fs", job.task, job.pk, perf_counter() - started)
+    return True
+
+
+def requeue_stale():
+    """
+    Running jobs whose lease ran out lost their worker (killed, out of memory): they are queued again,
+    or failed when that was their last attempt.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_until__lt=now)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error="The worker running this job stopped.",
+        worker='', locked_until=None, finished_at=now,
+    )
+    return stale.update(status=Job.QUEUED, worker='', locked_until=None, run_after=now)
+
+
+def purge(days=None):
+    """
+    Deletes jobs that finished more than `days` (JOB_KEEP_DAYS) ago, their result files and old uploads.
+    """
+    days = getattr(settings, 'JOB_KEEP_DAYS', 7) if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    old = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff)
+    for pk in old.values_list('pk', flat=True).iterator():
+        shutil.rmtree(files_dir() / str(pk), ignore_errors=True)
+    deleted, _ = old.delete()
+    for upload in (files_dir() / 'uploads').glob('*'):
+        if upload.stat().st_mtime < cutoff.timestamp():
+            upload.unlink(missing_ok=True)
+    return deleted
+
+
+class Worker:
+    """
+    Runs jobs in `threads` threads until `stop` is set, or with `burst` until nothing is due.
+    Idle threads poll every `poll_interval` seconds.
+    """
+
+    HOUSEKEEPING_INTERVAL = 60  # seconds between stale lease checks and purges
+
+    def __init__(self, threads=1, poll_interval=None, burst=False, stop=None):
+        self.threads = threads
+        self.poll_interval = poll_interval or getattr(settings, 'JOB_POLL_INTERVAL', 1)
+        self.burst = burst
+        self.stop = stop or threading.Event()
+        self.lock = threading.Lock()
+        self.last_housekeeping = None
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self.loop, name=f'jobs-{number}', daemon=True)
+            for number in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            # short joins, so the main thread keeps handling signals
+            while thread.is_alive():
+                thread.join(0.5)
+
+    def loop(self):
+        worker = f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                self.housekeeping()
+                job = claim(worker)
+                if job is None:
+                    if self.burst:
+                        return
+                    self.stop.wait(self.poll_interval)
+                    continue
+                run(job)
+        finally:
+            connections.close_all()
+
+    def housekeeping(self):
+        with self.lock:
+            if self.last_housekeeping and monotonic() - self.last_housekeeping < self.HOUSEKEEPING_INTERVAL:
+                return
+            self.last_housekeeping = monotonic()
+        try:
+            requeue_stale()
+            purge()
+        except Exception:
+            logger.exception("Job housekeeping failed")
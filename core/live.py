@@ -0,0 +1,158 @@
+# core/live.py
+
+import asyncio
+import json
+import threading
+
+from django.contrib.humanize.templatetags.humanize import intcomma
+from django.template.defaultfilters import floatformat
+from django.utils.html import format_html, format_html_join
+
+# dashboard card element ids and the rollups.dashboard() value they show
+CARDS = {
+    'total-income': 'total_income',
+    'total-outstanding': 'total_outstanding',
+    'tax-pool': 'tax_pool',
+}
+CHART = 'income-chart-delta'
+
+HEARTBEAT = 20  # seconds between keep-alive comments on an idle stream
+
+
+def dashboard_state(dashboard):
+    """
+    Flattens rollups.dashboard() into {card id: value, CHART: {month label: income}} for diffing.
+    """
+    state = {element_id: dashboard[key] for element_id, key in CARDS.items()}
+    state[CHART] = dict(zip(dashboard['chart_labels'], dashboard['chart_data']))
+    return state
+
+
+def changes_between(old, new):
+    if old is None:
+        return new
+    changes = {element_id: value for element_id, value in new.items() if element_id != CHART and old.get(element_id) != value}
+    chart = {label: value for label, value in new[CHART].items() if old[CHART].get(label) != value}
+    if chart:
+        changes[CHART] = chart
+    return changes
+
+
+def merge(pending, changes):
+    # an undelivered update is folded into the next one, so a slow client still ends up current
+    if pending is None:
+        return dict(changes)
+    merged = {**pending, **changes}
+    if CHART in pending and CHART in changes:
+        merged[CHART] = {**pending[CHART], **changes[CHART]}
+    return merged
+
+
+class Subscription:
+    """
+    One connected dashboard. Holds at most one pending (merged) update, whatever the publish rate.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.ready = asyncio.Event()
+        self.pending = None
+        self.rendered = None
+
+    def deliver(self, changes, rendered):
+        # always runs on the subscriber's own event loop
+        if self.pending is None:
+            # the common case: send the html rendered once for all subscribers
+            self.pending, self.rendered = changes, rendered
+        else:
+            self.pending, self.rendered = merge(self.pending, changes), None
+        self.ready.set()
+
+    async def next(self, timeout):
+        """
+        The html of the next (merged) update, or None after `timeout` seconds without one.
+        """
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.ready.clear()
+        html = self.rendered or render_changes(self.pending)
+        self.pending = self.rendered = None
+        return html
+
+
+class Broker:
+    """
+    In-process pub/sub between the views that change invoices and the open dashboard streams.
+    Publishing is thread safe (sync views run in threads), delivery happens on each subscriber's loop.
+    Only dashboards connected to the same process see the updates.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.state = None  # the last published dashboard state
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+            if not self.subscribers:
+                # nobody listens, so the next publish can't be diffed against a stale state
+                self.state = None
+
+    def remember(self, state):
+        # the state a new subscriber was sent, if nothing newer was published meanwhile
+        with self.lock:
+            if self.state is None:
+                self.state = state
+
+    def publish(self, state):
+        with self.lock:
+            changes = changes_between(self.state, state)
+            self.state = state
+            subscribers = list(self.subscribers)
+        if not changes:
+            return
+        rendered = render_changes(changes)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, changes, rendered)
+            except RuntimeError:
+                # the subscriber's loop is gone
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+def money(value):
+    return f'€{intcomma(floatformat(value, 2))}'
+
+
+def render_changes(changes):
+    """
+    OOB swaps for the changed cards plus the chart delta as JSON, for the dashboard's chart script.
+    """
+    html = format_html_join(
+        '', '<span id="{}" hx-swap-oob="innerHTML">{}</span>',
+        ((element_id, money(value)) for element_id, value in changes.items() if element_id in CARDS),
+    )
+    if CHART in changes:
+        html += format_html('<div id="{}" hx-swap-oob="innerHTML">{}</div>', CHART, json.dumps(changes[CHART]))
+    return html
+
+
+def sse_message(event, data):
+    # every line of the payload needs its own data: field
+    lines = ''.join(f'data: {line}\n' for line in data.splitlines() or [''])
+    return f'event: {event}\n{lines}\n'
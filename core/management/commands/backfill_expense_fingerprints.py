@@ -0,0 +1,39 @@
+# core/management/commands/backfill_expense_fingerprints.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Expense
+from core.receipt_engine import fingerprint
+
+
+class Command(BaseCommand):
+    help = "Fingerprints expenses created before duplicate detection, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        updated = 0
+
+        # walks the primary key, so every batch is an index range scan
+        while True:
+            batch = list(
+                Expense.objects.filter(pk__gt=last_pk, fingerprint__isnull=True)
+                .order_by('pk')
+                .only('pk', 'title', 'amount', 'expense_date')[:batch_size]
+            )
+            if not batch:
+                break
+            for expense in batch:
+                # the receipt text of old rows is gone, so only their fields count
+                expense.fingerprint = fingerprint(expense.title, expense.amount, expense.expense_date)
+            with transaction.atomic():
+                Expense.objects.bulk_update(batch, ['fingerprint'])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"Fingerprinted {updated} expenses...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {updated} expenses fingerprinted."))
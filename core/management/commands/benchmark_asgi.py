@@ -0,0 +1,221 @@
+# core/management/commands/benchmark_asgi.py
+
+import asyncio
+import io
+import logging
+import sys
+import tempfile
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from time import perf_counter
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+
+from core import pdf
+from core.models import Invoice
+
+HOST = 'localhost'
+
+
+def wsgi_get(handler, path):
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+    }
+    response = handler(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        # fires request_finished, which closes the thread's database connection
+        response.close()
+    return statuses[0]
+
+
+async def asgi_get(app, path):
+    statuses = []
+    requested = False
+    disconnected = asyncio.Event()  # never set, the client stays until the response is complete
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await app({
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', HOST.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }, receive, send)
+    return statuses[0]
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def add(self, kind, status, seconds):
+        with self.lock:
+            self.statuses[kind][status] += 1
+            if status == 200:
+                self.timings[kind].append(seconds)
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares dashboard and invoice PDF throughput of the WSGI and the ASGI handler in this process: "
+        "dashboard clients keep loading the dashboard while PDF clients keep downloading uncached PDFs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10, help="How long each handler is measured.")
+        parser.add_argument('--dashboards', type=int, default=16, help="Concurrent dashboard clients.")
+        parser.add_argument('--pdfs', type=int, default=4, help="Concurrent PDF clients.")
+        parser.add_argument('--threads', type=int, default=4, help="Worker threads of the WSGI server.")
+        parser.add_argument('--only', choices=['wsgi', 'asgi'], help="Measure one handler only.")
+
+    def handle(self, *args, **options):
+        invoice_ids = list(Invoice.objects.order_by('-pk').values_list('pk', flat=True)[:1000])
+        if not invoice_ids:
+            raise CommandError("No invoices, seed some with the seed_data command first.")
+        self.invoice_ids = invoice_ids
+        self.pdf_clients = max(1, options['pdfs'])
+        self.dashboard = reverse('invoice-list')
+
+        # every request is a render: the PDFs go to an empty cache that is cleared before each download
+        perf_logger = logging.getLogger('core.perf')
+        level = perf_logger.level
+        perf_logger.setLevel(logging.WARNING)  # one log line per request would drown the results
+        try:
+            with tempfile.TemporaryDirectory() as pdf_cache, override_settings(INVOICE_PDF_CACHE_DIR=pdf_cache):
+                self.stdout.write(
+                    f"{options['dashboards']} dashboard and {options['pdfs']} PDF clients, "
+                    f"{options['seconds']:g}s per handler, WSGI with {options['threads']} threads"
+                )
+                self.stdout.write(
+                    f"{'handler':<8}{'dash/s':>9}{'p50':>9}{'p95':>9}{'pdf/s':>8}{'p50':>9}{'p95':>9}{'503':>6}{'errors':>8}"
+                )
+                if options['only'] != 'asgi':
+                    self.report('wsgi', options['seconds'], self.run_wsgi(options))
+                if options['only'] != 'wsgi':
+                    self.report('asgi', options['seconds'], asyncio.run(self.run_asgi(options)))
+        finally:
+            perf_logger.setLevel(level)
+
+    def pdf_paths(self, client):
+        # each PDF client has its own invoices, so no two clients render the same one
+        for pk in cycle(self.invoice_ids[client::self.pdf_clients] or self.invoice_ids):
+            pdf.purge(pk)
+            yield reverse('invoice-pdf', args=[pk])
+
+    def clients(self, options):
+        plan = [('dashboard', cycle([self.dashboard])) for _ in range(options['dashboards'])]
+        plan += [('pdf', self.pdf_paths(client)) for client in range(options['pdfs'])]
+        return plan
+
+    def run_wsgi(self, options):
+        handler = WSGIHandler()
+        wsgi_get(handler, self.dashboard)  # warm up templates, caches and the render pool
+        wsgi_get(handler, next(self.pdf_paths(0)))
+
+        results = Results()
+        deadline = perf_counter() + options['seconds']
+        plan = self.clients(options)
+
+        # the server: a fixed set of threads taking requests in arrival order,
+        # a request holds its thread until the response is complete
+        with ThreadPoolExecutor(max_workers=options['threads']) as server, \
+                ThreadPoolExecutor(max_workers=len(plan)) as pool:
+
+            def client(kind, paths):
+                while perf_counter() < deadline:
+                    path = next(paths)
+                    start = perf_counter()
+                    try:
+                        status = server.submit(wsgi_get, handler, path).result()
+                    except Exception:
+                        status = 'error'
+                    results.add(kind, status, perf_counter() - start)
+
+            for future in [pool.submit(client, kind, paths) for kind, paths in plan]:
+                future.result()
+        return results
+
+    async def run_asgi(self, options):
+        app = ASGIHandler()
+        await asgi_get(app, self.dashboard)
+        await asgi_get(app, next(self.pdf_paths(0)))
+
+        results = Results()
+        deadline = perf_counter() + options['seconds']
+
+        async def client(kind, paths):
+            while perf_counter() < deadline:
+                path = next(paths)
+                start = perf_counter()
+                try:
+                    status = await asgi_get(app, path)
+                except Exception:
+                    status = 'error'
+                results.add(kind, status, perf_counter() - start)
+
+        await asyncio.gather(*(client(kind, paths) for kind, paths in self.clients(options)))
+        return results
+
+    def report(self, name, seconds, results):
+        row = [f'{name:<8}']
+        for kind, width in (('dashboard', 9), ('pdf', 8)):
+            timings = results.timings[kind]
+            row.append(f'{len(timings) / seconds:>{width}.1f}')
+            row.append(f'{percentile(timings, 0.5) * 1000:>7.1f}ms')
+            row.append(f'{percentile(timings, 0.95) * 1000:>7.1f}ms')
+        statuses = results.statuses['dashboard'] + results.statuses['pdf']
+        busy = statuses.pop(503, 0)
+        errors = sum(count for status, count in statuses.items() if status != 200)
+        row.append(f'{busy:>6}{errors:>8}')
+        self.stdout.write(''.join(row))
@@ -0,0 +1,67 @@
+# core/management/commands/benchmark_forecast.py
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import forecast
+
+CATEGORIES = ['Food & Drink', 'Groceries', 'Hosting', 'Shopping', 'Software', 'Travel', 'Utilities']
+
+
+def synthetic_inputs(start, invoices, expenses, seed=0):
+    """
+    forecast.project() inputs with one element per invoice and per expense: invoices due from
+    a year before `start` to two years after, expenses over the two years before it.
+    """
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(start, 'D')
+    return {
+        'due': today + rng.integers(-365, 730, invoices),
+        'invoice_amounts': rng.uniform(50, 5000, invoices).round(2),
+        'expense_dates': today - rng.integers(1, 730, expenses),
+        'expense_categories': rng.integers(0, len(CATEGORIES), expenses),
+        'expense_amounts': rng.uniform(2, 500, expenses).round(2),
+        'categories': CATEGORIES,
+        'opening_balance': 10_000.0,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the cash-flow forecast: the NumPy projection over generated invoice and expense rows, "
+        "and with --db the whole forecast (loading included) over this database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--invoices', type=int, default=1_000_000, help="Generated outstanding invoices.")
+        parser.add_argument('--expenses', type=int, default=1_000_000, help="Generated expenses.")
+        parser.add_argument('--months', type=int, default=36, help="Forecast horizon.")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs, the median is reported.")
+        parser.add_argument('--db', action='store_true', help="Also time forecast.forecast() over the database.")
+
+    def handle(self, *args, **options):
+        start = timezone.localdate()
+        inputs = synthetic_inputs(start, options['invoices'], options['expenses'])
+        rows = options['invoices'] + options['expenses']
+
+        result = forecast.project(start, options['months'], **inputs)  # warm up
+        timings = self.time(lambda: forecast.project(start, options['months'], **inputs), options['repeat'])
+        self.stdout.write(
+            f"Projection: {len(result['days']):,} days from {rows:,} rows in {timings:.1f} ms "
+            f"({rows / timings / 1000:,.0f}M rows/s)"
+        )
+
+        if options['db']:
+            timings = self.time(lambda: forecast.forecast(start, options['months']), options['repeat'])
+            self.stdout.write(f"Database:   {timings:.1f} ms for load and projection")
+
+    def time(self, run, repeat):
+        timings = []
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return float(np.median(timings))
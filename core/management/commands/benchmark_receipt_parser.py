@@ -0,0 +1,73 @@
+# core/management/commands/benchmark_receipt_parser.py
+
+import json
+import random
+import string
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from core.models import VendorRule
+from core.receipt_engine import ReceiptParser
+
+CORPUS_PATH = Path(__file__).resolve().parents[2] / 'testdata' / 'receipt_corpus.json'
+TODAY = date(2000, 1, 1)  # stands in for "no date found" in the corpus
+
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding='utf-8') as corpus_file:
+        return json.load(corpus_file)
+
+
+def check(parsed, expected):
+    amount = Decimal(expected['amount']) if expected['amount'] else None
+    expense_date = date.fromisoformat(expected['expense_date']) if expected['expense_date'] else TODAY
+    return (
+        parsed.amount == amount
+        and parsed.title == expected['title']
+        and parsed.category == expected['category']
+        and parsed.expense_date == expense_date
+    )
+
+
+def synthetic_rules(count, seed=0):
+    """
+    Made-up vendor rules that never match the corpus, ranked after the real ones.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        keyword = 'zq' + ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12)))
+        yield (f'Vendor {i}', keyword, 'Synthetic', 10_000 + i)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the receipt parser over the receipt corpus, padded with synthetic vendor rules."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rules', type=int, default=5000, help="Synthetic rules to add to the real ones.")
+        parser.add_argument('--repeat', type=int, default=200, help="Passes over the corpus.")
+
+    def handle(self, *args, **options):
+        corpus = load_corpus()
+        rules = list(VendorRule.objects.values_list('vendor', 'keyword', 'category', 'priority'))
+        rules += synthetic_rules(options['rules'])
+
+        started = time.perf_counter()
+        parser = ReceiptParser(rules)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        correct = sum(check(parser.parse(item['text'], today=TODAY), item['expected']) for item in corpus)
+
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            for item in corpus:
+                parser.parse(item['text'], today=TODAY)
+        elapsed = time.perf_counter() - started
+        parsed = options['repeat'] * len(corpus)
+
+        self.stdout.write(f"Rules:      {len(rules)} (compiled in {compile_ms:.1f} ms)")
+        self.stdout.write(f"Accuracy:   {correct}/{len(corpus)} receipts")
+        self.stdout.write(f"Throughput: {parsed / elapsed:,.0f} receipts/s ({elapsed / parsed * 1e6:.1f} µs/receipt)")
@@ -0,0 +1,70 @@
+# core/management/commands/build_assets.py
+
+import shutil
+import subprocess
+import urllib.request
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core import assets
+
+DOWNLOAD_TIMEOUT = 30  # seconds
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the front-end: downloads missing vendored scripts, compiles the purged and minified "
+        "Tailwind stylesheet from the classes used in core/templates, then runs collectstatic, "
+        "which writes hashed and precompressed copies to STATIC_ROOT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tailwind', default=getattr(settings, 'TAILWIND_CLI', 'tailwindcss'),
+            help="The Tailwind v3 standalone CLI (default: settings.TAILWIND_CLI).",
+        )
+        parser.add_argument('--update-vendor', action='store_true', help="Download the vendored scripts again.")
+        parser.add_argument('--no-collect', action='store_true', help="Skip collectstatic.")
+
+    def handle(self, *args, **options):
+        self.vendor(options['update_vendor'])
+        self.stylesheet(options['tailwind'])
+        if not options['no_collect']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+
+    def vendor(self, update):
+        for name, url in assets.VENDOR.items():
+            path = assets.STATIC_DIR / name
+            if path.exists() and not update:
+                continue
+            self.stdout.write(f"Downloading {url}")
+            try:
+                with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+                    data = response.read()
+            except OSError as error:
+                raise CommandError(
+                    f"Could not download {url}: {error}. "
+                    f"Run this on a machine with network access and commit {path.relative_to(settings.BASE_DIR)}."
+                )
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+
+    def stylesheet(self, tailwind):
+        cli = shutil.which(tailwind)
+        if cli is None:
+            raise CommandError(
+                f"Tailwind CLI '{tailwind}' not found. Install the standalone binary "
+                "(https://github.com/tailwindlabs/tailwindcss/releases, v3) and put it on PATH or set TAILWIND_CLI."
+            )
+        # content globs in the config are relative to the project root
+        result = subprocess.run(
+            [cli, '--config', assets.TAILWIND_CONFIG, '--input', assets.TAILWIND_INPUT,
+             '--output', assets.TAILWIND_OUTPUT, '--minify'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Tailwind failed:\n{result.stderr}")
+        size = assets.TAILWIND_OUTPUT.stat().st_size
+        self.stdout.write(f"Wrote {assets.TAILWIND_OUTPUT.relative_to(settings.BASE_DIR)} ({size / 1024:.1f} KiB)")
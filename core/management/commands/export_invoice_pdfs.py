@@ -0,0 +1,37 @@
+# core/management/commands/export_invoice_pdfs.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core import pdf
+
+
+def date_arg(value):
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if not parsed:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Writes a ZIP of invoice PDFs, rendering uncached ones in parallel across a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Path of the ZIP file to write.")
+        parser.add_argument('--start', type=date_arg, help="First invoice date (YYYY-MM-DD).")
+        parser.add_argument('--end', type=date_arg, help="Last invoice date (YYYY-MM-DD).")
+        parser.add_argument('--client', type=int, help="Only export invoices of this client id.")
+        parser.add_argument('--processes', type=int, help="Render processes (defaults to the CPU count).")
+
+    def handle(self, *args, **options):
+        invoices = pdf.invoices_for_export(options['start'], options['end'], options['client'])
+        total = invoices.count()
+
+        with open(options['output'], 'wb') as output:
+            for chunk in pdf.export_zip(invoices, processes=options['processes']):
+                output.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {total} invoice PDFs to {options['output']}."))
@@ -0,0 +1,56 @@
+# core/management/commands/import_csv.py
+
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import imports, receipts
+
+
+class Command(BaseCommand):
+    help = "Imports clients, invoices or expenses from a CSV file in validated, bulk-inserted batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=imports.KINDS)
+        parser.add_argument('path', help="CSV file with a header row.")
+        parser.add_argument('--batch-size', type=int, default=imports.BATCH_SIZE)
+        parser.add_argument('--rejects', help="Write rejected rows with their errors to this CSV file.")
+        parser.add_argument(
+            '--on-duplicate', choices=receipts.DUPLICATE_POLICIES,
+            help="Expenses already imported: skip them or import and flag them (default: settings.RECEIPT_DUPLICATES).",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(result):
+            rate = result.processed / max(time.perf_counter() - started, 1e-6)
+            self.stdout.write(
+                f"{result.processed:,} rows processed, {result.imported:,} imported, "
+                f"{len(result.rejected):,} rejected ({rate:,.0f} rows/s)"
+            )
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as csv_file:
+                result = imports.import_csv(
+                    options['kind'], csv_file, options['batch_size'], progress, options['on_duplicate'],
+                )
+        except OSError as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        if options['rejects'] and result.rejected:
+            with open(options['rejects'], 'w', newline='') as rejects_file:
+                # the original columns follow as they were, so the file can be fixed and imported again
+                columns = list(result.rejected[0][2])
+                writer = csv.writer(rejects_file)
+                writer.writerow(['line', 'errors', *columns])
+                for line, errors, row in result.rejected:
+                    writer.writerow([line, errors, *(row.get(column, '') for column in columns)])
+
+        skipped = f", skipped {len(result.skipped):,} duplicates" if result.skipped else ''
+        flagged = f" ({result.flagged:,} flagged as duplicates)" if result.flagged else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.imported:,} {options['kind']}{flagged}{skipped}, "
+            f"rejected {len(result.rejected):,} rows in {time.perf_counter() - started:.1f}s."
+        ))
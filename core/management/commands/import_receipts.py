@@ -0,0 +1,60 @@
+# core/management/commands/import_receipts.py
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import ingest, receipts
+
+REPORT_FIELDS = ['source', 'status', 'title', 'category', 'amount', 'expense_date', 'error']
+
+
+class Command(BaseCommand):
+    help = "Creates expenses from a mailbox export (.mbox), a .zip of receipts, or single .eml/.txt receipts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Files to import.")
+        parser.add_argument('--batch-size', type=int, default=ingest.BATCH_SIZE, help="Receipts per bulk insert.")
+        parser.add_argument('--workers', type=int, help="Parser processes (defaults to the CPU count, 1 parses inline).")
+        parser.add_argument('--report', help="Write a per-receipt CSV report to this path.")
+        parser.add_argument(
+            '--on-duplicate', choices=receipts.DUPLICATE_POLICIES,
+            help="Skip receipts that were already imported, or import and flag them (defaults to RECEIPT_DUPLICATES).",
+        )
+
+    def iter_receipts(self, paths):
+        for path in paths:
+            try:
+                with open(path, 'rb') as receipt_file:
+                    yield from ingest.iter_file(receipt_file, path)
+            except OSError as e:
+                raise CommandError(f"Could not read {path}: {e}")
+
+    def handle(self, *args, **options):
+        report_file = open(options['report'], 'w', newline='') if options['report'] else None
+        writer = csv.DictWriter(report_file, REPORT_FIELDS) if report_file else None
+        if writer:
+            writer.writeheader()
+
+        counts = {'created': 0, 'flagged': 0, 'duplicate': 0, 'failed': 0}
+        try:
+            rows = ingest.ingest(
+                self.iter_receipts(options['paths']),
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                on_duplicate=options['on_duplicate'],
+            )
+            for row in rows:
+                counts[row['status']] += 1
+                if row['status'] == 'failed':
+                    self.stderr.write(f"{row['source']}: {row['error']}")
+                if writer:
+                    writer.writerow(row)
+        finally:
+            if report_file:
+                report_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['created'] + counts['flagged']} expenses ({counts['flagged']} flagged as duplicates), "
+            f"skipped {counts['duplicate']} duplicates, {counts['failed']} receipts could not be parsed."
+        ))
@@ -0,0 +1,71 @@
+# core/management/commands/perf_histograms.py
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from core import perf
+from core.models import RequestTiming
+
+BAR_WIDTH = 40
+
+
+def percentile(buckets, total, fraction):
+    # upper bound of the bucket the percentile falls in
+    seen = 0
+    for le, count in buckets:
+        seen += count
+        if seen >= total * fraction:
+            return le
+    return buckets[-1][0]
+
+
+def bound_label(le):
+    return '+Inf' if le == perf.OVERFLOW else f'{le}ms'
+
+
+class Command(BaseCommand):
+    help = "Prints the per URL name request timing histograms recorded by the performance middleware."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url-name', help="Only this URL name.")
+        parser.add_argument('--buckets', action='store_true', help="Print every histogram bucket too.")
+        parser.add_argument('--reset', action='store_true', help="Delete the recorded timings afterwards.")
+
+    def handle(self, *args, **options):
+        perf.flush()
+        timings = RequestTiming.objects.order_by('url_name', 'le')
+        if options['url_name']:
+            timings = timings.filter(url_name=options['url_name'])
+
+        by_url = defaultdict(list)
+        for timing in timings:
+            by_url[timing.url_name].append(timing)
+        if not by_url:
+            self.stdout.write("No request timings recorded yet.")
+            return
+
+        self.stdout.write(
+            f"{'url name':<32} {'requests':>9} {'mean':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} {'sql':>9}"
+        )
+        for name, rows in sorted(by_url.items(), key=lambda item: -sum(row.total_ms for row in item[1])):
+            count = sum(row.count for row in rows)
+            buckets = [(row.le, row.count) for row in rows]
+            self.stdout.write(
+                f"{name:<32} {count:>9} "
+                f"{sum(row.total_ms for row in rows) / count:>7.1f}ms "
+                f"{bound_label(percentile(buckets, count, 0.5)):>8} "
+                f"{bound_label(percentile(buckets, count, 0.95)):>8} "
+                f"{bound_label(percentile(buckets, count, 0.99)):>8} "
+                f"{sum(row.queries for row in rows) / count:>8.1f} "
+                f"{sum(row.sql_ms for row in rows) / count:>7.1f}ms"
+            )
+            if options['buckets']:
+                widest = max(row.count for row in rows)
+                for row in rows:
+                    bar = '#' * max(1, round(row.count / widest * BAR_WIDTH))
+                    self.stdout.write(f"    <= {bound_label(row.le):>8} {row.count:>9} {bar}")
+
+        if options['reset']:
+            RequestTiming.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS("Request timings reset."))
@@ -0,0 +1,13 @@
+# core/management/commands/rebuild_invoice_rollups.py
+
+from django.core.management.base import BaseCommand
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-month/per-status invoice rollup table used by the dashboard."
+
+    def handle(self, *args, **options):
+        buckets = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt invoice rollups ({buckets} buckets)."))
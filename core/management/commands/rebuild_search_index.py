@@ -0,0 +1,20 @@
+# core/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the SQLite FTS5 index used by the invoice search box."
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.WARNING("Not using SQLite; invoice search uses plain database queries."))
+            return
+        count = search.rebuild()
+        if not search.is_available():
+            self.stdout.write(self.style.ERROR("This SQLite build has no FTS5 support."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} invoices."))
@@ -0,0 +1,76 @@
+# core/management/commands/run_jobs.py
+
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def work(threads, poll_interval, burst, stop):
+    # runs in a spawned child: set up Django there before touching models
+    import django
+    django.setup()
+    from core.jobs import Worker
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent stops the children through `stop`
+    Worker(threads=threads, poll_interval=poll_interval, burst=burst, stop=stop).run()
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the background job queue (PDF exports, receipt and CSV imports) in --processes processes "
+        "of --threads threads each, until stopped with Ctrl-C or SIGTERM. Running jobs finish first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=getattr(settings, 'JOB_WORKER_PROCESSES', 1),
+            help="Worker processes (default: settings.JOB_WORKER_PROCESSES).",
+        )
+        parser.add_argument(
+            '--threads', type=int, default=getattr(settings, 'JOB_WORKER_THREADS', 2),
+            help="Threads per process (default: settings.JOB_WORKER_THREADS).",
+        )
+        parser.add_argument('--poll', type=float, help="Seconds between polls of an idle thread.")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due.")
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        threads = max(1, options['threads'])
+        self.stdout.write(
+            f"Running jobs in {processes} process{'es' if processes > 1 else ''} of {threads} "
+            f"thread{'s' if threads > 1 else ''}, Ctrl-C to stop"
+        )
+
+        if processes == 1:
+            from core.jobs import Worker
+            worker = Worker(threads=threads, poll_interval=options['poll'], burst=options['burst'])
+            self.stop_on_signals(worker.stop)
+            worker.run()
+            return
+
+        # children inherit no open connection, each opens its own
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        stop = context.Event()
+        self.stop_on_signals(stop)
+        children = [
+            context.Process(target=work, args=(threads, options['poll'], options['burst'], stop), name=f'jobs-{number}')
+            for number in range(processes)
+        ]
+        for child in children:
+            child.start()
+        for child in children:
+            while child.is_alive():
+                child.join(0.5)
+
+    def stop_on_signals(self, stop):
+        def handler(signum, frame):
+            if not stop.is_set():
+                self.stdout.write("Stopping after the running jobs...")
+            stop.set()
+
+        signal.signal(signal.SIGINT, handler)
+        signal.signal(signal.SIGTERM, handler)
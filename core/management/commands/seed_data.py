@@ -0,0 +1,43 @@
+# core/management/commands/seed_data.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import seeding
+
+
+class Command(BaseCommand):
+    help = "Bulk inserts synthetic clients, invoices and expenses for load testing (10k to 10M rows)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--invoices', type=int, default=10000)
+        parser.add_argument('--expenses', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=730, help="Spread dates over this many past days.")
+        parser.add_argument('--seed', type=int, default=None, help="Random seed, for repeatable data.")
+        parser.add_argument('--batch-size', type=int, default=seeding.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(kind, count):
+            self.stdout.write(f"  {count:,} {kind} ({time.perf_counter() - started:.1f}s)")
+
+        try:
+            seeding.seed(
+                clients=options['clients'],
+                invoices=options['invoices'],
+                expenses=options['expenses'],
+                days=options['days'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                progress=progress,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['clients']:,} clients, {options['invoices']:,} invoices and "
+            f"{options['expenses']:,} expenses in {time.perf_counter() - started:.1f}s."
+        ))
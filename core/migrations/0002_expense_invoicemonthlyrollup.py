@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:09
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    Invoice = apps.get_model('core', 'Invoice')
+    InvoiceMonthlyRollup = apps.get_model('core', 'InvoiceMonthlyRollup')
+    buckets = Invoice.objects.annotate(
+        month=TruncMonth('created_at')
+    ).values('month', 'status').annotate(total=Sum('amount'), count=Count('id')).order_by()
+    InvoiceMonthlyRollup.objects.bulk_create([
+        InvoiceMonthlyRollup(month=b['month'].date(), status=b['status'], total=b['total'], count=b['count'])
+        for b in buckets
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Expense',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('expense_date', models.DateField()),
+                ('category', models.CharField(blank=True, max_length=50, null=True)),
+                ('receipt', models.FileField(blank=True, null=True, upload_to='receipts/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-expense_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InvoiceMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('status', models.CharField(choices=[('DRAFT', 'Draft'), ('SENT', 'Sent'), ('PAID', 'Paid'), ('CANCELLED', 'Cancelled')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['month'],
+                'constraints': [models.UniqueConstraint(fields=('status', 'month'), name='unique_rollup_status_month')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
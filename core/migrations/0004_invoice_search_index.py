@@ -0,0 +1,41 @@
+from django.db import DatabaseError, migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS core_invoice_search USING fts5(
+                    title, invoice_number, client_name, client_email,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """)
+            cursor.execute("""
+                INSERT INTO core_invoice_search (rowid, title, invoice_number, client_name, client_email)
+                SELECT i.id, i.title, i.invoice_number, c.name, c.email
+                FROM core_invoice i JOIN core_client c ON c.id = i.client_id
+            """)
+    except DatabaseError:
+        # SQLite built without FTS5, search falls back to icontains
+        pass
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS core_invoice_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+# the rules parse_receipt used to hard-code, in their original order
+DEFAULT_RULES = [
+    ('Uber', ['uber'], 'Travel'),
+    ('Amazon', ['amazon', 'order #'], 'Shopping'),
+    ('Google', ['google llc'], 'Software'),
+    ('Starbucks', ['starbucks'], 'Food & Drink'),
+    ('Maxima', ['maxima'], 'Groceries'),
+    ('Iki', ['iki'], 'Groceries'),
+]
+
+
+def seed_rules(apps, schema_editor):
+    VendorRule = apps.get_model('core', 'VendorRule')
+    VendorRule.objects.bulk_create([
+        VendorRule(vendor=vendor, keyword=keyword, category=category, priority=index * 10)
+        for index, (vendor, keywords, category) in enumerate(DEFAULT_RULES)
+        for keyword in keywords
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_invoice_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vendor', models.CharField(max_length=100)),
+                ('keyword', models.CharField(max_length=100)),
+                ('category', models.CharField(max_length=50)),
+                ('priority', models.PositiveIntegerField(default=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['priority', 'vendor'],
+            },
+        ),
+        migrations.RunPython(seed_rules, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@
 from django.db import models
 from django.utils import timezone
 
+from .receipt_engine import fingerprint
+
 
 class Client(models.Model):
     name = models.CharField(max_length=200)
@@ -10,10 +12,16 @@ class Client(models.Model):
     phone = models.CharField(max_length=20, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='client_name_id_idx'),
+        ]
+
 
 class Invoice(models.Model):
     # Invoice status
@@ -43,6 +51,16 @@ class Invoice(models.Model):
 
     class Meta:
         ordering = ['-created_at']  # Shows newest invoices first
+        indexes = [
+            # keyset pagination walks (sort field, id) for every allowed sort_by
+            models.Index(fields=['created_at', 'id'], name='invoice_created_id_idx'),
+            models.Index(fields=['due_date', 'id'], name='invoice_due_id_idx'),
+            models.Index(fields=['amount', 'id'], name='invoice_amount_id_idx'),
+            # covering indexes for reports.py: aging groups the SENT invoices by client,
+            # a statement sums one client's invoices per status
+            models.Index(fields=['status', 'client', 'due_date', 'amount'], name='invoice_aging_idx'),
+            models.Index(fields=['client', 'status', 'due_date', 'amount'], name='invoice_statement_idx'),
+        ]
 
 
 class Expense(models.Model):
@@ -52,9 +70,151 @@ class Expense(models.Model):
     category = models.CharField(max_length=50, blank=True, null=True)
     receipt = models.FileField(upload_to='receipts/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # duplicate detection, see receipt_engine.fingerprint
+    fingerprint = models.CharField(max_length=64, blank=True, null=True, db_index=True, editable=False)
+    is_duplicate = models.BooleanField(default=False)
 
     def __str__(self):
         return f"{self.title} - €{self.amount}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        expense = super().from_db(db, field_names, values)
+        # what the stored fingerprint was made from, to notice edits on save
+        if {'title', 'amount', 'expense_date'} <= set(field_names):
+            expense._saved_identity = expense.identity()
+        return expense
+
+    def identity(self):
+        return self.title, self.amount, self.expense_date
+
+    def save(self, *args, **kwargs):
+        # expenses entered by hand have no receipt text, so only their fields count. an edit of any of
+        # them makes a new one, an untouched receipt expense keeps the one that includes its text
+        identity = self.identity()
+        if not self.fingerprint or identity != getattr(self, '_saved_identity', identity):
+            self.fingerprint = fingerprint(*identity)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'fingerprint'}
+        super().save(*args, **kwargs)
+        self._saved_identity = identity
+
+    class Meta:
+        ordering = ['-expense_date']
+        indexes = [
+            # covering index for the profit and loss report (reports.py), which sums by day and category,
+            # and for date ranges like the forecast's expense history
+            models.Index(fields=['expense_date', 'category', 'amount'], name='expense_date_category_idx'),
+            models.Index(fields=['category', 'expense_date'], name='expense_category_date_idx'),
+        ]
+
+class InvoiceMonthlyRollup(models.Model):
+    # per-month/per-status invoice totals, kept in sync by core/rollups.py
+    month = models.DateField()  # first day of the month the invoice was created in
+    status = models.CharField(max_length=10, choices=Invoice.STATUS_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.month:%b %Y} {self.status}: €{self.total}"
+
+    class Meta:
+        ordering = ['month']
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'month'], name='unique_rollup_status_month'),
+        ]
+
+
+class VendorRule(models.Model):
+    # keyword -> vendor/category rules for the receipt parser, see core/receipts.py
+    vendor = models.CharField(max_length=100)
+    keyword = models.CharField(max_length=100)
+    category = models.CharField(max_length=50)
+    priority = models.PositiveIntegerField(default=100)  # lower wins when several keywords match
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"'{self.keyword}' -> {self.vendor} ({self.category})"
+
+    class Meta:
+        ordering = ['priority', 'vendor']
+
+
+class InvoiceSequence(models.Model):
+    # one counter row per numbering period, see numbering.py
+    key = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.key}: {self.next_value}"
+
+
+class CacheGeneration(models.Model):
+    # a stamp changed whenever data behind a cache goes stale, shared by every process, see generations.py
+    key = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
+
+
+class RequestTiming(models.Model):
+    # one histogram bucket of request durations per URL name, see perf.py
+    url_name = models.CharField(max_length=200)
+    le = models.PositiveIntegerField()  # bucket upper bound in ms
+    count = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    sql_ms = models.FloatField(default=0)
+    queries = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['url_name', 'le'], name='unique_request_timing_bucket'),
+        ]
+
+
+class Job(models.Model):
+    # one unit of background work, claimed and run by `manage.py run_jobs`, see jobs.py
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.PositiveSmallIntegerField(default=100)  # lower runs first
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)  # pushed back between retries
+    locked_until = models.DateTimeField(null=True, blank=True)  # a running job past this lost its worker
+    worker = models.CharField(max_length=100, blank=True)
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
     class Meta:
-        ordering = ['-expense_date']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # the claim query: queued jobs in priority order
+            models.Index(fields=['status', 'priority', 'id'], name='job_claim_idx'),
+        ]
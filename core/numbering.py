@@ -0,0 +1,104 @@
+# core/numbering.py
+
+import re
+import threading
+from string import Formatter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Invoice, InvoiceSequence
+
+DEFAULT_FORMAT = 'INV-{year}-{number:05d}'
+DEFAULT_BLOCK_SIZE = 10
+
+
+def reserve_block(key, size, first=None):
+    """
+    Moves the counter for `key` forward by `size` and returns the reserved range [start, end).
+    Runs in its own short transaction, so the row lock is held only for the increment and a
+    rolled back invoice can never hand its numbers back to another worker.
+    A new counter starts at `first()`, or 1.
+    """
+    with transaction.atomic(durable=True):
+        # the UPDATE comes first: it takes the row lock on PostgreSQL and the write lock on SQLite
+        # before anything is read, so concurrent reservations queue up instead of deadlocking
+        updated = InvoiceSequence.objects.filter(key=key).update(next_value=F('next_value') + size)
+        if not updated:
+            # first number of the period, a concurrent insert of the same row is simply ignored
+            start = first() if first else 1
+            InvoiceSequence.objects.bulk_create([InvoiceSequence(key=key, next_value=start)], ignore_conflicts=True)
+            InvoiceSequence.objects.filter(key=key).update(next_value=F('next_value') + size)
+        end = InvoiceSequence.objects.filter(key=key).values_list('next_value', flat=True).get()
+    return end - size, end
+
+
+def number_pattern(number_format, year):
+    """
+    Regex for the numbers `number_format` gives in `year`, with the number as its group.
+    """
+    pattern = ''
+    for literal, field, spec, _ in Formatter().parse(number_format):
+        pattern += re.escape(literal)
+        if field == 'year':
+            pattern += re.escape(format(year, spec or ''))
+        elif field == 'number':
+            pattern += r'(\d+)'
+    return f'^{pattern}$'
+
+
+def highest_number(number_format, year):
+    # invoices imported or numbered by hand before the year's counter existed, read once per year
+    pattern = number_pattern(number_format, year)
+    numbers = Invoice.objects.filter(invoice_number__regex=pattern).values_list('invoice_number', flat=True)
+    return max((int(re.match(pattern, number).group(1)) for number in numbers.iterator()), default=0)
+
+
+class InvoiceNumberAllocator:
+    """
+    Hands out invoice numbers from blocks reserved in the counter table, one block per period
+    held in memory. Only every `block_size`th number takes the counter's lock, the others are
+    just checked against the invoices, which may have taken a number since (a CSV import).
+    Numbers are unique across processes; unused numbers of a block are skipped when the process exits.
+    A year's counter starts above the highest number already in use for that year.
+    """
+
+    def __init__(self, number_format=None, block_size=None):
+        self.number_format = number_format or getattr(settings, 'INVOICE_NUMBER_FORMAT', DEFAULT_FORMAT)
+        self.block_size = block_size or getattr(settings, 'INVOICE_NUMBER_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+        self.blocks = {}  # key -> [next, end]
+        self.lock = threading.Lock()
+
+    def next_value(self, key, first=None):
+        with self.lock:
+            block = self.blocks.get(key)
+            if block is None or block[0] >= block[1]:
+                block = self.blocks[key] = list(reserve_block(key, self.block_size, first))
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def allocate(self, day=None):
+        year = (day or timezone.localdate()).year
+        # the counter restarts every year
+        first = lambda: highest_number(self.number_format, year) + 1
+        while True:
+            number = self.number_format.format(year=year, number=self.next_value(f'invoice-{year}', first))
+            if not Invoice.objects.filter(invoice_number=number).exists():
+                return number
+
+
+_allocator = None
+
+
+def allocator():
+    global _allocator
+    if _allocator is None:
+        _allocator = InvoiceNumberAllocator()
+    return _allocator
+
+
+def next_invoice_number(day=None):
+    return allocator().allocate(day)
@@ -0,0 +1,82 @@
+# core/pagination.py
+
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+PAGE_SIZE = 25
+
+# how each sortable field's cursor value is read back from its JSON string
+CURSOR_PARSERS = {
+    'created_at': parse_datetime,
+    'due_date': parse_date,
+    'expense_date': parse_date,
+    'amount': Decimal,
+    'client__name': str,
+    'rank': float,  # full-text relevance, see core/search.py
+}
+
+
+def encode_cursor(value, pk):
+    value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    raw = json.dumps([value, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, sort_by):
+    """
+    Returns (value, pk) for a cursor token, or None if it is missing or malformed.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = json.loads(raw)
+        value = CURSOR_PARSERS[sort_by](value)
+        pk = int(pk)
+    except (binascii.Error, ValueError, TypeError, KeyError, InvalidOperation):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+def sort_value(obj, sort_by):
+    # follows 'client__name' style lookups through the already joined relations
+    for attr in sort_by.split('__'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def keyset_page(queryset, sort_by, descending, cursor=None, page_size=PAGE_SIZE):
+    """
+    One page of `queryset` ordered by `sort_by` with the primary key as a stable tiebreak.
+
+    Instead of OFFSET, the page starts right after the (value, pk) pair in `cursor`,
+    so fetching page 1000 costs the same as fetching page 1.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    prefix = '-' if descending else ''
+    queryset = queryset.order_by(f'{prefix}{sort_by}', f'{prefix}pk')
+
+    position = decode_cursor(cursor, sort_by)
+    if position:
+        value, pk = position
+        op = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{sort_by}__{op}': value}) |
+            Q(**{sort_by: value, f'pk__{op}': pk})
+        )
+
+    # one extra row tells us whether there is a next page
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(sort_value(last, sort_by), last.pk)
@@ -0,0 +1,321 @@
+# core/pdf.py
+
+import asyncio
+import functools
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import get_template, render_to_string
+
+from . import perf
+from .models import Invoice
+
+# WeasyPrint (core/pdf_worker.py) is only imported once something is rendered,
+# so the app, its management commands and the tests start on hosts without pango
+TEMPLATE = 'core/invoice_pdf.html'
+STYLESHEET = Path(__file__).resolve().parent / 'static' / 'core' / 'css' / 'invoice_pdf.css'
+
+
+@functools.cache
+def design_version():
+    # editing the PDF template or restyling it changes every cache key
+    digest = hashlib.sha256(Path(get_template(TEMPLATE).origin.name).read_bytes())
+    digest.update(STYLESHEET.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def cache_dir():
+    path = Path(getattr(settings, 'INVOICE_PDF_CACHE_DIR', settings.BASE_DIR / 'pdf_cache'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def version(invoice):
+    """
+    Content hash of everything the PDF shows: the invoice version plus the client's details.
+    Doubles as the ETag and the cache file name.
+    """
+    client = invoice.client
+    parts = [
+        invoice.pk,
+        invoice.updated_at.isoformat(),
+        client.pk,
+        client.name,
+        client.email,
+        client.address or '',
+        design_version(),
+    ]
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def cache_path(invoice):
+    return cache_dir() / f'{invoice.pk}-{version(invoice)}.pdf'
+
+
+def render_html(invoice):
+    return render_to_string(TEMPLATE, {'invoice': invoice})
+
+
+def render(invoice):
+    from .pdf_worker import html_to_pdf
+
+    html = render_html(invoice)
+    with perf.span('pdf'):
+        return html_to_pdf(html)
+
+
+def get_or_render(invoice):
+    """
+    Path of the cached PDF for this invoice version, rendering it first if it isn't on disk yet.
+    """
+    path = cache_path(invoice)
+    if path.exists():
+        return path
+    return store(invoice, render(invoice))
+
+
+def store(invoice, pdf_file):
+    path = cache_path(invoice)
+
+    # write to a temp file and rename, so readers never see a half written PDF
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(pdf_file)
+    os.replace(tmp_name, path)
+
+    purge(invoice.pk, keep=path)
+    return path
+
+
+def purge(invoice_pk, keep=None):
+    """
+    Removes cached PDFs of older versions of an invoice (all of them when `keep` is None).
+    """
+    for stale in cache_dir().glob(f'{invoice_pk}-*.pdf'):
+        if stale != keep:
+            stale.unlink(missing_ok=True)
+
+
+def purge_many(invoice_pks):
+    # purge() for a batch of deleted invoices, one pass over the cache directory
+    pks = {str(pk) for pk in invoice_pks}
+    for cached in cache_dir().glob('*.pdf'):
+        if cached.name.split('-', 1)[0] in pks:
+            cached.unlink(missing_ok=True)
+
+
+def warm(invoice_pk):
+    """
+    Starts rendering the invoice's PDF in render_queue, when one of its processes is idle.
+    Otherwise it is left to the first download, warming never delays a download or queues up.
+    """
+    invoice = Invoice.objects.select_related('client').filter(pk=invoice_pk).first()
+    if invoice is None or cache_path(invoice).exists():
+        return
+    try:
+        future = render_queue.submit(render_html(invoice), limit=render_queue.processes)
+    except RenderQueueFull:
+        return
+    except (ImportError, OSError):  # WeasyPrint or pango missing here, the download reports it
+        return
+
+    def stored(done):
+        if not done.cancelled() and done.exception() is None:
+            store(invoice, done.result())
+
+    future.add_done_callback(stored)
+
+
+def schedule_warm(invoice_pk):
+    """
+    Renders the invoice PDF in the background once the current transaction commits.
+    """
+    transaction.on_commit(lambda: warm(invoice_pk))
+
+
+# bounded rendering, for the async views and warming
+
+class RenderQueueFull(Exception):
+    pass
+
+
+class RenderQueue:
+    """
+    Bounded PDF rendering for the async views. At most `processes` renders run at once in a process
+    pool, so WeasyPrint never holds the event loop's GIL, and up to `backlog` more wait their turn.
+    Past that, render() and submit() raise RenderQueueFull instead of queueing without limit.
+    The pool is started on first use.
+    """
+
+    def __init__(self, processes, backlog):
+        self.processes = processes
+        self.limit = processes + backlog
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.pool = None
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                # spawned, not forked: the server process already runs threads
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self.pool
+
+    def submit(self, html, limit=None):
+        """
+        Starts a render and returns its concurrent.futures.Future. `limit` lowers the number of
+        renders that may already be in flight, its slot is held until the render is done.
+        """
+        with self.lock:
+            if self.in_flight >= min(self.limit, limit or self.limit):
+                raise RenderQueueFull
+            self.in_flight += 1
+        try:
+            from .pdf_worker import html_to_pdf
+
+            future = self.get_pool().submit(html_to_pdf, html)
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(self.release)
+        return future
+
+    def release(self, future=None):
+        with self.lock:
+            self.in_flight -= 1
+
+    async def render(self, html):
+        return await asyncio.wrap_future(self.submit(html))
+
+
+render_queue = RenderQueue(
+    processes=getattr(settings, 'INVOICE_PDF_RENDER_PROCESSES', 2),
+    backlog=getattr(settings, 'INVOICE_PDF_RENDER_BACKLOG', 8),
+)
+
+
+async def aget_or_render(invoice):
+    """
+    get_or_render() for async views: the render waits in render_queue without blocking the event loop.
+    """
+    path = cache_path(invoice)
+    if path.exists():
+        return path
+    html = await sync_to_async(render_html)(invoice)
+    with perf.span('pdf'):
+        pdf_file = await render_queue.render(html)
+    return await sync_to_async(store)(invoice, pdf_file)
+
+
+# bulk export
+
+class _ZipSink:
+    """
+    Write-only file object for ZipFile. It has no tell()/seek(), so zipfile writes a
+    streamable archive, and whatever was written so far can be drained and sent.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def export_filename(invoice):
+    return f'invoice_{invoice.invoice_number}.pdf'
+
+
+def export_zip(invoices, processes=None, progress=None):
+    """
+    Yields a ZIP archive of the invoices' PDFs chunk by chunk, one entry at a time as they finish.
+
+    Cached PDFs are copied from disk, the rest are rendered in parallel in a process pool
+    and written back to the cache. At most a few renders per process are in flight,
+    so memory stays flat however many invoices are exported.
+    `progress(count)` is called with the number of PDFs added so far.
+    """
+    from .pdf_worker import html_to_pdf
+
+    processes = processes or getattr(settings, 'INVOICE_PDF_PROCESSES', None) or os.cpu_count()
+    max_in_flight = processes * 2
+    sink = _ZipSink()
+    added = 0
+
+    def added_one():
+        nonlocal added
+        added += 1
+        if progress:
+            progress(added)
+
+    # spawned, not forked: this runs in job worker and request threads
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive, \
+            ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        pending = {}
+
+        def finish(done):
+            for future in done:
+                invoice = pending.pop(future)
+                pdf_file = future.result()
+                store(invoice, pdf_file)
+                archive.writestr(export_filename(invoice), pdf_file)
+                added_one()
+
+        for invoice in invoices.select_related('client').iterator(chunk_size=200):
+            path = cache_path(invoice)
+            if path.exists():
+                archive.write(path, export_filename(invoice))
+                added_one()
+                yield sink.drain()
+                continue
+
+            pending[pool.submit(html_to_pdf, render_html(invoice))] = invoice
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                finish(done)
+                yield sink.drain()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            finish(done)
+            yield sink.drain()
+
+    # the central directory is written when the archive closes
+    yield sink.drain()
+
+
+def invoices_for_export(start=None, end=None, client_id=None, ids=None):
+    """
+    Invoices created between `start` and `end` (inclusive dates), optionally for one client or only `ids`.
+    """
+    invoices = Invoice.objects.order_by('created_at', 'pk')
+    if ids is not None:
+        invoices = invoices.filter(pk__in=ids)
+    if start:
+        invoices = invoices.filter(created_at__date__gte=start)
+    if end:
+        invoices = invoices.filter(created_at__date__lte=end)
+    if client_id:
+        invoices = invoices.filter(client_id=client_id)
+    return invoices
@@ -0,0 +1,65 @@
+# core/pdf_worker.py
+#
+# The WeasyPrint side of invoice rendering. It also runs inside the bulk export
+# process pool, so it deliberately imports nothing from Django.
+
+import mimetypes
+import threading
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+
+STATIC_DIR = (Path(__file__).resolve().parent / 'static').resolve()
+STYLESHEET = STATIC_DIR / 'core' / 'css' / 'invoice_pdf.css'  # hashed into the cache version by core/pdf.py
+
+# font and image bytes, read from disk once per process
+_assets = {}
+_assets_lock = threading.Lock()
+
+# WeasyPrint objects aren't thread safe, so each render thread keeps its own parsed
+# stylesheet and font configuration and reuses them for every PDF it renders
+_local = threading.local()
+
+
+def url_fetcher(url, *args, **kwargs):
+    """
+    Serves bundled static files from memory and refuses anything on the network,
+    so a render never waits on DNS or an egress timeout.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == 'data':
+        return default_url_fetcher(url, *args, **kwargs)
+    if parsed.scheme != 'file':
+        raise ValueError(f"Remote resources are not fetched for invoice PDFs: {url}")
+
+    path = Path(unquote(parsed.path)).resolve()
+    if not path.is_relative_to(STATIC_DIR):
+        raise ValueError(f"Only bundled static files are fetched for invoice PDFs: {url}")
+
+    with _assets_lock:
+        if path not in _assets:
+            _assets[path] = path.read_bytes()
+    return {
+        'string': _assets[path],
+        'mime_type': mimetypes.guess_type(path.name)[0],
+        'redirected_url': url,
+    }
+
+
+def _render_state():
+    if not hasattr(_local, 'stylesheet'):
+        _local.font_config = FontConfiguration()
+        _local.stylesheet = CSS(
+            filename=str(STYLESHEET),
+            font_config=_local.font_config,
+            url_fetcher=url_fetcher,
+        )
+    return _local.stylesheet, _local.font_config
+
+
+def html_to_pdf(html_string):
+    stylesheet, font_config = _render_state()
+    document = HTML(string=html_string, base_url=STATIC_DIR.as_uri() + '/', url_fetcher=url_fetcher)
+    return document.write_pdf(stylesheets=[stylesheet], font_config=font_config)
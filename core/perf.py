@@ -0,0 +1,287 @@
+# core/perf.py
+
+import atexit
+import heapq
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter, sleep
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import IntegrityError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+
+from .models import RequestTiming
+
+logger = logging.getLogger('core.perf')
+
+# histogram bucket upper bounds in ms, the last bucket catches everything slower
+BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+OVERFLOW = 2 ** 31 - 1
+
+SQL_PREVIEW = 200  # characters of each slow query kept for the log
+
+_current = ContextVar('perf_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self, slow_queries):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest = []  # min-heap of (seconds, sql), at most slow_queries long
+        self.slow_queries = slow_queries
+        self.spans = {}  # name -> seconds
+        self.active = set()
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.sql_time += duration
+        if not self.slow_queries:
+            return
+        entry = (duration, sql[:SQL_PREVIEW])
+        if len(self.slowest) < self.slow_queries:
+            heapq.heappush(self.slowest, entry)
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+
+def _time_query(execute, sql, params, many, context):
+    # installed on every connection, only measures while a request is being timed
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, perf_counter() - start)
+
+
+def _add_query_timer(connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def install_query_timer():
+    """
+    Puts the query timer on every database connection, including the per-thread ones
+    async views get through sync_to_async, so no per-request setup is needed.
+    """
+    connection_created.connect(_add_query_timer, dispatch_uid='core.perf.query_timer')
+    for connection in connections.all(initialized_only=True):
+        _add_query_timer(connection)
+
+
+@contextmanager
+def span(name):
+    """
+    Adds the time spent in the block to the current request's `name` timing.
+    Nested spans of the same name are only counted once; outside a request it does nothing.
+    """
+    stats = _current.get()
+    if stats is None or name in stats.active:
+        yield
+        return
+    stats.active.add(name)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        stats.active.discard(name)
+        stats.spans[name] = stats.spans.get(name, 0.0) + perf_counter() - start
+
+
+def install_template_timer():
+    """
+    Wraps the Django template backend's render so every render()/render_to_string() is timed as 'tpl'.
+    Includes the queries templates trigger (lazy querysets, related lookups).
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'perf_timed', False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        with span('tpl'):
+            return original(self, context, request)
+
+    render.perf_timed = True
+    Template.render = render
+
+
+# per URL name histograms, kept in memory and added to RequestTiming every few seconds by a background thread
+
+def bucket_for(ms):
+    for bound in BUCKETS:
+        if ms <= bound:
+            return bound
+    return OVERFLOW
+
+
+_pending = defaultdict(lambda: [0, 0.0, 0.0, 0])  # (url_name, le) -> [count, total_ms, sql_ms, queries]
+_pending_lock = threading.Lock()
+_flusher = None
+
+
+def record(url_name, total_ms, sql_ms, queries):
+    with _pending_lock:
+        bucket = _pending[(url_name, bucket_for(total_ms))]
+        bucket[0] += 1
+        bucket[1] += total_ms
+        bucket[2] += sql_ms
+        bucket[3] += queries
+
+
+def flush():
+    """
+    Adds the pending histogram counts to RequestTiming with F() updates, like the invoice rollups.
+    """
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return
+    with transaction.atomic():
+        for (url_name, le), (count, total_ms, sql_ms, queries) in pending.items():
+            rows = RequestTiming.objects.filter(url_name=url_name, le=le)
+            changes = dict(
+                count=F('count') + count,
+                total_ms=F('total_ms') + total_ms,
+                sql_ms=F('sql_ms') + sql_ms,
+                queries=F('queries') + queries,
+            )
+            if rows.update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    RequestTiming.objects.create(
+                        url_name=url_name, le=le, count=count,
+                        total_ms=total_ms, sql_ms=sql_ms, queries=queries,
+                    )
+            except IntegrityError:
+                # another process created the bucket first
+                rows.update(**changes)
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception("Could not flush request timings")
+
+
+def _flush_every(interval):
+    while True:
+        sleep(interval)
+        _flush_at_exit()
+        connections.close_all()  # this thread's own connections, not held between flushes
+
+
+def start_flusher(interval):
+    """
+    Writes the histograms every `interval` seconds from a daemon thread, so no request waits on it.
+    One per process, later calls do nothing.
+    """
+    global _flusher
+    with _pending_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_every, args=(interval,), name='perf-flush', daemon=True)
+            _flusher.start()
+
+
+def url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match.route
+
+
+def server_timing(stats, total):
+    metrics = [f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries"']
+    for name, seconds in stats.spans.items():
+        metrics.append(f'{name};dur={seconds * 1000:.1f}')
+    metrics.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(metrics)
+
+
+class PerformanceMiddleware:
+    """
+    Times each request: query count, SQL time and the slowest queries, template and PDF render time
+    and the total time from here on. Results go to a Server-Timing header, one JSON line at DEBUG on the
+    'core.perf' logger and per URL name histograms (see the perf_histograms command).
+    Enabled with PERF_INSTRUMENTATION. Works for sync and async views alike.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.slow_queries = getattr(settings, 'PERF_SLOW_QUERIES', 3)
+        flush_interval = getattr(settings, 'PERF_FLUSH_INTERVAL', 30)
+        install_template_timer()
+        install_query_timer()
+        if flush_interval:
+            start_flusher(flush_interval)
+        atexit.register(_flush_at_exit)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats(self.slow_queries)
+        token = _current.set(stats)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            total = perf_counter() - start
+            _current.reset(token)
+        self.report(request, response, stats, total)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats(self.slow_queries)
+        # sync_to_async copies the context, so queries run in worker threads count here too
+        token = _current.set(stats)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            total = perf_counter() - start
+            _current.reset(token)
+        self.report(request, response, stats, total)
+        return response
+
+    def report(self, request, response, stats, total):
+        """
+        Adds the header, logs and records the request.
+        """
+        response['Server-Timing'] = server_timing(stats, total)
+        name = url_name(request)
+        record(name, total * 1000, stats.sql_time * 1000, stats.queries)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({
+                'url_name': name,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 2),
+                'queries': stats.queries,
+                'sql_ms': round(stats.sql_time * 1000, 2),
+                **{f'{key}_ms': round(seconds * 1000, 2) for key, seconds in stats.spans.items()},
+                'slowest': [
+                    {'ms': round(seconds * 1000, 2), 'sql': sql}
+                    for seconds, sql in sorted(stats.slowest, reverse=True)
+                ],
+            }))
@@ -0,0 +1,193 @@
+# core/receipt_engine.py
+#
+# The receipt parser itself. It also runs inside the batch ingestion process pool,
+# so it deliberately imports nothing from Django.
+
+import hashlib
+import re
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+
+AMOUNT_RE = re.compile(r'€?(\d+\.\d{2})')
+
+# every date pattern carries the one format that parses it
+DATE_FORMATS = {
+    'mon_dd_yyyy': '%b %d, %Y',  # Mmm DD, YYYY
+    'yyyy_mm_dd': '%Y-%m-%d',  # YYYY-MM-DD
+    'dd_mm_yyyy': '%d/%m/%Y',  # DD/MM/YYYY
+}
+DATE_RE = re.compile(
+    r'(?P<mon_dd_yyyy>\b\w{3}\s\d{1,2},\s\d{4}\b)'
+    r'|(?P<yyyy_mm_dd>\d{4}-\d{2}-\d{2})'
+    r'|(?P<dd_mm_yyyy>\d{1,2}/\d{1,2}/\d{4})'
+)
+
+DEFAULT_TITLE = "Unknown Expense"
+DEFAULT_CATEGORY = "Miscellaneous"
+
+
+@dataclass
+class ParsedReceipt:
+    amount: Decimal | None
+    title: str
+    category: str
+    expense_date: date
+    vendor: str | None = None
+    fingerprint: str = ''
+
+
+def fingerprint(vendor, amount, expense_date, text=None):
+    """
+    Normalized identity of a receipt: vendor, amount, date and a hash of the whitespace and
+    case normalized text. The same receipt pasted or imported twice gives the same value.
+    """
+    text_digest = hashlib.sha256(' '.join(text.lower().split()).encode()).hexdigest() if text else ''
+    parts = [
+        ' '.join(str(vendor or '').lower().split()),
+        f'{Decimal(amount):.2f}' if amount is not None else '',
+        expense_date.isoformat() if expense_date else '',
+        text_digest,
+    ]
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over the rule keywords.
+
+    One pass over the text finds every keyword occurrence, including overlapping ones,
+    however many rules there are. Each state remembers the best (lowest) priority of
+    any keyword ending there, so a scan only has to keep a running minimum.
+    """
+
+    def __init__(self, keywords):
+        # keywords: iterable of (keyword, priority, payload)
+        self.goto = [{}]
+        self.best = [None]  # (priority, payload) per state
+
+        for keyword, priority, payload in keywords:
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.best.append(None)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            if self.best[state] is None or priority < self.best[state][0]:
+                self.best[state] = (priority, payload)
+
+        # breadth first: fail links, and fold each state's suffix matches into its best
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                inherited = self.best[self.fail[child]]
+                if inherited and (self.best[child] is None or inherited[0] < self.best[child][0]):
+                    self.best[child] = inherited
+                queue.append(child)
+
+    def best_match(self, text):
+        """
+        The payload of the lowest priority keyword found anywhere in `text`, or None.
+        """
+        goto, fail, best = self.goto, self.fail, self.best
+        found = None
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] and (found is None or best[state][0] < found[0]):
+                found = best[state]
+        return found[1] if found else None
+
+
+class ReceiptParser:
+    """
+    Extracts amount, vendor, category and date from pasted receipt text.
+    Built once from the vendor rules and reused until the rules change.
+    """
+
+    def __init__(self, rules):
+        # rules: iterable of (vendor, keyword, category, priority)
+        self.matcher = KeywordMatcher(
+            (keyword.lower(), priority, (vendor, category))
+            for vendor, keyword, category, priority in rules
+        )
+
+    def parse(self, text, today=None):
+        receipt_text = text.lower()
+        today = today or date.today()
+
+        vendor = None
+        title = DEFAULT_TITLE
+        category = DEFAULT_CATEGORY
+        match = self.matcher.best_match(receipt_text)
+        if match:
+            vendor, category = match
+            title = f"{vendor} Purchase"
+
+        amount = self.parse_amount(receipt_text)
+        found_date = self.parse_date(receipt_text)
+
+        return ParsedReceipt(
+            amount=amount,
+            title=title,
+            category=category,
+            expense_date=found_date or today,
+            vendor=vendor,
+            # a receipt without a date must not fingerprint differently each day
+            fingerprint=fingerprint(vendor, amount, found_date, receipt_text),
+        )
+
+    @staticmethod
+    def parse_amount(receipt_text):
+        # the last 'total' line wins, otherwise the largest amount on the receipt
+        for line in reversed(receipt_text.split('\n')):
+            if 'total' in line and 'subtotal' not in line:
+                amount_match = AMOUNT_RE.search(line)
+                if amount_match and Decimal(amount_match.group(1)):
+                    return Decimal(amount_match.group(1))
+                break
+
+        all_numbers = AMOUNT_RE.findall(receipt_text)
+        if all_numbers:
+            return max(Decimal(n) for n in all_numbers)
+        return None
+
+    @staticmethod
+    def parse_date(receipt_text):
+        # first date in the text that is actually valid for its own format
+        for date_match in DATE_RE.finditer(receipt_text):
+            pattern = date_match.lastgroup
+            try:
+                return datetime.strptime(date_match.group(pattern), DATE_FORMATS[pattern]).date()
+            except ValueError:
+                continue
+        return None
+
+
+# batch ingestion workers, each process compiles the rules once
+
+_worker_parser = None
+
+
+def init_worker(rules):
+    global _worker_parser
+    _worker_parser = ReceiptParser(rules)
+
+
+def parse_many(receipts, today):
+    """
+    Parses a batch of (source, text) pairs in a worker process.
+    """
+    return [(source, _worker_parser.parse(text, today=today)) for source, text in receipts]
@@ -0,0 +1,183 @@
+# core/receipt_files.py
+#
+# Receipt images and PDFs uploaded to the inbox. Uploads are written to disk chunk by chunk as they
+# arrive and hashed on the way, then kept under their SHA-256 (receipts/ab/cd/abcd....pdf), so a file
+# uploaded twice is stored once. Reading their text is left to the import_receipt_file job, see tasks.py.
+
+import hashlib
+import os
+import tempfile
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # optional, without it PDF receipts are stored but not read
+    PdfReader = None
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # optional, without it image receipts are stored but not read
+    pytesseract = None
+
+UPLOAD_TO = 'receipts'  # Expense.receipt's upload_to
+PDF_SUFFIXES = {'.pdf'}
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.webp', '.tif', '.tiff'}
+MAX_PAGES = 10  # receipts are short, longer PDFs are read this far
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def max_size():
+    return getattr(settings, 'RECEIPT_UPLOAD_MAX_SIZE', 20 * 1024 * 1024)
+
+
+def accepted(name):
+    return Path(name).suffix.lower() in PDF_SUFFIXES | IMAGE_SUFFIXES
+
+
+def stored_name(digest, suffix):
+    return f'{UPLOAD_TO}/{digest[:2]}/{digest[2:4]}/{digest}{suffix.lower()}'
+
+
+# writing
+
+class ReceiptWriter:
+    """
+    Writes one file into the store: chunks go to a temporary file next to it while being hashed,
+    finish() then moves it to its content address, or drops it when that file already exists.
+    """
+
+    def __init__(self, name):
+        self.suffix = Path(name).suffix
+        self.digest = hashlib.sha256()
+        self.size = 0
+        partial_dir = Path(default_storage.path(UPLOAD_TO)) / 'partial'
+        partial_dir.mkdir(parents=True, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=partial_dir, suffix='.part', delete=False)
+
+    def write(self, chunk):
+        self.digest.update(chunk)
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def discard(self):
+        self.file.close()
+        os.unlink(self.file.name)
+
+    def finish(self):
+        """
+        (stored name, whether the file is new to the store)
+        """
+        self.file.close()
+        name = stored_name(self.digest.hexdigest(), self.suffix)
+        path = Path(default_storage.path(name))
+        if path.exists():
+            os.unlink(self.file.name)
+            return name, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.file.name, path)  # same filesystem, so never half written
+        return name, True
+
+
+def store(chunks, name):
+    # stores a file given as an iterable of byte chunks, like upload.chunks()
+    writer = ReceiptWriter(name)
+    for chunk in chunks:
+        writer.write(chunk)
+    return writer.finish()
+
+
+class StoredReceipt(UploadedFile):
+    """
+    An uploaded receipt that is already in the store, what request.FILES holds with ReceiptUploadHandler.
+    """
+
+    def __init__(self, name, stored_name, new, content_type, size):
+        super().__init__(None, name, content_type, size)
+        self.stored_name = stored_name
+        self.new = new
+
+    def open(self, mode='rb'):
+        self.file = default_storage.open(self.stored_name, mode)
+        return self
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class ReceiptUploadHandler(FileUploadHandler):
+    """
+    Streams receipt uploads straight into the store instead of memory or a temporary upload file.
+    Files that aren't images or PDFs, or are larger than RECEIPT_UPLOAD_MAX_SIZE, are skipped and
+    their names listed in `skipped`. Must be installed before the request's POST data is read.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.skipped = []
+        self.writer = None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if not accepted(file_name) or (content_length or 0) > max_size():
+            self.skipped.append(file_name)
+            raise SkipFile()
+        self.writer = ReceiptWriter(file_name)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.writer.write(raw_data)
+        if self.writer.size > max_size():
+            self.upload_interrupted()
+            self.skipped.append(self.file_name)
+            raise SkipFile()
+        return None
+
+    def file_complete(self, file_size):
+        name, new = self.writer.finish()
+        self.writer = None
+        return StoredReceipt(self.file_name, name, new, self.content_type, file_size)
+
+    def upload_interrupted(self):
+        if self.writer is not None:
+            self.writer.discard()
+            self.writer = None
+
+
+# reading
+
+def extract_text(name):
+    """
+    Text of a stored receipt, from a PDF's text layer or by OCR of an image.
+    Raises ExtractionError when it can't be read.
+    """
+    suffix = Path(name).suffix.lower()
+    if suffix in PDF_SUFFIXES:
+        if PdfReader is None:
+            raise ExtractionError("Reading PDF receipts needs the pypdf package.")
+        with default_storage.open(name, 'rb') as receipt:
+            try:
+                pages = islice(PdfReader(receipt).pages, MAX_PAGES)
+                return '\n'.join(page.extract_text() or '' for page in pages)
+            except Exception as error:  # pypdf raises a variety of errors for broken files
+                raise ExtractionError(f"Could not read this PDF: {error}") from error
+    if suffix in IMAGE_SUFFIXES:
+        if pytesseract is None:
+            raise ExtractionError("Reading image receipts needs pytesseract and the tesseract program.")
+        with default_storage.open(name, 'rb') as receipt:
+            try:
+                with Image.open(receipt) as image:
+                    return pytesseract.image_to_string(image)
+            except Exception as error:
+                raise ExtractionError(f"Could not read this image: {error}") from error
+    raise ExtractionError("Only images and PDFs can be read.")
@@ -0,0 +1,74 @@
+# core/receipts.py
+
+import threading
+
+from django.conf import settings
+from django.utils.timezone import now
+
+from . import generations
+from .models import Expense, VendorRule
+from .receipt_engine import ReceiptParser
+
+# compiled parser cache, rebuilt when the rules table changes
+
+RULES_GENERATION = 'vendor-rules'  # see generations.py
+
+_cache_lock = threading.Lock()
+_cached_generation = None
+_cached_parser = None
+
+
+def get_parser():
+    global _cached_generation, _cached_parser
+    # one lookup on the generation row, every process notices rule changes on its next parse
+    generation = generations.current(RULES_GENERATION)
+    with _cache_lock:
+        if _cached_parser is None or generation != _cached_generation:
+            _cached_parser = ReceiptParser(rules())
+            _cached_generation = generation
+        return _cached_parser
+
+
+def invalidate():
+    # called by the VendorRule save and delete signals
+    global _cached_parser
+    generations.bump(RULES_GENERATION)
+    with _cache_lock:
+        _cached_parser = None
+
+
+def rules():
+    return list(VendorRule.objects.values_list('vendor', 'keyword', 'category', 'priority'))
+
+
+def parse_receipt_text(text):
+    return get_parser().parse(text, today=now().date())
+
+
+# duplicate receipts
+
+SKIP_DUPLICATES = 'skip'
+FLAG_DUPLICATES = 'flag'
+DUPLICATE_POLICIES = [SKIP_DUPLICATES, FLAG_DUPLICATES]
+
+
+def duplicate_policy(value=None):
+    """
+    What to do with a receipt that was already imported, falling back to settings.RECEIPT_DUPLICATES.
+    """
+    if value in DUPLICATE_POLICIES:
+        return value
+    return getattr(settings, 'RECEIPT_DUPLICATES', SKIP_DUPLICATES)
+
+
+def is_duplicate(fingerprint):
+    # a single lookup on the indexed fingerprint column
+    return Expense.objects.filter(fingerprint=fingerprint).exists()
+
+
+async def ais_duplicate(fingerprint):
+    return await Expense.objects.filter(fingerprint=fingerprint).aexists()
+
+
+def existing_fingerprints(fingerprints):
+    return set(Expense.objects.filter(fingerprint__in=fingerprints).values_list('fingerprint', flat=True))
@@ -0,0 +1,233 @@
+# core/reports.py
+#
+# Accounts-receivable aging, per-client statements and profit and loss. Each comes from grouped
+# queries, aging and statements with a conditional SUM per aging bucket, and is cached until
+# midnight or until an invoice, client or expense changes.
+
+from collections import defaultdict
+from datetime import date, datetime, time as day_start, timedelta
+from decimal import Decimal
+from urllib.parse import quote
+
+from django.core.cache import caches
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from . import generations
+from .models import Expense, Invoice, InvoiceMonthlyRollup
+
+CACHE_ALIAS = 'default'
+GENERATION_KEY = 'reports'  # see generations.py
+
+# (key, label, first day past due, last day past due or None)
+BUCKETS = [
+    ('current', 'Current', None, 0),
+    ('days_1_30', '1–30 days', 1, 30),
+    ('days_31_60', '31–60 days', 31, 60),
+    ('days_61_90', '61–90 days', 61, 90),
+    ('days_over_90', '90+ days', 91, None),
+]
+
+
+def bucket_filters(today):
+    """
+    {bucket key: Q on due_date}, days past due counted from `today`. Not yet due is current.
+    """
+    filters = {}
+    for key, _, first, last in BUCKETS:
+        q = Q()
+        if first is not None:
+            q &= Q(due_date__lte=today - timedelta(days=first))
+        if last is not None:
+            q &= Q(due_date__gte=today - timedelta(days=last))
+        filters[key] = q
+    return filters
+
+
+def bucket_sums(today, only=Q()):
+    # one conditional SUM per bucket, 0 rather than NULL for empty buckets
+    return {
+        key: Sum('amount', filter=only & q, default=Decimal('0'))
+        for key, q in bucket_filters(today).items()
+    }
+
+
+def buckets(values):
+    # [(label, amount)] in bucket order, for the templates
+    return [(label, values[key]) for key, label, _, _ in BUCKETS]
+
+
+def days_past_due(due_date, today):
+    return max(0, (today - due_date).days)
+
+
+# caching
+
+def generation():
+    # changes whenever an invoice, client or expense does, so cached reports are never stale
+    return generations.current(GENERATION_KEY)
+
+
+def invalidate():
+    generations.bump(GENERATION_KEY)
+
+
+def until_midnight():
+    now = timezone.localtime()
+    midnight = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), day_start()))
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def cached(name, today, compute):
+    """
+    `compute()` cached for the rest of `today`, see generation().
+    """
+    cache = caches[CACHE_ALIAS]
+    key = f'reports:{name}:{today.isoformat()}:{generation()}'
+    report = cache.get(key)
+    if report is None:
+        report = compute()
+        cache.set(key, report, until_midnight())
+    return report
+
+
+# reports
+
+def aging(today=None):
+    """
+    Outstanding (SENT) invoices per client, split into aging buckets, largest balances first:
+    {'rows': [{'client_id', 'client__name', 'count', 'total', <bucket>: amount, 'buckets'}], 'totals', 'today'}.
+    """
+    today = today or timezone.localdate()
+
+    def compute():
+        rows = list(
+            Invoice.objects.filter(status=Invoice.SENT)
+            .values('client_id', 'client__name')
+            .annotate(count=Count('id'), total=Sum('amount'), **bucket_sums(today))
+            .order_by('-total', 'client_id')
+        )
+        totals = {key: sum((row[key] for row in rows), Decimal('0')) for key in ['total', *bucket_filters(today)]}
+        totals['count'] = sum(row['count'] for row in rows)
+        for values in [*rows, totals]:
+            values['buckets'] = buckets(values)
+        return {'rows': rows, 'totals': totals, 'today': today}
+
+    return cached('aging', today, compute)
+
+
+def statement(client, today=None):
+    """
+    A client's account: what was billed, paid and is outstanding with its aging buckets, from one
+    aggregate query, and the open invoices oldest due first.
+    """
+    today = today or timezone.localdate()
+
+    def compute():
+        open_invoices = Q(status=Invoice.SENT)
+        summary = Invoice.objects.filter(client=client).aggregate(
+            billed=Sum('amount', filter=Q(status__in=[Invoice.SENT, Invoice.PAID]), default=Decimal('0')),
+            paid=Sum('amount', filter=Q(status=Invoice.PAID), default=Decimal('0')),
+            outstanding=Sum('amount', filter=open_invoices, default=Decimal('0')),
+            open_count=Count('id', filter=open_invoices),
+            invoice_count=Count('id'),
+            **bucket_sums(today, open_invoices),
+        )
+        summary['buckets'] = buckets(summary)
+        lines = [
+            {**line, 'days_past_due': days_past_due(line['due_date'], today)}
+            for line in Invoice.objects.filter(client=client, status=Invoice.SENT)
+            .order_by('due_date', 'id')
+            .values('id', 'invoice_number', 'title', 'due_date', 'amount')
+        ]
+        return {'summary': summary, 'lines': lines, 'today': today}
+
+    return cached(f'statement:{client.pk}', today, compute)
+
+
+# profit and loss
+
+PERIODS = ['month', 'quarter', 'year']
+UNCATEGORIZED = 'Uncategorized'
+CENT = Decimal('0.01')
+
+
+def cents(amount):
+    return Decimal(amount).quantize(CENT)
+
+
+def period_start(day, period):
+    if period == 'quarter':
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    if period == 'year':
+        return date(day.year, 1, 1)
+    return date(day.year, day.month, 1)
+
+
+def period_label(start, period):
+    if period == 'quarter':
+        return f'{start.year} Q{(start.month - 1) // 3 + 1}'
+    if period == 'year':
+        return str(start.year)
+    return start.strftime('%b %Y')
+
+
+def profit_and_loss(period='month', category=None, today=None):
+    """
+    PAID income (by the month invoices were created in, like the dashboard), expenses per category
+    (only `category` when given) and net per month, quarter or year, newest first:
+    {'rows': [{'start', 'label', 'income', 'expenses': {category: amount}, 'expense_total', 'net'}],
+     'categories': [category, ...] largest first, 'totals', 'period'}.
+    """
+    today = today or timezone.localdate()
+
+    def compute():
+        # income from the rollup table; expenses summed per day and category in index order (a
+        # covering index scan, no sort) and folded into periods here, TruncMonth would run per row
+        income = InvoiceMonthlyRollup.objects.filter(status=Invoice.PAID).values_list('month', 'total')
+        expenses = Expense.objects.all()
+        if category == UNCATEGORIZED:
+            expenses = expenses.filter(Q(category__isnull=True) | Q(category=''))
+        elif category:
+            expenses = expenses.filter(category=category)  # the (category, expense_date) index
+        expenses = expenses.values_list('expense_date', 'category').annotate(total=Sum('amount')).order_by()
+
+        rows = defaultdict(lambda: {'income': Decimal('0'), 'expenses': defaultdict(Decimal)})
+        category_totals = defaultdict(Decimal)
+        for month, total in income:
+            rows[period_start(month, period)]['income'] += cents(total)
+        for day, name, total in expenses:
+            name = name or UNCATEGORIZED
+            total = cents(total)  # SQLite sums decimals as floats
+            rows[period_start(day, period)]['expenses'][name] += total
+            category_totals[name] += total
+
+        report = []
+        for start in sorted(rows, reverse=True):
+            row = rows[start]
+            expense_total = sum(row['expenses'].values(), Decimal('0'))
+            report.append({
+                'start': start,
+                'label': period_label(start, period),
+                'income': row['income'],
+                'expenses': dict(row['expenses']),
+                'expense_total': expense_total,
+                'net': row['income'] - expense_total,
+            })
+        income_total = sum((row['income'] for row in report), Decimal('0'))
+        expense_total = sum(category_totals.values(), Decimal('0'))
+        return {
+            'period': period,
+            'rows': report,
+            'category': category,
+            'categories': sorted(category_totals, key=lambda name: -category_totals[name]),
+            'totals': {
+                'income': income_total,
+                'expenses': dict(category_totals),
+                'expense_total': expense_total,
+                'net': income_total - expense_total,
+            },
+        }
+
+    # quoted, cache backends like memcached reject keys with spaces
+    return cached(f'pnl:{period}:{quote(category or "")}', today, compute)
@@ -0,0 +1,217 @@
+# core/rollups.py
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import live
+from .models import Invoice, InvoiceMonthlyRollup
+
+
+def invoice_month(created_at):
+    """
+    The rollup bucket an invoice belongs to, matching TruncMonth('created_at').
+    """
+    return timezone.localtime(created_at).date().replace(day=1)
+
+
+def snapshot(invoice):
+    """
+    The (month, status, amount) triple an invoice instance contributes.
+    """
+    return invoice_month(invoice.created_at), invoice.status, Decimal(invoice.amount)
+
+
+def apply_deltas(deltas):
+    """
+    Applies {(month, status): (amount, count)} to the rollup table.
+    Each bucket is one UPDATE with F() expressions, so concurrent writers don't lose increments.
+    """
+    with transaction.atomic():
+        for (month, status), (amount, count) in deltas.items():
+            if not amount and not count:
+                continue
+            rows = InvoiceMonthlyRollup.objects.filter(month=month, status=status)
+            if rows.update(total=F('total') + amount, count=F('count') + count):
+                continue
+            try:
+                with transaction.atomic():
+                    InvoiceMonthlyRollup.objects.create(month=month, status=status, total=amount, count=count)
+            except IntegrityError:
+                # another request created the bucket first
+                rows.update(total=F('total') + amount, count=F('count') + count)
+        transaction.on_commit(publish_dashboard, robust=True)
+
+
+def stored_snapshot(invoice):
+    """
+    snapshot() of the invoice as it is in the database, None for a new one. Inside a transaction the
+    row stays locked until commit, so concurrent edits each move the amount they actually replaced.
+    """
+    if invoice._state.adding or invoice.pk is None:
+        return None
+    rows = Invoice.objects.filter(pk=invoice.pk)
+    if transaction.get_connection().in_atomic_block:
+        rows = rows.select_for_update()
+    row = rows.values_list('created_at', 'status', 'amount').first()
+    if row is None:
+        return None
+    created_at, status, amount = row
+    return invoice_month(created_at), status, Decimal(amount)
+
+
+def record_created(invoice):
+    month, status, amount = snapshot(invoice)
+    apply_deltas({(month, status): (amount, 1)})
+
+
+def record_deleted(invoice):
+    month, status, amount = snapshot(invoice)
+    apply_deltas({(month, status): (-amount, -1)})
+
+
+def record_changed(before, invoice):
+    """
+    Moves an invoice's contribution from its old bucket to its new one (status transitions, amount edits).
+    """
+    after = snapshot(invoice)
+    if before == after:
+        return
+    deltas = defaultdict(lambda: (Decimal('0'), 0))
+    for (month, status, amount), sign in ((before, -1), (after, 1)):
+        total, count = deltas[(month, status)]
+        deltas[(month, status)] = (total + sign * amount, count + sign)
+    apply_deltas(deltas)
+
+
+def record_batch(rows, status=None):
+    """
+    Applies a set-based UPDATE or DELETE as one batch of deltas: `rows` are the (created_at, status, amount)
+    of the affected invoices before it, moved to `status`, or deleted when `status` is None.
+    """
+    deltas = defaultdict(lambda: (Decimal('0'), 0))
+    for created_at, old_status, amount in rows:
+        month = invoice_month(created_at)
+        moves = [(old_status, -1)] + ([(status, 1)] if status else [])
+        for bucket_status, sign in moves:
+            total, count = deltas[(month, bucket_status)]
+            deltas[(month, bucket_status)] = (total + sign * amount, count + sign)
+    apply_deltas(deltas)
+
+
+def rebuild():
+    """
+    Recomputes the whole rollup table from Invoice in one grouped query.
+    """
+    buckets = Invoice.objects.annotate(
+        month=TruncMonth('created_at')
+    ).values(
+        'month', 'status'
+    ).annotate(
+        total=Sum('amount'), count=Count('id')
+    ).order_by()
+
+    rows = [
+        InvoiceMonthlyRollup(
+            month=bucket['month'].date(),
+            status=bucket['status'],
+            total=bucket['total'],
+            count=bucket['count'],
+        )
+        for bucket in buckets
+    ]
+    with transaction.atomic():
+        InvoiceMonthlyRollup.objects.all().delete()
+        InvoiceMonthlyRollup.objects.bulk_create(rows)
+        transaction.on_commit(publish_dashboard, robust=True)
+    return len(rows)
+
+
+def dashboard_rows():
+    return InvoiceMonthlyRollup.objects.filter(
+        status__in=[Invoice.PAID, Invoice.SENT]
+    ).values_list('month', 'status', 'total')
+
+
+def summarize(rows, since):
+    """
+    Totals for the dashboard cards plus PAID income per month from `since` onwards.
+    """
+    total_income = Decimal('0.00')
+    total_outstanding = Decimal('0.00')
+    monthly_income = defaultdict(Decimal)
+
+    for month, status, total in rows:
+        if status == Invoice.PAID:
+            total_income += total
+            if month >= since:
+                monthly_income[month] += total
+        else:
+            total_outstanding += total
+
+    return total_income, total_outstanding, monthly_income
+
+
+def dashboard_summary(since):
+    # all read from the rollup table in a single query
+    return summarize(dashboard_rows(), since)
+
+
+TAX_RATE = Decimal('0.25')
+CHART_MONTHS = 6
+
+
+def chart_start():
+    # the first day of the month 6 months ago from today
+    return date.today().replace(day=1) - relativedelta(months=CHART_MONTHS - 1)
+
+
+def dashboard_context(since, total_income, total_outstanding, income_by_month):
+    # to format the data for Chart.js
+    chart_labels = []
+    chart_data = []
+    for i in range(CHART_MONTHS):
+        current_month = since + relativedelta(months=i)
+        chart_labels.append(current_month.strftime('%b %Y'))
+        chart_data.append(float(income_by_month.get(current_month, 0)))
+
+    return {
+        'total_income': total_income,
+        'total_outstanding': total_outstanding,
+        'tax_pool': total_income * TAX_RATE,
+        'chart_labels': chart_labels,
+        'chart_data': chart_data,
+    }
+
+
+def dashboard():
+    """
+    The dashboard cards (income, outstanding, tax pool) and the income chart for the last 6 months.
+    """
+    since = chart_start()
+    return dashboard_context(since, *dashboard_summary(since))
+
+
+async def adashboard():
+    """
+    dashboard() for async views, read with the async ORM.
+    """
+    since = chart_start()
+    rows = [row async for row in dashboard_rows()]
+    return dashboard_context(since, *summarize(rows, since))
+
+
+def publish_dashboard():
+    """
+    Pushes the dashboard's changed values to the dashboards connected to this process, see live.py.
+    Nothing is computed while nobody is listening.
+    """
+    if live.broker.has_subscribers():
+        live.broker.publish(live.dashboard_state(dashboard()))
@@ -0,0 +1,143 @@
+# core/search.py
+
+import re
+
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLE = 'core_invoice_search'
+
+CREATE_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        title, invoice_number, client_name, client_email,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+"""
+
+# the FTS rowid is always the invoice id, so matches join straight back to core_invoice
+REBUILD_SQL = f"""
+    INSERT INTO {TABLE} (rowid, title, invoice_number, client_name, client_email)
+    SELECT i.id, i.title, i.invoice_number, c.name, c.email
+    FROM core_invoice i JOIN core_client c ON c.id = i.client_id
+"""
+
+_available = None
+
+
+def is_available():
+    """
+    True when the default database is SQLite and the FTS5 table exists.
+    Checked once per process; anything else uses the plain icontains search.
+    """
+    global _available
+    if _available is None:
+        _available = (
+            connection.vendor == 'sqlite'
+            and TABLE in connection.introspection.table_names()
+        )
+    return _available
+
+
+def match_expression(text):
+    """
+    Turns free text into an FTS5 query where every word is a quoted prefix term, e.g. 'acme inv' -> '"acme"* "inv"*'.
+    Quoting keeps user input from being read as FTS5 operators.
+    """
+    words = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def filter_invoices(invoices, text):
+    """
+    Returns (queryset, ranked): the invoices matching `text` and whether a relevance `rank` annotation is available.
+    """
+    expression = match_expression(text) if is_available() else ''
+    if not expression:
+        # fallback: the original LIKE search
+        return invoices.filter(
+            Q(title__icontains=text) |
+            Q(client__name__icontains=text)
+        ), False
+
+    rank = RawSQL(
+        f'SELECT rank FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid = core_invoice.id',
+        (expression,),
+    )
+    matches = RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', (expression,))
+    return invoices.filter(id__in=matches).annotate(rank=rank), True
+
+
+def index_invoice(invoice):
+    if not is_available():
+        return
+    client = invoice.client
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [invoice.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, title, invoice_number, client_name, client_email) VALUES (%s, %s, %s, %s, %s)',
+            [invoice.pk, invoice.title, invoice.invoice_number, client.name, client.email],
+        )
+
+
+def index_invoices(pks):
+    """
+    Indexes invoices created without signals (bulk_create) in one statement.
+    """
+    if not is_available() or not pks:
+        return
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', list(pks))
+        cursor.execute(REBUILD_SQL + f' WHERE i.id IN ({placeholders})', list(pks))
+
+
+def remove_invoice(pk):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [pk])
+
+
+def remove_invoices(pks):
+    if not is_available() or not pks:
+        return
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', list(pks))
+
+
+def index_client(client):
+    """
+    Refreshes the client columns on every invoice row of this client.
+    """
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {TABLE} SET client_name = %s, client_email = %s '
+            f'WHERE rowid IN (SELECT id FROM core_invoice WHERE client_id = %s)',
+            [client.name, client.email, client.pk],
+        )
+
+
+def rebuild():
+    """
+    Creates the FTS5 table if needed and refills it from Invoice/Client. Returns the number of indexed invoices.
+    """
+    global _available
+    if connection.vendor != 'sqlite':
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_TABLE_SQL)
+            cursor.execute(f'DELETE FROM {TABLE}')
+            cursor.execute(REBUILD_SQL)
+            cursor.execute(f'SELECT count(*) FROM {TABLE}')
+            count = cursor.fetchone()[0]
+    except DatabaseError:
+        # SQLite built without FTS5
+        return 0
+    _available = True
+    return count
@@ -0,0 +1,153 @@
+# core/seeding.py
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import reports, rollups, search
+from .imports import backdate
+from .models import Client, Expense, Invoice
+from .numbering import reserve_block
+from .receipt_engine import fingerprint
+
+BATCH_SIZE = 5000
+
+COMPANY_WORDS = [
+    'Acme', 'Baltic', 'Nordic', 'Vilnius', 'Amber', 'Summit', 'Harbor', 'Pine', 'Granite', 'Orbit',
+    'Cedar', 'Atlas', 'Lumen', 'Vertex', 'Meadow', 'Falcon', 'Riverside', 'Copper', 'Aurora', 'Oak',
+]
+COMPANY_SUFFIXES = ['Studio', 'Labs', 'Consulting', 'Digital', 'Media', 'Logistics', 'Group', 'Works', 'UAB', 'Ltd']
+STREETS = ['Gedimino pr.', 'Konstitucijos pr.', 'Vilniaus g.', 'Laisvės al.', 'Savanorių pr.', 'Pylimo g.']
+CITIES = ['Vilnius', 'Kaunas', 'Klaipėda', 'Šiauliai', 'Riga', 'Tallinn']
+
+INVOICE_TITLES = [
+    'Website redesign', 'Monthly retainer', 'Logo design', 'SEO audit', 'Hosting and maintenance',
+    'Mobile app sprint', 'Copywriting', 'Photography session', 'Consulting hours', 'Data migration',
+    'Brand guidelines', 'Newsletter templates', 'Landing page', 'UX research', 'Support contract',
+]
+# weighted like a real book: mostly paid, some open, few drafts and cancellations
+STATUSES = [(Invoice.PAID, 55), (Invoice.SENT, 25), (Invoice.DRAFT, 12), (Invoice.CANCELLED, 8)]
+
+EXPENSE_VENDORS = [
+    ('Uber', 'Travel'), ('Bolt', 'Travel'), ('Amazon', 'Shopping'), ('Google', 'Software'),
+    ('Adobe', 'Software'), ('Starbucks', 'Food & Drink'), ('Maxima', 'Groceries'), ('Iki', 'Groceries'),
+    ('Telia', 'Utilities'), ('Ryanair', 'Travel'), ('Hetzner', 'Hosting'), ('Wolt', 'Food & Drink'),
+]
+
+
+def chunk_sizes(total, batch_size):
+    while total > 0:
+        yield min(total, batch_size)
+        total -= batch_size
+
+
+def random_datetime(rng, days):
+    moment = timezone.now() - timedelta(days=rng.random() * days)
+    return moment.replace(microsecond=0)
+
+
+def seed_clients(count, rng, batch_size=BATCH_SIZE, progress=None):
+    # emails continue after the highest id so repeated runs never collide
+    start = (Client.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+    created = 0
+    for size in chunk_sizes(count, batch_size):
+        clients = []
+        for number in range(start + created, start + created + size):
+            name = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+            clients.append(Client(
+                name=name,
+                email=f"billing{number}@{name.split()[0].lower()}-{number}.example.com",
+                phone=f"+370 6{rng.randint(0, 9999999):07d}",
+                address=f"{rng.choice(STREETS)} {rng.randint(1, 150)}, {rng.choice(CITIES)}",
+            ))
+        with transaction.atomic():
+            Client.objects.bulk_create(clients)
+        created += size
+        if progress:
+            progress('clients', created)
+    return created
+
+
+def seed_invoices(count, rng, days=730, batch_size=BATCH_SIZE, progress=None):
+    if not count:
+        return 0
+    client_ids = list(Client.objects.values_list('id', flat=True))
+    if not client_ids:
+        raise ValueError("Seed some clients first.")
+    statuses, weights = zip(*STATUSES)
+    # one reserved block, seeded numbers never clash with the real INV- sequence
+    first, _ = reserve_block('seed', count)
+    created = 0
+    for size in chunk_sizes(count, batch_size):
+        invoices = []
+        dated = []
+        for number in range(first + created, first + created + size):
+            created_at = random_datetime(rng, days)
+            # localtime like the rollups, so due dates follow the invoice's own day
+            created_day = timezone.localtime(created_at).date()
+            invoice = Invoice(
+                client_id=rng.choice(client_ids),
+                title=rng.choice(INVOICE_TITLES),
+                invoice_number=f'SEED-{number:08d}',
+                due_date=created_day + timedelta(days=rng.choice([7, 14, 30, 45])),
+                amount=Decimal(round(rng.lognormvariate(6.5, 0.9), 2)).quantize(Decimal('0.01')),
+                status=rng.choices(statuses, weights)[0],
+            )
+            invoices.append(invoice)
+            dated.append((invoice, created_at))
+        with transaction.atomic():
+            Invoice.objects.bulk_create(invoices)
+            backdate(Invoice, dated)
+        created += size
+        if progress:
+            progress('invoices', created)
+    return created
+
+
+def seed_expenses(count, rng, days=730, batch_size=BATCH_SIZE, progress=None):
+    created = 0
+    for size in chunk_sizes(count, batch_size):
+        expenses = []
+        dated = []
+        for _ in range(size):
+            vendor, category = rng.choice(EXPENSE_VENDORS)
+            created_at = random_datetime(rng, days)
+            title = f'{vendor} Purchase'
+            amount = Decimal(round(rng.lognormvariate(3, 1), 2)).quantize(Decimal('0.01'))
+            expense_date = timezone.localtime(created_at).date()
+            expense = Expense(
+                title=title,
+                amount=amount,
+                expense_date=expense_date,
+                category=category,
+                fingerprint=fingerprint(title, amount, expense_date),
+            )
+            expenses.append(expense)
+            dated.append((expense, created_at))
+        with transaction.atomic():
+            Expense.objects.bulk_create(expenses)
+            backdate(Expense, dated)
+        created += size
+        if progress:
+            progress('expenses', created)
+    return created
+
+
+def seed(clients=0, invoices=0, expenses=0, days=730, seed=None, batch_size=BATCH_SIZE, progress=None):
+    """
+    Bulk inserts synthetic clients, invoices and expenses spread over the last `days` days,
+    then rebuilds the dashboard rollups and the search index once and drops cached reports.
+    The same `seed` gives the same data.
+    """
+    rng = random.Random(seed)
+    seed_clients(clients, rng, batch_size, progress)
+    seed_invoices(invoices, rng, days, batch_size, progress)
+    seed_expenses(expenses, rng, days, batch_size, progress)
+    if invoices:
+        rollups.rebuild()
+        search.rebuild()
+    reports.invalidate()
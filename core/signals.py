@@ -0,0 +1,122 @@
+# core/signals.py
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import fragments, pdf, receipts, reports, rollups, search
+from .models import Client, Expense, Invoice, VendorRule
+
+_batch_delete = ContextVar('invoice_batch_delete', default=False)
+
+
+@contextmanager
+def batch_delete():
+    """
+    Invoices deleted inside skip the per-row post_delete receivers below,
+    the caller updates the rollups, search index, PDF cache, row cache and reports once for the batch.
+    """
+    token = _batch_delete.set(True)
+    try:
+        yield
+    finally:
+        _batch_delete.reset(token)
+
+
+def in_batch_delete(sender):
+    return sender is Invoice and _batch_delete.get()
+
+
+# keeping the dashboard rollups in sync, for every save and delete (admin and client cascades included);
+# set-based updates, bulk inserts and batch deletes call rollups.record_batch/apply_deltas themselves
+@receiver(pre_save, sender=Invoice)
+def remember_invoice_bucket(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._rollup_before = rollups.stored_snapshot(instance)
+
+
+@receiver(post_save, sender=Invoice)
+def update_invoice_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = instance.__dict__.pop('_rollup_before', None)
+    if before is None:
+        rollups.record_created(instance)
+    else:
+        rollups.record_changed(before, instance)
+
+
+@receiver(post_delete, sender=Invoice)
+def remove_invoice_from_rollups(sender, instance, **kwargs):
+    if in_batch_delete(sender):
+        return
+    rollups.record_deleted(instance)
+
+
+# keeping the full-text search index in sync
+@receiver(post_save, sender=Invoice)
+def index_invoice(sender, instance, **kwargs):
+    search.index_invoice(instance)
+
+
+@receiver(post_delete, sender=Invoice)
+def unindex_invoice(sender, instance, **kwargs):
+    if in_batch_delete(sender):
+        return
+    search.remove_invoice(instance.pk)
+
+
+@receiver(post_save, sender=Client)
+def index_client(sender, instance, created, **kwargs):
+    if not created:
+        search.index_client(instance)
+
+
+# warming and dropping cached invoice PDFs
+@receiver(post_save, sender=Invoice)
+def warm_invoice_pdf(sender, instance, **kwargs):
+    pdf.schedule_warm(instance.pk)
+
+
+@receiver(post_delete, sender=Invoice)
+def purge_invoice_pdf(sender, instance, **kwargs):
+    if in_batch_delete(sender):
+        return
+    pdf.purge(instance.pk)
+
+
+# recompiling the receipt parser when its rules change
+@receiver(post_save, sender=VendorRule)
+@receiver(post_delete, sender=VendorRule)
+def invalidate_receipt_parser(sender, **kwargs):
+    receipts.invalidate()
+
+
+# dropping cached list rows, a save would also be caught by the version check
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_invoice_row(sender, instance, **kwargs):
+    if in_batch_delete(sender):
+        return
+    fragments.invalidate('invoice', instance.pk)
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def invalidate_expense_row(sender, instance, **kwargs):
+    fragments.invalidate('expense', instance.pk)
+
+
+# aging report and statements show invoice amounts and client names, profit and loss expenses too
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def invalidate_reports(sender, **kwargs):
+    if in_batch_delete(sender):
+        return
+    reports.invalidate()
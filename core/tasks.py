@@ -0,0 +1,121 @@
+# core/tasks.py
+#
+# The background jobs behind the slow views, run by `manage.py run_jobs`, see jobs.py.
+
+import codecs
+import json
+import os
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+from django.utils.timezone import now
+
+from . import imports, ingest, jobs, pdf, receipt_files, receipts
+
+# imports commit batch by batch, so a retry would run the file again from the top and insert the
+# rows without a unique key (expenses) twice: they run once and a failure is reported instead
+IMPORT_ATTEMPTS = 1
+
+REPORT_ROWS = 200  # report rows kept in a job's result, the counts always cover everything
+PROGRESS_EVERY = 50  # PDFs between progress updates
+
+
+def as_json(value):
+    # dates and decimals as the strings DjangoJSONEncoder makes of them
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+
+@jobs.task('export_invoice_pdfs', priority=50, template='core/partials/job_download.html')
+def export_invoice_pdfs(job, start=None, end=None, client_id=None, ids=None):
+    invoices = pdf.invoices_for_export(parse_date(start or ''), parse_date(end or ''), client_id, ids)
+    total = invoices.count()
+
+    def progress(count):
+        if count % PROGRESS_EVERY == 0:
+            jobs.set_progress(job, count, total, f"{count:,} of {total:,} PDFs")
+
+    path = jobs.result_path(job, f'invoices_{now():%Y%m%d}.zip')
+    with open(path, 'wb') as archive:
+        for chunk in pdf.export_zip(invoices, progress=progress):
+            archive.write(chunk)
+    return jobs.file_result(path, count=total)
+
+
+def receipt_report_context(result):
+    for row in result['report']:
+        row['expense_date'] = parse_date(row['expense_date'] or '')
+    return result
+
+
+@jobs.task('import_receipts', max_attempts=IMPORT_ATTEMPTS, template='core/partials/receipt_import_report.html',
+           context=receipt_report_context)
+def import_receipts(job, path, name, on_duplicate=None):
+    report = []
+    counts = {'created': 0, 'duplicates': 0, 'failed': 0}
+    with open(path, 'rb') as upload:
+        size = os.fstat(upload.fileno()).st_size
+        for number, row in enumerate(ingest.ingest(ingest.iter_file(upload, name), on_duplicate=on_duplicate), 1):
+            counts['created'] += row['status'] in ('created', 'flagged')
+            counts['duplicates'] += row['status'] in ('duplicate', 'flagged')
+            counts['failed'] += row['status'] == 'failed'
+            if len(report) < REPORT_ROWS:
+                report.append(row)
+            if number % ingest.BATCH_SIZE == 0:
+                jobs.set_progress(job, upload.tell(), size, f"{number:,} receipts")
+    os.remove(path)
+    return as_json({'report': report, **counts})
+
+
+@jobs.task('import_receipt_file', priority=20, template='core/partials/receipt_import_report.html',
+           context=receipt_report_context)
+def import_receipt_file(job, stored_name, name, on_duplicate=None):
+    """
+    Reads an uploaded receipt image or PDF and creates its expense, parsed like a pasted receipt
+    (receipts.parse_receipt_text) with the file attached. The file stays in the store either way.
+    """
+    jobs.set_progress(job, 0, message=f"Reading {name}")
+    try:
+        text = receipt_files.extract_text(stored_name)
+        if not text.strip():
+            raise receipt_files.ExtractionError("No text found in this file.")
+    except receipt_files.ExtractionError as error:
+        row = {'source': name, 'title': '', 'category': '', 'amount': None, 'expense_date': None,
+               'status': 'failed', 'error': str(error)}
+    else:
+        parsed = receipts.parse_receipt_text(text)
+        row, = ingest.save_batch([(name, parsed)], receipts.duplicate_policy(on_duplicate), files={name: stored_name})
+    return as_json({
+        'report': [row],
+        'created': int(row['status'] in ('created', 'flagged')),
+        'duplicates': int(row['status'] in ('duplicate', 'flagged')),
+        'failed': int(row['status'] == 'failed'),
+    })
+
+
+def data_import_context(result):
+    return {**result, 'result': result}
+
+
+@jobs.task('import_csv', max_attempts=IMPORT_ATTEMPTS, template='core/partials/data_import_report.html',
+           context=data_import_context)
+def import_csv(job, path, kind, on_duplicate=None):
+    with open(path, 'rb') as upload:
+        size = os.fstat(upload.fileno()).st_size
+
+        def progress(result):
+            jobs.set_progress(job, upload.tell(), size, f"{result.processed:,} rows")
+
+        result = imports.import_csv(
+            kind, codecs.iterdecode(upload, 'utf-8-sig'), progress=progress, on_duplicate=on_duplicate,
+        )
+    os.remove(path)
+    return as_json({
+        'kind': kind,
+        'imported': result.imported,
+        'processed': result.processed,
+        'rejected_count': len(result.rejected),
+        'rejected': result.rejected[:REPORT_ROWS],
+        'skipped_count': len(result.skipped),
+        'skipped': result.skipped[:REPORT_ROWS],
+        'flagged': result.flagged,
+    })
@@ -1,3 +1,1464 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import warnings
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from . import assets, exports, forecast, fragments, generations, imports, jobs, live, pdf, perf, receipt_files, receipts, reports, rollups, search
+from .management.commands.benchmark_receipt_parser import TODAY, check, load_corpus
+from .models import CacheGeneration, Client, Expense, Invoice, InvoiceMonthlyRollup, InvoiceSequence, Job, RequestTiming, VendorRule
+from .numbering import InvoiceNumberAllocator
+from .pagination import encode_cursor, keyset_page, sort_value
+from .receipt_engine import KeywordMatcher, ReceiptParser
+from .receipts import get_parser
+from .seeding import seed_clients, seed_expenses, seed_invoices
+
+
+class KeywordMatcherTests(TestCase):
+    def test_lowest_priority_wins_regardless_of_position(self):
+        matcher = KeywordMatcher([('amazon', 20, 'amazon'), ('uber', 10, 'uber')])
+        self.assertEqual(matcher.best_match('amazon order delivered by uber'), 'uber')
+
+    def test_overlapping_keywords_are_all_seen(self):
+        # 'he' only occurs inside 'she', a plain left-to-right regex scan would skip it
+        matcher = KeywordMatcher([('she', 20, 'she'), ('he', 10, 'he'), ('hers', 30, 'hers')])
+        self.assertEqual(matcher.best_match('ushers'), 'he')
+
+    def test_no_match(self):
+        matcher = KeywordMatcher([('uber', 10, 'uber')])
+        self.assertIsNone(matcher.best_match('local bakery'))
+
+
+class ReceiptCorpusTests(TestCase):
+    """
+    Accuracy of the parser with the default vendor rules over core/testdata/receipt_corpus.json.
+    """
+
+    def test_corpus(self):
+        parser = get_parser()
+        for item in load_corpus():
+            with self.subTest(receipt=item['text'].splitlines()[0]):
+                parsed = parser.parse(item['text'], today=TODAY)
+                self.assertTrue(check(parsed, item['expected']), parsed)
+
+    def test_invalid_date_falls_through_to_next_match(self):
+        parsed = ReceiptParser([]).parse('31/31/2024 then 2024-02-29', today=TODAY)
+        self.assertEqual(parsed.expense_date, date(2024, 2, 29))
+
+
+class ReceiptRuleCacheTests(TestCase):
+    def test_parser_is_reused_until_rules_change(self):
+        parser = get_parser()
+        self.assertIs(get_parser(), parser)
+
+        VendorRule.objects.create(vendor='Bolt', keyword='bolt', category='Travel', priority=5)
+        self.assertEqual(get_parser().parse('Bolt ride total 7.80').category, 'Travel')
+
+        VendorRule.objects.filter(keyword='bolt').delete()
+        self.assertEqual(get_parser().parse('Bolt ride total 7.80').category, 'Miscellaneous')
+
+    def test_only_the_generation_is_read_per_parse(self):
+        parser = get_parser()
+        with self.assertNumQueries(1):
+            self.assertIs(get_parser(), parser)
+
+        # another process added a rule: its signal bumped the shared generation
+        VendorRule.objects.bulk_create([VendorRule(vendor='Bolt', keyword='bolt', category='Travel', priority=5)])
+        generations.bump(receipts.RULES_GENERATION)
+        self.assertEqual(get_parser().parse('Bolt ride total 7.80').category, 'Travel')
+
+
+class ParseReceiptViewTests(TestCase):
+    def test_creates_expense(self):
+        response = self.client.post(reverse('parse-receipt'), {
+            'receipt_text': 'Thanks for riding with Uber\nMar 05, 2024\nTotal €12.50',
+        })
+        self.assertRedirects(response, reverse('expense-inbox'))
+        expense = Expense.objects.get()
+        self.assertEqual(expense.title, 'Uber Purchase')
+        self.assertEqual(expense.amount, Decimal('12.50'))
+        self.assertEqual(expense.expense_date, date(2024, 3, 5))
+
+    def test_no_amount(self):
+        self.client.post(reverse('parse-receipt'), {'receipt_text': 'no numbers here'})
+        self.assertFalse(Expense.objects.exists())
+
+    def test_duplicate_receipt_is_skipped(self):
+        text = 'Thanks for riding with Uber\nMar 05, 2024\nTotal €12.50'
+        self.client.post(reverse('parse-receipt'), {'receipt_text': text})
+        # same receipt, different whitespace and case
+        self.client.post(reverse('parse-receipt'), {'receipt_text': '  thanks for riding with UBER\n\nMar 05, 2024\nTotal €12.50 '})
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_duplicate_receipt_is_flagged(self):
+        text = 'Thanks for riding with Uber\nMar 05, 2024\nTotal €12.50'
+        self.client.post(reverse('parse-receipt'), {'receipt_text': text})
+        self.client.post(reverse('parse-receipt'), {'receipt_text': text, 'on_duplicate': 'flag'})
+        self.assertEqual(list(Expense.objects.order_by('pk').values_list('is_duplicate', flat=True)), [False, True])
+
+
+class InvoiceNumberAllocatorTests(TransactionTestCase):
+    WORKERS = 8
+    PER_WORKER = 50
+
+    def test_format_and_yearly_counter(self):
+        allocator = InvoiceNumberAllocator('INV-{year}-{number:05d}', block_size=3)
+        numbers = [allocator.allocate(date(2026, 5, 1)) for _ in range(4)]
+        self.assertEqual(numbers, ['INV-2026-00001', 'INV-2026-00002', 'INV-2026-00003', 'INV-2026-00004'])
+        self.assertEqual(allocator.allocate(date(2027, 1, 1)), 'INV-2027-00001')
+        # two blocks of 3 reserved for 2026
+        self.assertEqual(InvoiceSequence.objects.get(key='invoice-2026').next_value, 7)
+
+    def test_counter_starts_above_existing_numbers(self):
+        client = Client.objects.create(name='Acme', email='acme@example.com')
+        for number in ['INV-2026-00002', 'INV-2026-00041', 'INV-2025-00099', 'INV-2026-0007-B', 'Q-2026-00500']:
+            Invoice.objects.create(
+                client=client, title='Imported', invoice_number=number, due_date=date(2026, 2, 1), amount=Decimal('1.00'),
+            )
+        allocator = InvoiceNumberAllocator('INV-{year}-{number:05d}', block_size=3)
+        self.assertEqual(allocator.allocate(date(2026, 5, 1)), 'INV-2026-00042')
+        self.assertEqual(allocator.allocate(date(2025, 5, 1)), 'INV-2025-00100')
+
+    def test_numbers_taken_since_are_skipped(self):
+        allocator = InvoiceNumberAllocator('INV-{year}-{number:05d}', block_size=3)
+        self.assertEqual(allocator.allocate(date(2026, 5, 1)), 'INV-2026-00001')
+        # a CSV import takes the next numbers of the reserved block and of the one after
+        client = Client.objects.create(name='Acme', email='acme@example.com')
+        for number in ['INV-2026-00002', 'INV-2026-00003', 'INV-2026-00004']:
+            Invoice.objects.create(
+                client=client, title='Imported', invoice_number=number, due_date=date(2026, 2, 1), amount=Decimal('1.00'),
+            )
+        self.assertEqual(allocator.allocate(date(2026, 5, 1)), 'INV-2026-00005')
+
+    def test_concurrent_workers_never_share_a_number(self):
+        # every allocator stands for one worker process with its own blocks,
+        # all of them hitting the counter row at the same time
+        client = Client.objects.create(name='Acme', email='acme@example.com')
+        start = threading.Barrier(self.WORKERS)
+        failures = []
+
+        def worker(_):
+            allocator = InvoiceNumberAllocator(block_size=7)
+            start.wait()
+            numbers = []
+            try:
+                for _ in range(self.PER_WORKER):
+                    number = allocator.allocate(date(2026, 1, 1))
+                    Invoice.objects.create(
+                        client=client, title='Stress', invoice_number=number,
+                        due_date=date(2026, 2, 1), amount=Decimal('1.00'),
+                    )
+                    numbers.append(number)
+            except Exception as error:
+                failures.append(error)
+            finally:
+                connection.close()
+            return numbers
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            numbers = [number for batch in pool.map(worker, range(self.WORKERS)) for number in batch]
+
+        self.assertEqual(failures, [])
+        total = self.WORKERS * self.PER_WORKER
+        self.assertEqual(len(numbers), total)
+        self.assertEqual(len(set(numbers)), total)
+        self.assertEqual(Invoice.objects.count(), total)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        clients = [Client.objects.create(name=name, email=f'{name.lower()}@example.com') for name in ['Acme', 'Globex']]
+        # every sort field has ties, so the pk tiebreak decides where pages split
+        for number, (client, due, amount) in enumerate([
+            (0, 5, '10.00'), (1, 5, '30.00'), (0, 1, '10.00'), (1, 9, '20.00'),
+            (0, 5, '30.00'), (0, 9, '10.00'), (1, 1, '20.00'),
+        ]):
+            Invoice.objects.create(
+                client=clients[client], title='Work', invoice_number=f'KS-{number}',
+                due_date=date(2026, 1, due), amount=Decimal(amount),
+            )
+        tie = Invoice.objects.order_by('pk')[2].created_at
+        Invoice.objects.filter(pk__in=Invoice.objects.order_by('pk').values('pk')[:3]).update(created_at=tie)
+
+    def walk(self, sort_by, descending):
+        rows, cursor = keyset_page(Invoice.objects.select_related('client'), sort_by, descending, page_size=3)
+        while cursor:
+            page, cursor = keyset_page(Invoice.objects.select_related('client'), sort_by, descending, cursor, page_size=3)
+            self.assertTrue(page)
+            rows += page
+        return [invoice.pk for invoice in rows]
+
+    def test_pages_cover_every_row_once_in_order(self):
+        invoices = list(Invoice.objects.select_related('client'))
+        for sort_by in ['created_at', 'due_date', 'amount', 'client__name']:
+            for descending in [False, True]:
+                with self.subTest(sort_by=sort_by, descending=descending):
+                    expected = sorted(invoices, key=lambda invoice: (sort_value(invoice, sort_by), invoice.pk), reverse=descending)
+                    self.assertEqual(self.walk(sort_by, descending), [invoice.pk for invoice in expected])
+
+    def test_malformed_cursor_starts_over(self):
+        first_page, _ = keyset_page(Invoice.objects.all(), 'amount', False, page_size=3)
+        for cursor in ['!!!', 'bm90IGpzb24', encode_cursor('not a number', 1), encode_cursor('2026-01-01', 'x')]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(keyset_page(Invoice.objects.all(), 'amount', False, cursor, page_size=3)[0], first_page)
+        self.assertEqual(self.client.get(reverse('invoice-list-partial'), {'cursor': '!!!'}).status_code, 200)
+
+    def test_next_page_from_the_partial(self):
+        with mock.patch('core.views.keyset_page', partial(keyset_page, page_size=4)):
+            response = self.client.get(reverse('invoice-list-partial'), {'sort_by': 'amount', 'sort_order': 'asc'})
+            next_query = response.context['next_query']
+            self.assertTrue(next_query)
+            with self.assertNumQueries(1):  # the page, clients joined
+                response = self.client.get(f"{reverse('invoice-list-partial')}?{next_query}")
+        self.assertEqual(len(response.context['invoices']), 3)
+        self.assertIsNone(response.context['next_query'])
+
+    def test_expense_list_pages(self):
+        for day in [3, 1, 3, 2, 1]:
+            Expense.objects.create(title='Lunch', amount=Decimal('12.00'), expense_date=date(2026, 1, day))
+        expected = [expense.pk for expense in Expense.objects.order_by('-expense_date', '-pk')]
+        with mock.patch('core.views.keyset_page', partial(keyset_page, page_size=2)):
+            response = self.client.get(reverse('expense-list'))
+            self.assertTemplateUsed(response, 'core/expense_list.html')
+            pks = [expense.pk for expense in response.context['expenses']]
+            while response.context['next_query']:
+                self.assertContains(response, 'hx-trigger="revealed"')
+                response = self.client.get(f"{reverse('expense-list')}?{response.context['next_query']}")
+                self.assertTemplateNotUsed(response, 'core/expense_list.html')
+                pks += [expense.pk for expense in response.context['expenses']]
+        self.assertEqual(pks, expected)
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        if not search.is_available():
+            self.skipTest("SQLite without FTS5")
+        self.acme = Client.objects.create(name='Acme', email='billing@acme.example')
+        self.invoice = Invoice.objects.create(
+            client=self.acme, title='Logo design', invoice_number='INV-1',
+            due_date=date(2026, 1, 31), amount=Decimal('100.00'),
+        )
+
+    def found(self, text):
+        invoices, ranked = search.filter_invoices(Invoice.objects.all(), text)
+        self.assertTrue(ranked)
+        return list(invoices.values_list('invoice_number', flat=True))
+
+    def test_prefix_search_over_invoice_and_client(self):
+        for text in ['logo', 'des', 'INV-1', 'acme', 'billing acme', 'Lógo']:
+            with self.subTest(text=text):
+                self.assertEqual(self.found(text), ['INV-1'])
+        self.assertEqual(self.found('"logo" OR *'), [])  # operators are quoted, not run
+        response = self.client.get(reverse('invoice-list-partial'), {'search': 'logo', 'sort_by': 'relevance'})
+        self.assertContains(response, 'Logo design')
+
+    def test_invoice_save_and_delete(self):
+        self.invoice.title = 'Brand book'
+        self.invoice.save()
+        self.assertEqual(self.found('logo'), [])
+        self.assertEqual(self.found('brand'), ['INV-1'])
+
+        self.invoice.delete()
+        self.assertEqual(self.found('brand'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {search.TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_client_rename_and_delete(self):
+        self.acme.name = 'Globex'
+        self.acme.save()
+        self.assertEqual(self.found('globex'), ['INV-1'])
+        self.assertEqual(self.found('acme'), ['INV-1'])  # still in the email
+        self.acme.email = 'accounts@globex.example'
+        self.acme.save()
+        self.assertEqual(self.found('acme'), [])
+
+        self.acme.delete()  # cascades to the invoice
+        self.assertEqual(self.found('globex'), [])
+
+
+class InvoicePdfCacheTests(TestCase):
+    def setUp(self):
+        pdf_cache = tempfile.TemporaryDirectory()
+        self.addCleanup(pdf_cache.cleanup)
+        self.enterContext(override_settings(INVOICE_PDF_CACHE_DIR=pdf_cache.name))
+        self.cache = pdf_cache.name
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        self.invoice = Invoice.objects.create(
+            client=self.acme, title='Logo design', invoice_number='INV-1',
+            due_date=date(2026, 1, 31), amount=Decimal('100.00'),
+        )
+
+    def cached_files(self):
+        return sorted(os.listdir(self.cache))
+
+    def test_rendered_once_per_version(self):
+        with mock.patch.object(pdf, 'render', return_value=b'%PDF first') as render:
+            path = pdf.get_or_render(self.invoice)
+            self.assertEqual(pdf.get_or_render(self.invoice), path)
+        render.assert_called_once()
+        self.assertEqual(path.read_bytes(), b'%PDF first')
+
+        # an edit and a client rename each make a new version, the old file is dropped
+        for change in [lambda: setattr(self.invoice, 'title', 'Brand book'), lambda: setattr(self.acme, 'name', 'Acme Corp')]:
+            change()
+            self.acme.save()
+            self.invoice.save()
+            self.invoice.refresh_from_db()
+            with mock.patch.object(pdf, 'render', return_value=b'%PDF next') as render:
+                new_path = pdf.get_or_render(self.invoice)
+            render.assert_called_once()
+            self.assertNotEqual(new_path, path)
+            self.assertEqual(self.cached_files(), [new_path.name])
+            path = new_path
+
+    def test_saving_warms_the_pdf_in_an_idle_render_process(self):
+        queue = pdf.RenderQueue(processes=1, backlog=4)
+        rendered = Future()
+        with mock.patch.object(pdf, 'render_queue', queue), mock.patch.object(queue, 'submit', return_value=rendered) as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.invoice.title = 'Brand book'
+                self.invoice.save()
+        submit.assert_called_once()
+        self.assertEqual(submit.call_args.kwargs, {'limit': 1})
+        rendered.set_result(b'%PDF warmed')
+        self.assertEqual(pdf.cache_path(self.invoice).read_bytes(), b'%PDF warmed')
+
+        # with every process busy warming is left to the first download, nothing queues behind
+        queue.in_flight = 1
+        with self.assertRaises(pdf.RenderQueueFull):
+            queue.submit('<p>Brand book</p>', limit=queue.processes)
+        with mock.patch.object(pdf, 'render_queue', queue), self.captureOnCommitCallbacks(execute=True):
+            self.invoice.title = 'Brand book 2'
+            self.invoice.save()
+        self.assertFalse(pdf.cache_path(Invoice.objects.select_related('client').get()).exists())
+        self.assertIsNone(queue.pool)
+
+    def test_template_edits_make_a_new_version(self):
+        before = pdf.version(self.invoice)
+        templates = tempfile.TemporaryDirectory()
+        self.addCleanup(templates.cleanup)
+        edited = Path(templates.name) / pdf.TEMPLATE
+        edited.parent.mkdir()
+        edited.write_text(Path(get_template(pdf.TEMPLATE).origin.name).read_text() + '<!-- restyled -->')
+        pdf.design_version.cache_clear()
+        self.addCleanup(pdf.design_version.cache_clear)
+        with override_settings(TEMPLATES=[{**settings.TEMPLATES[0], 'DIRS': [templates.name]}]):
+            self.assertNotEqual(pdf.version(self.invoice), before)
+
+    def test_delete_purges_the_cached_file(self):
+        pdf.store(self.invoice, b'%PDF cached')
+        self.invoice.delete()
+        self.assertEqual(self.cached_files(), [])
+
+    def test_view_serves_the_cache_and_revalidates(self):
+        pdf.store(self.invoice, b'%PDF cached')
+        url = reverse('invoice-pdf', args=[self.invoice.pk])
+        with mock.patch.object(pdf, 'render') as render:
+            response = self.client.get(url)
+            self.assertEqual(response.content, b'%PDF cached')
+            self.assertEqual(response['ETag'], f'"{pdf.version(self.invoice)}"')
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        render.assert_not_called()
+
+
+class InvoicePdfExportTests(TestCase):
+    def setUp(self):
+        pdf_cache = tempfile.TemporaryDirectory()
+        self.addCleanup(pdf_cache.cleanup)
+        self.enterContext(override_settings(INVOICE_PDF_CACHE_DIR=pdf_cache.name))
+        acme = Client.objects.create(name='Acme', email='acme@example.com')
+        globex = Client.objects.create(name='Globex', email='globex@example.com')
+        self.invoices = [
+            Invoice.objects.create(
+                client=client, title='Work', invoice_number=f'EX-{number}',
+                due_date=date(2026, 1, 31), amount=Decimal('100.00'),
+            )
+            for number, client in enumerate([acme, globex, acme])
+        ]
+        pdf.store(self.invoices[0], b'%PDF cached')
+
+    def test_zip_holds_cached_and_rendered_pdfs(self):
+        counts = []
+        archive = b''.join(pdf.export_zip(pdf.invoices_for_export(), processes=1, progress=counts.append))
+        with zipfile.ZipFile(BytesIO(archive)) as exported:
+            self.assertIsNone(exported.testzip())
+            names = exported.namelist()
+            self.assertEqual(names, ['invoice_EX-0.pdf', 'invoice_EX-1.pdf', 'invoice_EX-2.pdf'])
+            self.assertEqual(exported.read('invoice_EX-0.pdf'), b'%PDF cached')
+            for name in names[1:]:
+                self.assertTrue(exported.read(name).startswith(b'%PDF'))
+        self.assertEqual(counts, [1, 2, 3])
+        # rendered PDFs were written back to the cache
+        self.assertTrue(all(pdf.cache_path(invoice).exists() for invoice in self.invoices))
+
+    def test_export_view_filters_by_client(self):
+        response = self.client.get(reverse('invoice-pdf-export'), {'client': self.invoices[1].client_id})
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as exported:
+            self.assertEqual(exported.namelist(), ['invoice_EX-1.pdf'])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        acme = Client.objects.create(name='Acme, Inc.', email='acme@example.com')
+        for number, (title, status) in enumerate([('Logo "v2" design', Invoice.PAID), ('Hosting', Invoice.SENT), ('Audit\nQ1', Invoice.PAID)]):
+            Invoice.objects.create(
+                client=acme, title=title, invoice_number=f'EXP-{number}', status=status,
+                due_date=date(2026, 1, 31), amount=Decimal('100.50'),
+            )
+        Expense.objects.create(title='Flight', amount=Decimal('300.00'), expense_date=date(2026, 1, 5), category='Travel')
+        Expense.objects.create(title='Coffee', amount=Decimal('4.50'), expense_date=date(2026, 2, 5), category='Food')
+
+    def get(self, name, **query):
+        response = self.client.get(reverse(name), query)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_round_trips_quoting(self):
+        response, content = self.get('invoice-export', status=Invoice.PAID)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([name for name, _ in exports.INVOICE_COLUMNS], list(rows[0]))
+        self.assertEqual([row['title'] for row in rows], ['Logo "v2" design', 'Audit\nQ1'])
+        self.assertEqual((rows[0]['client_name'], rows[0]['amount']), ('Acme, Inc.', '100.50'))
+
+    def test_ndjson_rows(self):
+        response, content = self.get('expense-export', format='ndjson', category='travel')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(rows, [{
+            'title': 'Flight', 'amount': '300.00', 'expense_date': '2026-01-05', 'category': 'Travel',
+            'created_at': rows[0]['created_at'], 'is_duplicate': False,
+        }])
+
+    def test_rows_are_written_in_chunks(self):
+        with mock.patch.object(exports, 'ROWS_PER_WRITE', 2):
+            chunks = list(exports.stream('csv', exports.INVOICE_COLUMNS, exports.invoice_rows()))
+        self.assertEqual(len(chunks), 1 + 2)  # header, two rows, one row
+        self.assertEqual(len(list(csv.reader(StringIO(''.join(chunks))))), 4)
+
+    def test_invalid_parameters(self):
+        for query in [{'format': 'xml'}, {'status': 'lost'}, {'start': '2026-02-30'}]:
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(reverse('invoice-export'), query).status_code, 400)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        Expense.objects.create(title='Flight', amount=Decimal('300.00'), expense_date=date(2026, 1, 5))
+
+    def logged(self, url):
+        with self.assertLogs('core.perf', 'DEBUG') as logs:
+            response = self.client.get(url)
+        self.assertEqual(len(logs.records), 1)
+        return response, json.loads(logs.records[0].getMessage())
+
+    def test_log_line_and_server_timing(self):
+        response, line = self.logged(reverse('expense-list'))
+        self.assertEqual(
+            (line['url_name'], line['method'], line['path'], line['status']),
+            ('expense-list', 'GET', reverse('expense-list'), 200),
+        )
+        self.assertGreaterEqual(line['queries'], 1)
+        self.assertLessEqual(line['tpl_ms'], line['total_ms'])
+        self.assertTrue(0 < len(line['slowest']) <= settings.PERF_SLOW_QUERIES)
+        self.assertTrue(line['slowest'][0]['sql'].startswith('SELECT'))
+        timing = response['Server-Timing']
+        self.assertIn(f'db;dur={line["sql_ms"]:.1f};desc="{line["queries"]} queries"', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_async_views_count_queries_from_worker_threads(self):
+        _, line = self.logged(reverse('invoice-list'))
+        self.assertEqual(line['url_name'], 'invoice-list')
+        self.assertGreaterEqual(line['queries'], 2)  # the page and the dashboard rollups
+
+    @override_settings(PERF_FLUSH_INTERVAL=0)
+    def test_histograms_are_added_up(self):
+        # requests from earlier tests may still be waiting in the buffer
+        perf.flush()
+        RequestTiming.objects.all().delete()
+        for _ in range(2):
+            self.logged(reverse('expense-list'))
+        self.assertFalse(RequestTiming.objects.exists())  # requests never write the histograms themselves
+        perf.flush()  # the background thread's job, which PERF_FLUSH_INTERVAL=0 leaves out
+        buckets = RequestTiming.objects.filter(url_name='expense-list')
+        self.assertEqual(sum(bucket.count for bucket in buckets), 2)
+        self.assertTrue(all(bucket.le in perf.BUCKETS + [perf.OVERFLOW] for bucket in buckets))
+        self.assertEqual((perf.bucket_for(5), perf.bucket_for(5.1), perf.bucket_for(10 ** 6)), (5, 10, perf.OVERFLOW))
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        caches[fragments.CACHE_ALIAS].clear()
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        self.invoice = Invoice.objects.create(
+            client=self.acme, title='Logo design', invoice_number='INV-1',
+            due_date=date(2026, 1, 31), amount=Decimal('100.00'),
+        )
+
+    def rows(self):
+        return fragments.render_rows('invoice', Invoice.objects.select_related('client'))
+
+    def test_unchanged_rows_come_from_the_cache(self):
+        self.rows()
+        with mock.patch.object(fragments, 'render_fresh') as render_fresh:
+            self.assertIn('Logo design', self.rows()[0].row_html)
+        render_fresh.assert_not_called()
+
+    def test_invoice_and_client_edits_render_again(self):
+        self.rows()
+        self.invoice.title = 'Brand book'
+        self.invoice.save()
+        self.assertIn('Brand book', self.rows()[0].row_html)
+
+        self.acme.name = 'Acme Corp'
+        self.acme.save()
+        self.assertIn('Acme Corp', self.rows()[0].row_html)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        self.invoice = Invoice.objects.create(
+            client=self.acme, title='Logo design', invoice_number='INV-1',
+            due_date=date(2026, 1, 31), amount=Decimal('100.00'),
+        )
+
+    def revalidate(self, url, query=None):
+        etag = self.client.get(url, query)['ETag']
+        return etag, self.client.get(url, query, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_detail_is_not_rendered(self):
+        url = reverse('invoice-detail', args=[self.invoice.pk])
+        etag, response = self.revalidate(url)
+        self.assertEqual(response.status_code, 304)
+
+        self.invoice.status = Invoice.PAID
+        self.invoice.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_validators_follow_rows_and_parameters(self):
+        url = reverse('invoice-list-partial')
+        etag, response = self.revalidate(url, {'sort_by': 'amount'})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get(url, {'sort_by': 'amount', 'sort_order': 'asc'})['ETag'], etag)
+
+        Invoice.objects.create(
+            client=self.acme, title='Brand book', invoice_number='INV-2',
+            due_date=date(2026, 1, 31), amount=Decimal('50.00'),
+        )
+        self.assertEqual(self.client.get(url, {'sort_by': 'amount'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class RollupSignalTests(TestCase):
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+
+    def invoice(self, number, amount, status=Invoice.PAID):
+        return Invoice.objects.create(
+            client=self.acme, title='Work', invoice_number=f'RS-{number}', status=status,
+            due_date=date(2026, 1, 31), amount=Decimal(amount),
+        )
+
+    def buckets(self):
+        return dict(InvoiceMonthlyRollup.objects.filter(count__gt=0).values_list('status', 'total'))
+
+    def assert_matches_rebuild(self):
+        current = set(InvoiceMonthlyRollup.objects.filter(count__gt=0).values_list('month', 'status', 'total', 'count'))
+        rollups.rebuild()
+        self.assertEqual(current, set(InvoiceMonthlyRollup.objects.values_list('month', 'status', 'total', 'count')))
+
+    def test_create_change_and_delete(self):
+        invoice = self.invoice(1, '10.00', Invoice.SENT)
+        self.invoice(2, '5.00')
+        self.assertEqual(self.buckets(), {Invoice.SENT: Decimal('10.00'), Invoice.PAID: Decimal('5.00')})
+
+        invoice.status, invoice.amount = Invoice.PAID, Decimal('12.00')
+        invoice.save()
+        self.assertEqual(self.buckets(), {Invoice.PAID: Decimal('17.00')})
+
+        invoice.delete()
+        self.assertEqual(self.buckets(), {Invoice.PAID: Decimal('5.00')})
+        self.assert_matches_rebuild()
+
+    def test_stale_instance_moves_what_is_stored(self):
+        invoice = self.invoice(1, '10.00', Invoice.SENT)
+        stale = Invoice.objects.get(pk=invoice.pk)
+        invoice.status = Invoice.PAID
+        invoice.save()
+        stale.amount = Decimal('20.00')  # still SENT in memory, PAID in the database
+        stale.save()
+        self.assertEqual(self.buckets(), {Invoice.SENT: Decimal('20.00')})
+        self.assert_matches_rebuild()
+
+    def test_client_cascade(self):
+        self.invoice(1, '10.00')
+        self.acme.delete()
+        self.assertEqual(self.buckets(), {})
+        self.assertEqual(rollups.dashboard()['total_income'], Decimal('0.00'))
+
+    def test_update_view(self):
+        invoice = self.invoice(1, '10.00', Invoice.SENT)
+        self.client.post(reverse('invoice-update', args=[invoice.pk]), {
+            'client': self.acme.pk, 'title': 'Work', 'amount': '30.00', 'due_date': '2026-01-31', 'status': Invoice.PAID,
+        })
+        self.assertEqual(self.buckets(), {Invoice.PAID: Decimal('30.00')})
+
+
+class DashboardEventsTests(TestCase):
+    def setUp(self):
+        # a broker of its own: the test client's stream wrapper never closes the view's generator,
+        # so its subscription would otherwise outlive the test
+        broker = mock.patch.object(live, 'broker', live.Broker())
+        broker.start()
+        self.addCleanup(broker.stop)
+
+    async def test_stream_sends_state_then_only_changes(self):
+        response = await self.async_client.get(reverse('dashboard-events'))
+        stream = aiter(response.streaming_content)
+        try:
+            first = (await anext(stream)).decode()
+            self.assertIn('id="total-outstanding"', first)
+
+            await sync_to_async(rollups.apply_deltas)({(date.today().replace(day=1), Invoice.PAID): (Decimal('80.00'), 1)})
+            # TestCase never commits, publish the way the on_commit hook would
+            await sync_to_async(rollups.publish_dashboard)()
+            update = (await anext(stream)).decode()
+        finally:
+            await stream.aclose()
+
+        self.assertIn('€80.00', update)  # income
+        self.assertIn('€20.00', update)  # tax pool
+        self.assertNotIn('total-outstanding', update)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        acme = Client.objects.create(name='Acme', email='acme@example.com')
+        self.invoice = Invoice.objects.create(
+            client=acme, title='Logo design', invoice_number='INV-1',
+            due_date=date(2026, 1, 31), amount=Decimal('100.00'), status=Invoice.PAID,
+        )
+        rollups.rebuild()
+        pdf_cache = tempfile.TemporaryDirectory()
+        self.addCleanup(pdf_cache.cleanup)
+        self.enterContext(override_settings(INVOICE_PDF_CACHE_DIR=pdf_cache.name))
+
+    async def test_async_dashboard_matches_sync(self):
+        self.assertEqual(await rollups.adashboard(), await sync_to_async(rollups.dashboard)())
+
+    async def test_render_queue_frees_its_slot(self):
+        queue = pdf.RenderQueue(processes=1, backlog=0)
+        self.addCleanup(lambda: queue.pool and queue.pool.shutdown())
+        self.assertTrue((await queue.render('<p>Logo design</p>')).startswith(b'%PDF'))
+        self.assertEqual(queue.in_flight, 0)
+
+    async def test_exports_stream_without_collecting(self):
+        await sync_to_async(pdf.store)(self.invoice, b'%PDF cached')
+        # under ASGI a sync iterator is read whole first, with a warning
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            for url, expected in [(reverse('invoice-export'), b'INV-1'), (reverse('invoice-pdf-export'), b'%PDF cached')]:
+                response = await self.async_client.get(url)
+                self.assertTrue(response.is_async)
+                content = b''.join([chunk async for chunk in response.streaming_content])
+                self.assertIn(expected, content)
+
+    def test_full_render_queue_answers_503(self):
+        queue = pdf.RenderQueue(processes=1, backlog=0)
+        queue.in_flight = 1  # a render already holds the only slot
+        url = reverse('invoice-pdf', args=[self.invoice.pk])
+        with mock.patch.object(pdf, 'render_queue', queue):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertIsNone(queue.pool)
+
+
+def run_due_jobs():
+    # the worker's threads wouldn't see the test's transaction, so jobs run in this one
+    while job := jobs.claim('test'):
+        jobs.run(job)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        files = tempfile.TemporaryDirectory()
+        self.addCleanup(files.cleanup)
+        self.enterContext(override_settings(JOB_FILES_DIR=files.name, JOB_RETRY_DELAY=60))
+        self.calls = []
+        self.enterContext(mock.patch.dict(jobs.TASKS))
+        jobs.task('test_echo', priority=10)(self.echo)
+        jobs.task('test_broken', max_attempts=2)(self.broken)
+
+    def echo(self, job, text):
+        self.calls.append(text)
+        jobs.set_progress(job, 1, 2, 'halfway')
+        return {'echo': text}
+
+    def broken(self, job):
+        raise RuntimeError('no luck')
+
+    def test_jobs_run_by_priority(self):
+        jobs.enqueue('test_echo', text='later', priority=200)
+        done = jobs.enqueue('test_echo', text='first')
+        run_due_jobs()
+        self.assertEqual(self.calls, ['first', 'later'])
+        done.refresh_from_db()
+        self.assertEqual((done.status, done.result, done.progress, done.attempts), (Job.DONE, {'echo': 'first'}, 100, 1))
+
+    def test_failed_job_is_retried_then_failed(self):
+        job = jobs.enqueue('test_broken')
+        self.assertFalse(jobs.run(jobs.claim('test')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, job.created_at)
+        self.assertIsNone(jobs.claim('test'))  # not due before the retry delay
+
+        Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+        self.assertFalse(jobs.run(jobs.claim('test')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('RuntimeError: no luck', job.error)
+
+    def test_stale_job_is_requeued(self):
+        job = jobs.enqueue('test_echo', text='lost')
+        jobs.claim('dead worker')
+        Job.objects.filter(pk=job.pk).update(locked_until=job.created_at)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim('test').pk, job.pk)
+
+    def test_import_polls_until_report(self):
+        csv = SimpleUploadedFile('expenses.csv', b'title,amount,expense_date,category\nTaxi,12.00,2026-01-05,Travel\n')
+        response = self.client.post(reverse('data-import'), {'kind': 'expenses', 'csv_file': csv})
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        status_url = reverse('job-status', args=[job.pk])
+        self.assertContains(response, status_url, status_code=202)
+        self.assertFalse(Expense.objects.exists())
+
+        run_due_jobs()
+        response = self.client.get(status_url)
+        self.assertNotContains(response, status_url)
+        self.assertContains(response, 'Imported 1 of 1')
+        self.assertEqual(Expense.objects.get().title, 'Taxi')
+
+    def test_failed_import_is_not_run_again(self):
+        # the first batch is committed before the failure, a retry would insert it again
+        def half_import(kind, lines, **options):
+            Expense.objects.create(title='Taxi', amount=Decimal('12.00'), expense_date=date(2026, 1, 5))
+            raise ValueError('broken line')
+
+        csv = SimpleUploadedFile('expenses.csv', b'title,amount,expense_date,category\nTaxi,12.00,2026-01-05,Travel\n')
+        self.client.post(reverse('data-import'), {'kind': 'expenses', 'csv_file': csv})
+        with mock.patch('core.imports.import_csv', half_import):
+            run_due_jobs()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertEqual(Expense.objects.count(), 1)
+
+
+class CsvImportTests(TestCase):
+    HEADER = 'title,amount,expense_date,category\n'
+
+    def import_expenses(self, *rows, **options):
+        return imports.import_csv('expenses', [self.HEADER, *rows], **options)
+
+    def test_invalid_rows_only_reject_themselves(self):
+        Client.objects.create(name='Acme', email='acme@example.com')
+        result = imports.import_csv('clients', [
+            'name,email,phone,address\n',
+            'Globex,globex@example.com,,\n',
+            'No email,,,\n',
+            'Acme again,acme@example.com,,\n',  # already stored
+            'Globex again,globex@example.com,,\n',  # earlier in the file
+        ])
+        self.assertEqual((result.processed, result.imported), (4, 1))
+        self.assertEqual([line for line, _, _ in result.rejected], [3, 4, 5])
+        self.assertIn('email', result.rejected[0][1])
+        self.assertEqual(Client.objects.count(), 2)
+
+    def test_invoices_resolve_clients_and_keep_their_dates(self):
+        Client.objects.create(name='Acme', email='acme@example.com')
+        Invoice.objects.create(
+            client=Client.objects.get(), title='Old', invoice_number='IMP-1',
+            due_date=date(2026, 1, 31), amount=Decimal('5.00'),
+        )
+        result = imports.import_csv('invoices', [
+            'client_email,invoice_number,title,amount,due_date,status,created_at\n',
+            'acme@example.com,IMP-2,Logo,100.00,2026-02-28,PAID,2025-11-03\n',
+            'nobody@example.com,IMP-3,Logo,100.00,2026-02-28,PAID,\n',
+            'acme@example.com,IMP-1,Logo,100.00,2026-02-28,PAID,\n',
+            'acme@example.com,IMP-4,Logo,lots,2026-02-28,PAID,\n',
+            'acme@example.com,IMP-5,Logo,100.00,2026-02-28,PAID,yesterday\n',
+        ])
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(
+            {line: errors.split(':')[0] for line, errors, _ in result.rejected},
+            {3: 'client_email', 4: 'invoice_number', 5: 'amount', 6: 'created_at'},
+        )
+        invoice = Invoice.objects.get(invoice_number='IMP-2')
+        self.assertEqual(timezone.localtime(invoice.created_at).date(), date(2025, 11, 3))
+        # bulk_create sends no signals, the rollups are updated per batch
+        self.assertEqual(rollups.dashboard()['total_income'], Decimal('100.00'))
+
+    def test_invoices_without_a_number_get_the_next_one(self):
+        Client.objects.create(name='Acme', email='acme@example.com')
+        result = imports.import_csv('invoices', [
+            'client_email,invoice_number,title,amount,due_date,status,created_at\n',
+            'acme@example.com,,Logo,100.00,2026-02-28,PAID,2025-11-03\n',
+            'acme@example.com,,Logo,-,2026-02-28,PAID,\n',
+        ])
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([errors.split(':')[0] for _, errors, _ in result.rejected], ['amount'])
+        self.assertTrue(Invoice.objects.get().invoice_number.startswith('INV-2025-'))
+
+    def test_batches_are_committed_one_by_one(self):
+        progress = []
+        result = imports.import_csv(
+            'expenses', [self.HEADER] + [f'Item {n},{n}.00,2026-01-05,Office\n' for n in range(1, 6)],
+            batch_size=2, progress=lambda result: progress.append((result.processed, result.imported)),
+        )
+        self.assertEqual(progress, [(2, 2), (4, 4), (5, 5)])
+        self.assertEqual(Expense.objects.count(), 5)
+
+    def test_failing_batch_leaves_earlier_batches_stored(self):
+        def broken(batch, result, **options):
+            Expense.objects.create(title='Half', amount=Decimal('1.00'), expense_date=date(2026, 1, 5))
+            raise ValueError('broken batch')
+
+        importers = iter([imports.import_expenses, broken])
+        with mock.patch.dict(imports.IMPORTERS, {'expenses': lambda *args, **options: next(importers)(*args, **options)}):
+            with self.assertRaises(ValueError):
+                imports.import_csv('expenses', [self.HEADER, 'A,1.00,2026-01-05,\n', 'B,2.00,2026-01-05,\n'], batch_size=1)
+        self.assertEqual(list(Expense.objects.values_list('title', flat=True)), ['A'])
+
+    def test_duplicate_expenses_are_skipped(self):
+        Expense.objects.create(title='Taxi', amount=Decimal('12.00'), expense_date=date(2026, 1, 5))
+        result = self.import_expenses(
+            'Taxi,12.00,2026-01-05,Travel\n',  # already stored
+            'Hotel,80.00,2026-01-06,Travel\n',
+            'Hotel,80.00,2026-01-06,Travel\n',  # repeated in the file
+            on_duplicate='skip',
+        )
+        self.assertEqual((result.processed, result.imported), (3, 1))
+        self.assertEqual([line for line, _, _ in result.skipped], [2, 4])
+        self.assertEqual(Expense.objects.count(), 2)
+
+    def test_duplicate_expenses_are_flagged(self):
+        Expense.objects.create(title='Taxi', amount=Decimal('12.00'), expense_date=date(2026, 1, 5))
+        result = self.import_expenses('Taxi,12.00,2026-01-05,Travel\n', on_duplicate='flag')
+        self.assertEqual((result.imported, result.flagged, result.skipped), (1, 1, []))
+        self.assertEqual(list(Expense.objects.order_by('pk').values_list('is_duplicate', flat=True)), [False, True])
+
+    def test_edited_expenses_are_matched_by_their_new_values(self):
+        expense = Expense.objects.create(title='Taxi', amount=Decimal('12.00'), expense_date=date(2026, 1, 5))
+        self.client.post(reverse('expense-update', args=[expense.pk]), {
+            'title': 'Taxi', 'amount': '15.00', 'expense_date': '2026-01-05', 'category': 'Travel',
+        })
+        result = self.import_expenses(
+            'Taxi,12.00,2026-01-05,Travel\n',  # what it was
+            'Taxi,15.00,2026-01-05,Travel\n',  # what it is now
+            on_duplicate='skip',
+        )
+        self.assertEqual([line for line, _, _ in result.skipped], [3])
+
+        # a receipt's fingerprint covers its text, it is kept while the fields it was made from are
+        receipt = Expense.objects.create(title='Uber', amount=Decimal('9.00'), expense_date=date(2026, 1, 5), fingerprint='from the text')
+        receipt = Expense.objects.get(pk=receipt.pk)
+        receipt.category = 'Travel'
+        receipt.save()
+        self.assertEqual(Expense.objects.get(pk=receipt.pk).fingerprint, 'from the text')
+
+    def test_rejects_file_keeps_the_original_columns(self):
+        files = tempfile.TemporaryDirectory()
+        self.addCleanup(files.cleanup)
+        source, rejects = Path(files.name) / 'expenses.csv', Path(files.name) / 'rejects.csv'
+        source.write_text(self.HEADER + '"Taxi, airport ""express""",lots,2026-01-05,Travel\n')
+        call_command('import_csv', 'expenses', str(source), rejects=str(rejects), stdout=StringIO())
+        with open(rejects, newline='') as rejects_file:
+            header, row = list(csv.reader(rejects_file))
+        self.assertEqual(header, ['line', 'errors', 'title', 'amount', 'expense_date', 'category'])
+        self.assertEqual([row[0], *row[2:]], ['2', 'Taxi, airport "express"', 'lots', '2026-01-05', 'Travel'])
+
+    def test_skipped_duplicates_are_reported(self):
+        Expense.objects.create(title='Taxi', amount=Decimal('12.00'), expense_date=date(2026, 1, 5))
+        csv = SimpleUploadedFile('expenses.csv', (self.HEADER + 'Taxi,12.00,2026-01-05,Travel\n').encode())
+        self.client.post(reverse('data-import'), {'kind': 'expenses', 'csv_file': csv, 'on_duplicate': 'skip'})
+        run_due_jobs()
+        response = self.client.get(reverse('job-status', args=[Job.objects.get().pk]))
+        self.assertContains(response, '1 duplicate skipped')
+        self.assertContains(response, 'Duplicate of an expense already imported')
+
+
+def text_pdf(text):
+    # a one page PDF with `text` in its text layer
+    stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode()
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    pdf_bytes, offsets = b'%PDF-1.4\n', []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf_bytes))
+        pdf_bytes += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf_bytes)
+    pdf_bytes += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf_bytes += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    return pdf_bytes + b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+
+
+class ReceiptUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, JOB_FILES_DIR=media.name))
+        self.media = media.name
+
+    def upload(self, *files, **data):
+        return self.client.post(reverse('upload-receipts'), {'receipts': list(files), **data})
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media)
+            for root, _, names in os.walk(os.path.join(self.media, 'receipts')) for name in names
+        )
+
+    def test_identical_files_are_stored_once(self):
+        response = self.upload(
+            SimpleUploadedFile('a.pdf', b'%PDF same bytes'),
+            SimpleUploadedFile('b.PDF', b'%PDF same bytes'),
+            SimpleUploadedFile('notes.exe', b'nope'),
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertContains(response, 'Skipped notes.exe', status_code=202)
+        [stored] = self.stored_files()
+        self.assertRegex(stored, r'^receipts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(
+            [job.payload['stored_name'] for job in Job.objects.order_by('pk')],
+            ['/'.join(stored.split(os.sep))] * 2,
+        )
+
+    @override_settings(RECEIPT_UPLOAD_MAX_SIZE=10)
+    def test_oversized_file_is_dropped(self):
+        response = self.upload(SimpleUploadedFile('big.pdf', b'%PDF' + b'x' * 100))
+        self.assertContains(response, 'Skipped big.pdf')
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(Job.objects.exists())
+
+    def test_job_creates_the_expense_with_its_receipt(self):
+        with mock.patch.object(receipt_files, 'extract_text', return_value=RECEIPT_TEXT):
+            self.upload(SimpleUploadedFile('uber.pdf', b'%PDF ride'))
+            self.upload(SimpleUploadedFile('again.pdf', b'%PDF ride'))
+            run_due_jobs()
+        expense = Expense.objects.get()
+        first, again = Job.objects.order_by('pk')
+        self.assertEqual((expense.title, expense.amount), ('Uber Purchase', Decimal('12.50')))
+        self.assertEqual(expense.receipt.name, first.payload['stored_name'])
+        self.assertEqual((again.result['created'], again.result['duplicates']), (0, 1))
+
+        response = self.client.get(reverse('expense-receipt', args=[expense.pk]))
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF ride')
+        response = self.client.get(reverse('expense-receipt', args=[expense.pk]), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_unreadable_file_is_reported(self):
+        with mock.patch.object(receipt_files, 'extract_text', return_value='  \n'):
+            job = jobs.enqueue('import_receipt_file', stored_name='receipts/x.pdf', name='scan.pdf')
+            run_due_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result['failed']), (Job.DONE, 1))
+        self.assertEqual(job.result['report'][0]['error'], 'No text found in this file.')
+
+    @skipUnless(receipt_files.PdfReader, 'needs pypdf')
+    def test_pdf_text_layer(self):
+        name, new = receipt_files.store([text_pdf('Total 12.50')], 'receipt.pdf')
+        self.assertTrue(new)
+        self.assertIn('Total 12.50', receipt_files.extract_text(name))
+
+
+class InvoiceBulkTests(TestCase):
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        self.invoices = [
+            Invoice.objects.create(
+                client=self.acme, title=f'Work {number}', invoice_number=f'BULK-{number}',
+                due_date=date(2026, 1, 31), amount=Decimal('10.00') * (number + 1),
+                status=Invoice.SENT if number % 2 else Invoice.DRAFT,
+            )
+            for number in range(12)
+        ]
+        rollups.rebuild()
+
+    def bulk(self, action, invoices, **data):
+        return self.client.post(reverse('invoice-bulk'), {'action': action, 'ids': [invoice.pk for invoice in invoices], **data})
+
+    def assert_rollups_match_rebuild(self):
+        current = set(InvoiceMonthlyRollup.objects.filter(count__gt=0).values_list('month', 'status', 'total', 'count'))
+        rollups.rebuild()
+        self.assertEqual(current, set(InvoiceMonthlyRollup.objects.values_list('month', 'status', 'total', 'count')))
+
+    def test_status_change_is_one_update(self):
+        self.bulk('status', self.invoices[:2], status=Invoice.PAID)  # creates the PAID rollup bucket
+        with CaptureQueriesContext(connection) as few:
+            self.bulk('status', self.invoices[2:4], status=Invoice.PAID)
+        with CaptureQueriesContext(connection) as many:
+            response = self.bulk('status', self.invoices[4:], status=Invoice.PAID)
+        # queries depend on the rollup buckets touched, not on the number of invoices
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(sum('UPDATE "core_invoice"' in query['sql'] for query in many), 1)
+
+        self.assertEqual(set(Invoice.objects.values_list('status', flat=True)), {Invoice.PAID})
+        self.assertContains(response, f'<li hx-swap-oob="true" id="invoice-{self.invoices[4].pk}"')
+        self.assertEqual(response.content.count(b'hx-swap-oob'), 8)
+        self.assert_rollups_match_rebuild()
+
+    def test_unchanged_rows_are_not_swapped(self):
+        response = self.bulk('status', self.invoices[:4], status=Invoice.SENT)
+        self.assertEqual(response.content.count(b'hx-swap-oob'), 2)
+
+    def test_delete(self):
+        pdf_cache = tempfile.TemporaryDirectory()
+        self.addCleanup(pdf_cache.cleanup)
+        self.enterContext(override_settings(INVOICE_PDF_CACHE_DIR=pdf_cache.name))
+        cached = pdf.store(self.invoices[0], b'%PDF cached')
+
+        # the per-row receivers stand aside, the view updates everything once for the batch
+        with mock.patch.object(rollups, 'record_deleted') as record_deleted, \
+                mock.patch.object(search, 'remove_invoice') as remove_invoice, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.bulk('delete', self.invoices[:5])
+        record_deleted.assert_not_called()
+        remove_invoice.assert_not_called()
+        self.assertEqual(Invoice.objects.count(), 7)
+        self.assertContains(response, f'<li id="invoice-{self.invoices[4].pk}" hx-swap-oob="delete"></li>', html=False)
+        self.assert_rollups_match_rebuild()
+        # nothing is left in the search index or the PDF cache
+        self.assertFalse(cached.exists())
+        if search.is_available():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT count(*) FROM {search.TABLE}')
+                self.assertEqual(cursor.fetchone()[0], 7)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.bulk('status', self.invoices, status='LOST').status_code, 400)
+        self.assertEqual(self.bulk('delete', []).status_code, 400)
+        self.assertEqual(self.client.post(reverse('invoice-bulk'), {'action': 'delete', 'ids': ['x']}).status_code, 400)
+
+
+class ReportTests(TestCase):
+    today = date(2026, 3, 31)
+
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        other = Client.objects.create(name='Globex', email='globex@example.com')
+        for number, (client, days_past_due, amount, status) in enumerate([
+            (self.acme, -5, '100.00', Invoice.SENT),  # not due yet
+            (self.acme, 0, '10.00', Invoice.SENT),
+            (self.acme, 1, '20.00', Invoice.SENT),
+            (self.acme, 45, '30.00', Invoice.SENT),
+            (self.acme, 91, '40.00', Invoice.SENT),
+            (self.acme, 200, '50.00', Invoice.PAID),
+            (self.acme, 200, '60.00', Invoice.DRAFT),
+            (other, 61, '5.00', Invoice.SENT),
+        ]):
+            Invoice.objects.create(
+                client=client, title='Work', invoice_number=f'AR-{number}', status=status,
+                due_date=self.today - timedelta(days=days_past_due), amount=Decimal(amount),
+            )
+
+    def test_aging_buckets(self):
+        with self.assertNumQueries(2):  # the generation and the grouped query
+            report = reports.aging(self.today)
+        acme, globex = report['rows']
+        self.assertEqual(acme['client__name'], 'Acme')
+        self.assertEqual(
+            [amount for _, amount in acme['buckets']],
+            [Decimal('110.00'), Decimal('20.00'), Decimal('30.00'), Decimal('0'), Decimal('40.00')],
+        )
+        self.assertEqual((acme['total'], acme['count']), (Decimal('200.00'), 5))
+        self.assertEqual(globex['days_61_90'], Decimal('5.00'))
+        self.assertEqual((report['totals']['total'], report['totals']['count']), (Decimal('205.00'), 6))
+
+    def test_reports_are_cached_until_an_invoice_changes(self):
+        reports.aging(self.today)
+        with self.assertNumQueries(1):  # the generation
+            reports.aging(self.today)
+        Invoice.objects.filter(invoice_number='AR-4').get().delete()
+        self.assertEqual(reports.aging(self.today)['totals']['total'], Decimal('165.00'))
+
+    def test_changes_from_other_processes_are_seen(self):
+        reports.aging(self.today)
+        # a job worker changes an invoice: its process bumps the shared generation, not this one's cache
+        Invoice.objects.filter(invoice_number='AR-4').update(amount=Decimal('0.00'))
+        CacheGeneration.objects.filter(key=reports.GENERATION_KEY).update(value=F('value') + 1)
+        self.assertEqual(reports.aging(self.today)['totals']['total'], Decimal('165.00'))
+
+    def test_statement(self):
+        with self.assertNumQueries(3):
+            statement = reports.statement(self.acme, self.today)
+        summary = statement['summary']
+        self.assertEqual(
+            (summary['billed'], summary['paid'], summary['outstanding'], summary['open_count']),
+            (Decimal('250.00'), Decimal('50.00'), Decimal('200.00'), 5),
+        )
+        self.assertEqual([line['days_past_due'] for line in statement['lines']], [91, 45, 1, 0, 0])
+        response = self.client.get(reverse('client-statement', args=[self.acme.pk]))
+        self.assertContains(response, '#AR-4')
+
+
+class ProfitAndLossTests(TestCase):
+    def setUp(self):
+        for month, total in [(date(2025, 11, 1), '1000.00'), (date(2026, 1, 1), '500.00'), (date(2026, 2, 1), '250.00')]:
+            InvoiceMonthlyRollup.objects.create(month=month, status=Invoice.PAID, total=Decimal(total), count=1)
+        InvoiceMonthlyRollup.objects.create(month=date(2026, 2, 1), status=Invoice.SENT, total=Decimal('999.00'), count=1)
+        for title, day, amount, category in [
+            ('Flight', date(2025, 12, 20), '300.00', 'Travel'),
+            ('Hotel', date(2026, 1, 5), '120.50', 'Travel'),
+            ('Hosting', date(2026, 1, 31), '20.00', 'Hosting'),
+            ('Coffee', date(2026, 2, 2), '4.50', None),
+        ]:
+            Expense.objects.create(title=title, expense_date=day, amount=Decimal(amount), category=category)
+
+    def test_months(self):
+        report = reports.profit_and_loss()
+        self.assertEqual([row['label'] for row in report['rows']], ['Feb 2026', 'Jan 2026', 'Dec 2025', 'Nov 2025'])
+        january = report['rows'][1]
+        self.assertEqual(january['expenses'], {'Travel': Decimal('120.50'), 'Hosting': Decimal('20.00')})
+        self.assertEqual((january['income'], january['net']), (Decimal('500.00'), Decimal('359.50')))
+        self.assertEqual(report['categories'], ['Travel', 'Hosting', reports.UNCATEGORIZED])
+        self.assertEqual(report['totals']['net'], Decimal('1305.00'))
+
+    def test_quarters_years_and_category(self):
+        quarters = reports.profit_and_loss('quarter')
+        self.assertEqual([(row['label'], row['net']) for row in quarters['rows']], [
+            ('2026 Q1', Decimal('605.00')), ('2025 Q4', Decimal('700.00')),
+        ])
+        years = reports.profit_and_loss('year', category='Travel')
+        self.assertEqual([(row['label'], row['expense_total']) for row in years['rows']], [
+            ('2026', Decimal('120.50')), ('2025', Decimal('300.00')),
+        ])
+        uncategorized = reports.profit_and_loss('year', category=reports.UNCATEGORIZED)
+        self.assertEqual(uncategorized['totals']['expense_total'], Decimal('4.50'))
+
+    def test_cached_until_an_expense_changes(self):
+        reports.profit_and_loss()
+        with self.assertNumQueries(1):  # the generation
+            reports.profit_and_loss()
+        Expense.objects.create(title='Train', expense_date=date(2026, 2, 10), amount=Decimal('30.00'), category='Travel')
+        self.assertEqual(reports.profit_and_loss()['rows'][0]['expenses']['Travel'], Decimal('30.00'))
+
+    def test_views(self):
+        self.assertContains(self.client.get(reverse('pnl-report'), {'period': 'quarter'}), '2026 Q1')
+        data = self.client.get(reverse('pnl-json'), {'period': 'year', 'category': 'Hosting'}).json()
+        self.assertEqual(data['rows'][0]['expenses'], {'Hosting': '20.00'})
+
+
+class ForecastTests(TestCase):
+    start = date(2026, 3, 15)
+
+    def test_projection(self):
+        software = [date(2025, month, 3) for month in range(3, 13)] + [date(2026, 1, 3), date(2026, 2, 3)]
+        result = forecast.project(
+            self.start, 2,
+            due=np.array(['2026-03-01', '2026-03-20', '2030-01-01'], dtype='datetime64[D]'),
+            invoice_amounts=np.array([100.0, 200.0, 999.0]),
+            expense_dates=np.array(software + [date(2026, 2, 10)], dtype='datetime64[D]'),
+            expense_categories=np.array([0] * 12 + [1]),
+            expense_amounts=np.array([31.0] * 12 + [500.0]),
+            categories=['Software', 'Travel'],
+            opening_balance=1000.0,
+        )
+        self.assertEqual((result['days'][0], result['days'][-1]), (np.datetime64('2026-03-15'), np.datetime64('2026-05-31')))
+        self.assertEqual((result['inflow'][0], result['inflow'][5], result['inflow'].sum()), (100.0, 200.0, 300.0))
+        self.assertEqual(result['recurring'], {'Software': 31.0})  # the one-off trip isn't recurring
+        # 17 March days of a 31 day month, then April and May in full
+        self.assertEqual(list(result['monthly_outflow'].round(2)), [17.0, 31.0, 31.0])
+        self.assertAlmostEqual(result['monthly_balance'][-1], 1000 + 300 - 79)
+        self.assertAlmostEqual(result['monthly_tax_pool'][-1], 75)
+
+    def test_forecast_page(self):
+        acme = Client.objects.create(name='Acme', email='acme@example.com')
+        Invoice.objects.create(
+            client=acme, title='Work', invoice_number='F-1', status=Invoice.SENT,
+            due_date=timezone.localdate() + timedelta(days=10), amount=Decimal('400.00'),
+        )
+        Expense.objects.create(title='Hosting', amount=Decimal('20.00'), expense_date=timezone.localdate() - timedelta(days=40), category='Hosting')
+        rows = forecast.monthly_rows(forecast.forecast(months=3))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(sum(row['inflow'] for row in rows), 400.0)
+        self.assertContains(self.client.get(reverse('cash-forecast'), {'months': 3}), 'Cash-Flow Forecast')
+
+
+class StaticAssetsTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        source = os.path.join(tmp.name, 'source', 'core', 'css')
+        os.makedirs(source)
+        self.css = b'.fade-in { animation: fadeIn 0.4s ease-in-out; }\n' * 40
+        with open(os.path.join(source, 'app.css'), 'wb') as css:
+            css.write(self.css)
+        self.enterContext(override_settings(
+            STATIC_ROOT=os.path.join(tmp.name, 'root'),
+            STATICFILES_DIRS=[os.path.join(tmp.name, 'source')],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        ))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.middleware = assets.StaticAssetsMiddleware(lambda request: HttpResponse(status=404))
+
+    def get(self, path, **headers):
+        return self.middleware(RequestFactory().get(path, headers=headers))
+
+    def test_hashed_names_are_cached_forever_and_precompressed(self):
+        url = static('core/css/app.css')
+        self.assertRegex(url, r'^/static/core/css/app\.[0-9a-f]{12}\.css$')
+
+        if assets.brotli:  # optional
+            response = self.get(url, accept_encoding='gzip, deflate, br')
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(assets.brotli.decompress(response.content), self.css)
+
+        response = self.get(url, accept_encoding='gzip, br;q=0')
+        self.assertEqual(response['Cache-Control'], assets.FOREVER)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.css)
+
+        self.assertEqual(self.get(url, if_none_match=response['ETag']).status_code, 304)
+
+    def test_unhashed_names_are_revalidated(self):
+        response = self.get('/static/core/css/app.css', accept_encoding='gzip')
+        self.assertEqual(response['Cache-Control'], assets.REVALIDATE)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.css)
+        self.assertEqual(self.get('/static/../manage.py').status_code, 404)
+
+    def test_pages_use_tailwind_cdn_until_stylesheet_is_built(self):
+        response = self.client.get(reverse('expense-list'))
+        self.assertContains(response, '<link rel="stylesheet" href="/static/core/css/app.')
+        self.assertNotContains(response, assets.TAILWIND_PLAY_CDN)
+
+        empty = tempfile.TemporaryDirectory()
+        self.addCleanup(empty.cleanup)
+        with override_settings(STATIC_ROOT=empty.name, STATICFILES_DIRS=[empty.name]):
+            response = self.client.get(reverse('expense-list'))
+        self.assertNotContains(response, '<link rel="stylesheet"')
+        self.assertContains(response, assets.TAILWIND_PLAY_CDN)
+        self.assertContains(response, '@tailwind utilities')
+
+
+# view benchmarks, only run when asked for, e.g.
+#   BENCHMARK_SCALES=200,2000 python manage.py test core --tag benchmark
+# with the row counts per run (10000,100000,1000000 for the big runs) and BENCHMARK_REPEAT requests per view
+
+BENCHMARK_SCALES = [int(scale) for scale in os.environ.get('BENCHMARK_SCALES', '200,2000').split(',')]
+BENCHMARK_REPEAT = int(os.environ.get('BENCHMARK_REPEAT', '3'))
+
+RECEIPT_TEXT = 'Thanks for riding with Uber\nMar 05, 2024\nTotal €12.50'
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+# the request timing middleware is left out, it would log every one of the requests
+@tag('benchmark')
+@skipUnless(os.environ.get('BENCHMARK_SCALES'), 'set BENCHMARK_SCALES to run the view benchmarks')
+@override_settings(RECEIPT_INGEST_WORKERS=1, INVOICE_PDF_PROCESSES=1, PERF_INSTRUMENTATION=False)
+class ViewBenchmarkTests(TestCase):
+    """
+    Drives every URL in core/urls.py with the test client at growing row counts, reports latency
+    percentiles and query counts, and fails when a view needs more queries for more rows.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pdf_cache = tempfile.TemporaryDirectory()
+        cls.job_files = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(
+            INVOICE_PDF_CACHE_DIR=cls.pdf_cache.name, JOB_FILES_DIR=cls.job_files.name, MEDIA_ROOT=cls.job_files.name,
+        ))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.pdf_cache.cleanup()
+        cls.job_files.cleanup()
+
+    def setUp(self):
+        # a client with a fixed handful of invoices, for the views that export "one client"
+        self.bench_client = Client.objects.create(name='Benchmark Client', email='bench@example.com')
+        self.bench_invoices = [
+            Invoice.objects.create(
+                client=self.bench_client, title=f'Benchmark {number}', invoice_number=f'BENCH-{number}',
+                due_date=date(2026, 1, 31), amount=Decimal('100.00'),
+            )
+            for number in range(3)
+        ]
+        self.expense = Expense.objects.create(
+            title='Benchmark', amount=Decimal('9.99'), expense_date=date(2026, 1, 5),
+            receipt=receipt_files.store([b'%PDF benchmark'], 'benchmark.pdf')[0],
+        )
+        self.export_job = jobs.enqueue('export_invoice_pdfs', client_id=str(self.bench_client.pk))
+        jobs.run(jobs.claim('benchmark'))
+
+    def requests(self):
+        """
+        {label: (url name, callable making one request)}, several labels for views with interesting parameters.
+        """
+        invoice = self.bench_invoices[0]
+        expense = self.expense
+        invoice_data = {'client': self.bench_client.pk, 'title': 'Benchmark', 'amount': '10.00',
+                        'due_date': '2026-02-01', 'status': Invoice.SENT}
+        expense_data = {'title': 'Benchmark', 'amount': '5.00', 'expense_date': '2026-01-05', 'category': 'Travel'}
+
+        def spare_invoice():
+            return Invoice.objects.create(
+                client=self.bench_client, title='Spare', invoice_number=f'SPARE-{random.random()}',
+                due_date=date(2026, 1, 31), amount=Decimal('1.00'),
+            )
+
+        def get(name, *args, **query):
+            return lambda: self.client.get(reverse(name, args=args), query)
+
+        def post(name, data, *args):
+            return lambda: self.client.post(reverse(name, args=args), data() if callable(data) else data)
+
+        list_partial = reverse('invoice-list-partial')
+        return {
+            'invoice-list': ('invoice-list', get('invoice-list')),
+            # the test client is WSGI, so this is the no-stream answer
+            'dashboard-events': ('dashboard-events', get('dashboard-events')),
+            'invoice-create': ('invoice-create', get('invoice-create')),
+            'invoice-store': ('invoice-store', post('invoice-store', invoice_data)),
+            'invoice-edit': ('invoice-edit', get('invoice-edit', invoice.pk)),
+            'invoice-update': ('invoice-update', post('invoice-update', invoice_data, invoice.pk)),
+            'invoice-delete': ('invoice-delete', lambda: self.client.delete(reverse('invoice-delete', args=[spare_invoice().pk]))),
+            'invoice-detail': ('invoice-detail', get('invoice-detail', invoice.pk)),
+            'clear-form': ('clear-form', get('clear-form')),
+            'invoice-pdf': ('invoice-pdf', get('invoice-pdf', invoice.pk)),
+            'invoice-pdf-export': ('invoice-pdf-export', get('invoice-pdf-export', client=self.bench_client.pk)),
+            'invoice-pdf-export job': ('invoice-pdf-export', post('invoice-pdf-export', {'client': self.bench_client.pk})),
+            'invoice-export csv': ('invoice-export', get('invoice-export')),
+            'invoice-export ndjson': ('invoice-export', get('invoice-export', format='ndjson')),
+            'invoice-bulk': ('invoice-bulk', post('invoice-bulk', {
+                'action': 'status', 'status': Invoice.SENT, 'ids': [invoice.pk for invoice in self.bench_invoices],
+            })),
+            'invoice-list-partial': ('invoice-list-partial', lambda: self.client.get(list_partial)),
+            'invoice-list-partial amount asc': ('invoice-list-partial', lambda: self.client.get(list_partial, {'sort_by': 'amount', 'sort_order': 'asc'})),
+            'invoice-list-partial client': ('invoice-list-partial', lambda: self.client.get(list_partial, {'sort_by': 'client__name'})),
+            'invoice-list-partial due date': ('invoice-list-partial', lambda: self.client.get(list_partial, {'sort_by': 'due_date'})),
+            'invoice-list-partial search': ('invoice-list-partial', lambda: self.client.get(list_partial, {'search': 'website'})),
+            'invoice-list-partial relevance': ('invoice-list-partial', lambda: self.client.get(list_partial, {'search': 'design', 'sort_by': 'relevance'})),
+            'expense-list': ('expense-list', get('expense-list')),
+            'expense-list next page': ('expense-list', get('expense-list', cursor=encode_cursor(date(2026, 1, 5), expense.pk))),
+            'expense-inbox': ('expense-inbox', get('expense-inbox')),
+            'parse-receipt': ('parse-receipt', post('parse-receipt', {'receipt_text': RECEIPT_TEXT, 'on_duplicate': 'flag'})),
+            'import-receipts': ('import-receipts', post('import-receipts', lambda: {
+                'archive': SimpleUploadedFile('receipt.txt', RECEIPT_TEXT.encode()), 'on_duplicate': 'flag',
+            })),
+            'upload-receipts': ('upload-receipts', post('upload-receipts', lambda: {
+                'receipts': SimpleUploadedFile('receipt.pdf', b'%PDF benchmark'), 'on_duplicate': 'flag',
+            })),
+            'expense-export': ('expense-export', get('expense-export')),
+            'expense-create': ('expense-create', get('expense-create')),
+            'expense-store': ('expense-store', post('expense-store', expense_data)),
+            'expense-edit': ('expense-edit', get('expense-edit', expense.pk)),
+            'expense-update': ('expense-update', post('expense-update', expense_data, expense.pk)),
+            'expense-delete': ('expense-delete', lambda: self.client.delete(reverse('expense-delete', args=[
+                Expense.objects.create(title='Spare', amount=Decimal('1.00'), expense_date=date(2026, 1, 5)).pk,
+            ]))),
+            'expense-detail': ('expense-detail', get('expense-detail', expense.pk)),
+            'expense-receipt': ('expense-receipt', get('expense-receipt', expense.pk)),
+            'data-import': ('data-import', get('data-import')),
+            'data-import expenses': ('data-import', post('data-import', lambda: {
+                'kind': 'expenses',
+                'csv_file': SimpleUploadedFile('expenses.csv', b'title,amount,expense_date,category\nTaxi,12.00,2026-01-05,Travel\n'),
+            })),
+            'aging-report': ('aging-report', get('aging-report')),
+            'pnl-report': ('pnl-report', get('pnl-report')),
+            'pnl-json': ('pnl-json', get('pnl-json')),
+            'cash-forecast': ('cash-forecast', get('cash-forecast')),
+            'client-statement': ('client-statement', get('client-statement', self.bench_client.pk)),
+            'job-status': ('job-status', get('job-status', self.export_job.pk)),
+            'job-download': ('job-download', get('job-download', self.export_job.pk)),
+        }
+
+    def measure(self, make_request):
+        timings = []
+        queries = 0
+        for _ in range(BENCHMARK_REPEAT):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = make_request()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - start
+            self.assertLess(response.status_code, 400, response)
+            timings.append(elapsed * 1000)
+            queries = max(queries, len(captured))
+        return timings, queries
+
+    def test_every_url_is_benchmarked(self):
+        url_names = {pattern.name for pattern in get_resolver('core.urls').url_patterns}
+        self.assertEqual({name for name, _ in self.requests().values()}, url_names)
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        rng = random.Random(14)
+        results = {}
+        seeded = 0
+        for scale in sorted(BENCHMARK_SCALES):
+            seed_clients(max(1, (scale - seeded) // 20), rng)
+            seed_invoices(scale - seeded, rng)
+            seed_expenses(scale - seeded, rng)
+            seeded = scale
+            for label, (_, make_request) in self.requests().items():
+                results[(label, scale)] = self.measure(make_request)
+
+        report = [f"\n{'view':<34} {'rows':>9} {'p50':>9} {'p95':>9} {'queries':>8}"]
+        for (label, scale), (timings, queries) in results.items():
+            report.append(
+                f"{label:<34} {scale:>9} {percentile(timings, 0.5):>7.1f}ms {percentile(timings, 0.95):>7.1f}ms {queries:>8}"
+            )
+        sys.stderr.write('\n'.join(report) + '\n')
+
+        smallest = min(BENCHMARK_SCALES)
+        for (label, scale), (timings, queries) in results.items():
+            with self.subTest(view=label, rows=scale):
+                self.assertLessEqual(queries, results[(label, smallest)][1])
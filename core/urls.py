@@ -5,6 +5,7 @@ from . import views
 
 urlpatterns = [
     path('', views.invoice_list, name='invoice-list'),
+    path('dashboard/events/', views.dashboard_events, name='dashboard-events'),
     path('invoices/create/', views.invoice_create, name='invoice-create'),
     path('invoices/store/', views.invoice_store, name='invoice-store'),
     path('invoices/<int:pk>/edit/', views.invoice_edit, name='invoice-edit'),
@@ -13,12 +14,18 @@ urlpatterns = [
     path('invoices/<int:pk>/', views.invoice_detail, name='invoice-detail'),
     path('invoices/clear/', views.clear_form, name='clear-form'),
     path('invoices/<int:pk>/pdf/', views.generate_invoice_pdf, name='invoice-pdf'),
+    path('invoices/export/pdf/', views.export_invoice_pdfs, name='invoice-pdf-export'),
+    path('invoices/export/', views.export_invoices, name='invoice-export'),
     path('invoices/list/', views.invoice_list_partial, name='invoice-list-partial'),
+    path('invoices/bulk/', views.invoice_bulk, name='invoice-bulk'),
 
     # expense urls
     path('expenses/', views.expense_list, name='expense-list'),
     path('expenses/inbox/', views.expense_inbox, name='expense-inbox'),
     path('expenses/parse/', views.parse_receipt, name='parse-receipt'),
+    path('expenses/import/', views.import_receipts, name='import-receipts'),
+    path('expenses/upload/', views.upload_receipts, name='upload-receipts'),
+    path('expenses/export/', views.export_expenses, name='expense-export'),
 
     # expense CRUD urls
     path('expenses/create/', views.expense_create, name='expense-create'),
@@ -27,4 +34,19 @@ urlpatterns = [
     path('expenses/<int:pk>/update/', views.expense_update, name='expense-update'),
     path('expenses/<int:pk>/delete/', views.expense_delete, name='expense-delete'),
     path('expenses/<int:pk>/', views.expense_detail, name='expense-detail'),
+    path('expenses/<int:pk>/receipt/', views.expense_receipt, name='expense-receipt'),
+
+    # csv import
+    path('import/', views.data_import, name='data-import'),
+
+    # reports
+    path('reports/aging/', views.aging_report, name='aging-report'),
+    path('reports/forecast/', views.cash_forecast, name='cash-forecast'),
+    path('reports/pnl/', views.pnl_report, name='pnl-report'),
+    path('reports/pnl.json', views.pnl_json, name='pnl-json'),
+    path('clients/<int:pk>/statement/', views.client_statement, name='client-statement'),
+
+    # background jobs
+    path('jobs/<int:pk>/', views.job_status, name='job-status'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job-download'),
 ]
\ No newline at end of file
@@ -1,77 +1,75 @@
 # core/views.py
 
 import json
-import re
-from datetime import datetime, date
-import random
-from decimal import Decimal
-
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.defaultfilters import pluralize
 from django.template.loader import render_to_string
-from weasyprint import HTML
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncMonth
-from dateutil.relativedelta import relativedelta
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse
-from django.utils.timezone import now
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from django.utils.html import format_html, format_html_join
+from django.utils.http import content_disposition_header, http_date
+from django.utils.timezone import localdate, now
 from django.contrib import messages
-from django.db.models import Q
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 
-from .models import Invoice, Client, Expense
+from .models import Invoice, Client, Expense, Job
 from .forms import InvoiceForm, ExpenseForm
+from . import conditional, exports, forecast, fragments, imports, jobs, live, numbering, pdf, receipt_files, receipts, reports, rollups, search
+from .pagination import keyset_page
+from .signals import batch_delete
 
 
 # invoice views
-def invoice_list(request):
-    invoices = Invoice.objects.all()
-
-    # financial dashboard cards
-    paid_invoices_total = Invoice.objects.filter(status='PAID').aggregate(total=Sum('amount'))
-    total_income = paid_invoices_total['total'] or Decimal('0.00')
-    sent_invoices_total = Invoice.objects.filter(status='SENT').aggregate(total=Sum('amount'))
-    total_outstanding = sent_invoices_total['total'] or Decimal('0.00')
-    TAX_RATE = Decimal('0.25')
-    tax_pool = total_income * TAX_RATE
-
-    # chart data preparation
-    # the date 6 months ago from today
-    six_months_ago = date.today() - relativedelta(months=5)
-
-    # query the database to get total income grouped by month
-    monthly_income_data = Invoice.objects.filter(
-        status='PAID',
-        created_at__gte=six_months_ago
-    ).annotate(
-        month=TruncMonth('created_at')
-    ).values(
-        'month'
-    ).annotate(
-        total_income=Sum('amount')
-    ).order_by('month')
-
-    # to format the data for Chart.js
-    chart_labels = []
-    chart_data = []
-    # a dictionary for easy lookup
-    income_dict = {item['month'].strftime('%b %Y'): item['total_income'] for item in monthly_income_data}
-
-    # generate labels for the last 6 months
-    for i in range(6):
-        current_month = six_months_ago + relativedelta(months=i)
-        month_str = current_month.strftime('%b %Y')
-        chart_labels.append(month_str)
-        chart_data.append(float(income_dict.get(month_str, 0)))  # arba nieko, jei nulis
+async def invoice_list(request):
+    # the first page of invoices, then the dashboard cards and chart from the monthly rollup table.
+    # one after the other: the ORM runs on the single thread sync code shares, gathering wouldn't overlap them
+    context = await sync_to_async(invoice_page_context)(request)
+    context.update(await rollups.adashboard())
+    context['status_choices'] = Invoice.STATUS_CHOICES
+    context['invoices'] = await sync_to_async(fragments.render_rows)('invoice', context['invoices'])
+    return await sync_to_async(render)(request, 'core/invoice_list.html', context)
+
+async def dashboard_events(request):
+    """
+    Server-Sent Events stream for the dashboard: the current card values and chart once,
+    then only what changed after each invoice save or delete.
+    Served by the ASGI app, every open dashboard is an idle task on the event loop.
+    """
+    if not isinstance(request, ASGIRequest):
+        # a sync worker would be tied up for as long as the page stays open; 204 tells EventSource not to retry
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(dashboard_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # no proxy buffering of the stream
+    return response
 
 
-    context = {
-        'invoices': invoices,
-        'total_income': total_income,
-        'total_outstanding': total_outstanding,
-        'tax_pool': tax_pool,
-        'chart_labels': chart_labels,
-        'chart_data': chart_data,
-    }
-    return render(request, 'core/invoice_list.html', context)
+async def dashboard_stream():
+    subscription = live.broker.subscribe()
+    try:
+        state = live.broker.state
+        if state is None:
+            state = live.dashboard_state(await rollups.adashboard())
+            live.broker.remember(state)
+        yield live.sse_message('dashboard', live.render_changes(state))
+        while True:
+            html = await subscription.next(live.HEARTBEAT)
+            if html is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield live.sse_message('dashboard', html)
+    finally:
+        # the client went away, Django cancels the stream
+        live.broker.unsubscribe(subscription)
+
 
 def invoice_create(request):
     form = InvoiceForm()
@@ -83,12 +81,14 @@ def invoice_store(request):
         form = InvoiceForm(request.POST)
         if form.is_valid():
             invoice = form.save(commit=False)
-            invoice.invoice_number = f'INV-{random.randint(1000, 9999)}'
-            invoice.save()
+            # allocated before the transaction, the counter is reserved in its own
+            invoice.invoice_number = numbering.next_invoice_number()
+            with transaction.atomic():
+                invoice.save()  # the rollup receivers in core/signals.py commit with the row
             message = {"text": "Invoice created successfully!", "level": "success"}
 
             # OOB swaps for the HTML response
-            new_item_html = render(request, 'core/partials/invoice_item.html', {'invoice': invoice}).content.decode()
+            new_item_html = fragments.render_row('invoice', invoice)
             clear_form_html = '<div id="invoice-form-container" hx-swap-oob="true"></div>'
             remove_empty_message_html = '<li id="empty-message" hx-swap-oob="true"></li>'
 
@@ -112,11 +112,13 @@ def invoice_update(request, pk):
     if request.method == 'POST':
         form = InvoiceForm(request.POST, instance=invoice)
         if form.is_valid():
-            form.save()
+            # atomic, so the rollup receiver's lock on the old row holds until the new one is committed
+            with transaction.atomic():
+                form.save()
 
             message = {"text": "Invoice updated successfully!", "level": "success"}
 
-            response = render(request, 'core/partials/invoice_item.html', {'invoice': invoice})
+            response = HttpResponse(fragments.render_row('invoice', invoice))
             response['HX-Trigger-After-Swap'] = json.dumps({"showMessage": message})
             return response
         else:
@@ -127,7 +129,7 @@ def invoice_update(request, pk):
 def invoice_delete(request, pk):
     invoice = get_object_or_404(Invoice, pk=pk)
     if request.method == 'DELETE':
-        invoice.delete()
+        invoice.delete()  # the delete's transaction covers the rollup receiver too
 
         message = {"text": "Invoice deleted.", "level": "error"}
 
@@ -136,9 +138,94 @@ def invoice_delete(request, pk):
         return response
     return HttpResponse(status=405)
 
+BULK_LIMIT = 1000  # invoices per bulk action
+
+
+def invoice_bulk(request):
+    """
+    Status change, delete or PDF export of the invoices selected on the list. Changes are one set-based
+    UPDATE or DELETE in one transaction, the response OOB-swaps just the affected rows and the dashboard
+    rollups are updated once for the whole batch.
+    """
+    if request.method != 'POST':
+        return HttpResponse("Invalid request method.", status=405)
+
+    ids = request.POST.getlist('ids')
+    if not all(pk.isdigit() for pk in ids):
+        return HttpResponse("Invalid selection.", status=400)
+    ids = sorted({int(pk) for pk in ids})
+    if not ids:
+        return HttpResponse("Select some invoices first.", status=400)
+    if len(ids) > BULK_LIMIT:
+        return HttpResponse(f"Select at most {BULK_LIMIT} invoices.", status=400)
+
+    action = request.POST.get('action')
+    if action == 'status':
+        status = request.POST.get('status')
+        if status not in dict(Invoice.STATUS_CHOICES):
+            return HttpResponse("Invalid status.", status=400)
+        return bulk_set_status(ids, status)
+    if action == 'delete':
+        return bulk_delete(ids)
+    if action == 'export':
+        job = jobs.enqueue('export_invoice_pdfs', ids=ids)
+        status_html = render_to_string('core/partials/job_status.html', job_context(job), request)
+        return HttpResponse(format_html('<div id="export-status" class="mb-6" hx-swap-oob="true">{}</div>', status_html))
+    return HttpResponse("Unknown action.", status=400)
+
+
+def bulk_set_status(ids, status):
+    with transaction.atomic():
+        before = list(
+            Invoice.objects.select_for_update().filter(pk__in=ids).exclude(status=status)
+            .order_by().values_list('pk', 'created_at', 'status', 'amount')
+        )
+        changed = [pk for pk, *_ in before]
+        # update() skips save() and its signals: updated_at is the version the row and PDF caches check
+        Invoice.objects.filter(pk__in=changed).update(status=status, updated_at=now())
+        rollups.record_batch([row[1:] for row in before], status)
+        reports.invalidate()
+
+    invoices = fragments.render_rows('invoice', Invoice.objects.filter(pk__in=changed).select_related('client'))
+    count = len(changed)
+    message = {"text": f"{count} invoice{pluralize(count)} marked {dict(Invoice.STATUS_CHOICES)[status]}.", "level": "success"}
+
+    response = HttpResponse(''.join(fragments.oob(invoice.row_html) for invoice in invoices))
+    response['HX-Trigger'] = json.dumps({"showMessage": message})
+    return response
+
+
+def bulk_delete(ids):
+    with transaction.atomic():
+        selected = Invoice.objects.filter(pk__in=ids)
+        before = list(selected.select_for_update().order_by().values_list('pk', 'created_at', 'status', 'amount'))
+        deleted = [pk for pk, *_ in before]
+        # one DELETE through the ORM, with what the post_delete receivers would do per row done for the batch
+        with batch_delete():
+            Invoice.objects.filter(pk__in=deleted).delete()
+        rollups.record_batch([row[1:] for row in before])
+        search.remove_invoices(deleted)
+        reports.invalidate()
+        fragments.invalidate_many('invoice', deleted)
+        transaction.on_commit(lambda: pdf.purge_many(deleted))
+
+    count = len(deleted)
+    message = {"text": f"{count} invoice{pluralize(count)} deleted.", "level": "error"}
+
+    response = HttpResponse(format_html_join('', '<li id="invoice-{}" hx-swap-oob="delete"></li>', ((pk,) for pk in deleted)))
+    response['HX-Trigger'] = json.dumps({"showMessage": message})
+    return response
+
+
 def invoice_detail(request, pk):
-    invoice = get_object_or_404(Invoice, pk=pk)
-    return render(request, 'core/partials/invoice_item.html', {'invoice': invoice})
+    invoice = get_object_or_404(Invoice.objects.select_related('client'), pk=pk)
+
+    # htmx asks for the row again on every cancel, unchanged rows get a 304 before rendering
+    etag, last_modified = conditional.row_validators('invoice', [invoice])
+    not_modified = conditional.not_modified(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+    return conditional.add_validators(HttpResponse(fragments.render_row('invoice', invoice)), etag, last_modified)
 
 def clear_form(request):
     return HttpResponse("")
@@ -146,107 +233,111 @@ def clear_form(request):
 # expense views
 
 def expense_list(request):
-    expenses = Expense.objects.all()
-    return render(request, 'core/expense_list.html', {'expenses': expenses})
+    # newest first, a page at a time: requests with a cursor come from the infinite scroll and only get
+    # the next page of rows. rows come from the fragment cache, only new or changed ones are rendered
+    cursor = request.GET.get('cursor')
+    expenses, next_cursor = keyset_page(Expense.objects.all(), 'expense_date', True, cursor)
+    context = {
+        'expenses': fragments.render_rows('expense', expenses),
+        'cursor': cursor,
+        'next_query': urlencode({'cursor': next_cursor}) if next_cursor else None,
+    }
+    if cursor:
+        return render(request, 'core/partials/expense_list_page.html', context)
+    return render(request, 'core/expense_list.html', context)
 
 def expense_inbox(request):
     expenses = Expense.objects.all()[:5]
     return render(request, 'core/expense_inbox.html', {'expenses': expenses})
 
 
-def parse_receipt(request):
+async def parse_receipt(request):
     """
     Parses text from a submitted receipt and attempts to create an Expense.
     """
     if request.method == 'POST':
-        receipt_text = request.POST.get('receipt_text', '').lower()
-
-        PARSER_RULES = [
-            {'vendor': 'Uber', 'keywords': ['uber'], 'category': 'Travel'},
-            {'vendor': 'Amazon', 'keywords': ['amazon', 'order #'], 'category': 'Shopping'},
-            {'vendor': 'Google', 'keywords': ['google llc'], 'category': 'Software'},
-            {'vendor': 'Starbucks', 'keywords': ['starbucks'], 'category': 'Food & Drink'},
-            {'vendor': 'Maxima', 'keywords': ['maxima'], 'category': 'Groceries'},
-            {'vendor': 'Iki', 'keywords': ['iki'], 'category': 'Groceries'},
-        ]
-
-        # default values
-        amount = None
-        title = "Unknown Expense"
-        category = "Miscellaneous"
-        expense_date = now().date()  # default to today
-
-        # parsing logic
-
-        # parse the amount
-        amount = None
-
-        # split the receipt into individual lines
-        lines = receipt_text.split('\n')
-
-        lines.reverse()
-
-        total_line = None
-        for line in lines:
-            if 'total' in line and 'subtotal' not in line:
-                total_line = line
-                break
-
-        if total_line:
-            amount_match = re.search(r'€?(\d+\.\d{2})', total_line)
-            if amount_match:
-                amount = Decimal(amount_match.group(1))
-
-        if not amount:
-            all_numbers = re.findall(r'€?(\d+\.\d{2})', receipt_text)
-            if all_numbers:
-                amount = max([Decimal(n) for n in all_numbers])
-
-        for rule in PARSER_RULES:
-            if any(keyword in receipt_text for keyword in rule['keywords']):
-                title = f"{rule['vendor']} Purchase"
-                category = rule['category']
-                break  # stop after the first match
-
-        # parse the date
-        date_patterns = [
-            r'\b(\w{3})\s(\d{1,2}),\s(\d{4})\b',  # Mmm DD, YYYY
-            r'(\d{4})-(\d{2})-(\d{2})',  # YYYY-MM-DD
-            r'(\d{1,2})/(\d{1,2})/(\d{4})'  # DD/MM/YYYY
-        ]
-        date_str = None
-        for pattern in date_patterns:
-            date_match = re.search(pattern, receipt_text)
-            if date_match:
-                date_str = date_match.group(0)
-                break
-
-        if date_str:
-            try:
-                expense_date = datetime.strptime(date_str, '%b %d, %Y').date()
-            except ValueError:
-                try:
-                    expense_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                except ValueError:
-                    try:
-                        expense_date = datetime.strptime(date_str, '%d/%m/%Y').date()
-                    except ValueError:
-                        expense_date = now().date()
+        parsed = await sync_to_async(receipts.parse_receipt_text)(request.POST.get('receipt_text', ''))
+        on_duplicate = receipts.duplicate_policy(request.POST.get('on_duplicate'))
+        duplicate = parsed.amount and await receipts.ais_duplicate(parsed.fingerprint)
 
         # create the expense
-        if amount:
-            Expense.objects.create(
-                title=title,
-                amount=amount,
-                expense_date=expense_date,
-                category=category
-            )
-            messages.success(request, f"Successfully created expense: '{title}' for €{amount}")
-        else:
+        if not parsed.amount:
             messages.error(request, "Could not find a valid total amount in the receipt text.")
+        elif duplicate and on_duplicate == receipts.SKIP_DUPLICATES:
+            messages.error(request, f"This receipt was already imported: '{parsed.title}' for €{parsed.amount}")
+        else:
+            await Expense.objects.acreate(
+                title=parsed.title,
+                amount=parsed.amount,
+                expense_date=parsed.expense_date,
+                category=parsed.category,
+                fingerprint=parsed.fingerprint,
+                is_duplicate=duplicate,
+            )
+            if duplicate:
+                messages.success(request, f"Created expense '{parsed.title}' for €{parsed.amount}, flagged as a possible duplicate")
+            else:
+                messages.success(request, f"Successfully created expense: '{parsed.title}' for €{parsed.amount}")
 
     return redirect('expense-inbox')
 
+def import_receipts(request):
+    """
+    Batch version of parse_receipt for an uploaded .mbox, .zip of receipts, .eml or text file.
+    The import runs as a background job, the response is its progress fragment, which ends in a per-receipt report.
+    """
+    if request.method != 'POST':
+        return HttpResponse("Invalid request method.", status=405)
+
+    upload = request.FILES.get('archive')
+    if not upload:
+        return HttpResponse("No file uploaded.", status=400)
+
+    job = jobs.enqueue(
+        'import_receipts',
+        path=jobs.spool(upload),
+        name=upload.name,
+        on_duplicate=request.POST.get('on_duplicate'),
+    )
+    return job_started(request, job)
+
+
+@csrf_exempt
+def upload_receipts(request):
+    """
+    Receipt images and PDFs. Each file is streamed into the receipt store as it arrives (receipt_files.py)
+    and read and parsed by a background job, the response is the jobs' progress fragments.
+    """
+    # the handler has to be in place before anything reads the POST data, the CSRF check included
+    request.upload_handlers = [receipt_files.ReceiptUploadHandler(request)]
+    return store_receipt_uploads(request)
+
+
+@csrf_protect
+def store_receipt_uploads(request):
+    if request.method != 'POST':
+        return HttpResponse("Invalid request method.", status=405)
+
+    uploads = request.FILES.getlist('receipts')
+    skipped = request.upload_handlers[0].skipped
+    if not uploads and not skipped:
+        return HttpResponse("No file uploaded.", status=400)
+
+    queued = [
+        jobs.enqueue(
+            'import_receipt_file',
+            stored_name=upload.stored_name,
+            name=upload.name,
+            on_duplicate=request.POST.get('on_duplicate'),
+        )
+        for upload in uploads
+    ]
+    return render(request, 'core/partials/receipt_uploads.html', {
+        'queued': queued,
+        'skipped': skipped,
+        'max_size': receipt_files.max_size(),
+    }, status=202 if queued else 200)
+
 # expense CRUD views
 
 def expense_create(request):
@@ -258,7 +349,7 @@ def expense_store(request):
         form = ExpenseForm(request.POST)
         if form.is_valid():
             expense = form.save()
-            new_item_html = render(request, 'core/partials/expense_item.html', {'expense': expense}).content.decode()
+            new_item_html = fragments.render_row('expense', expense)
             clear_form_html = '<div id="expense-form-container" hx-swap-oob="true"></div>'
             return HttpResponse(new_item_html + clear_form_html)
         else:
@@ -276,7 +367,7 @@ def expense_update(request, pk):
         form = ExpenseForm(request.POST, instance=expense)
         if form.is_valid():
             form.save()
-            return render(request, 'core/partials/expense_item.html', {'expense': expense})
+            return HttpResponse(fragments.render_row('expense', expense))
         else:
             return render(request, 'core/partials/expense_edit_form.html', {'form': form, 'expense': expense})
     return HttpResponse("Invalid request method.", status=405)
@@ -290,34 +381,174 @@ def expense_delete(request, pk):
 
 def expense_detail(request, pk):
     expense = get_object_or_404(Expense, pk=pk)
-    return render(request, 'core/partials/expense_item.html', {'expense': expense})
 
+    etag, last_modified = conditional.row_validators('expense', [expense])
+    not_modified = conditional.not_modified(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+    return conditional.add_validators(HttpResponse(fragments.render_row('expense', expense)), etag, last_modified)
 
-def generate_invoice_pdf(request, pk):
-    invoice = get_object_or_404(Invoice, pk=pk)
 
-    html_string = render_to_string('core/invoice_pdf.html', {'invoice': invoice})
+def expense_receipt(request, pk):
+    expense = get_object_or_404(Expense, pk=pk)
+    if not expense.receipt or not expense.receipt.storage.exists(expense.receipt.name):
+        raise Http404("This expense has no receipt file.")
+
+    # stored under the hash of its content, so the name is a strong ETag
+    stored = Path(expense.receipt.name)
+    etag = f'"{stored.stem}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified:
+        return not_modified
+    response = FileResponse(expense.receipt.open('rb'), filename=f'receipt_{expense.pk}{stored.suffix}')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
+def export_expenses(request):
+    """
+    streams expenses as CSV (default) or ?format=ndjson,
+    filtered by ?start=&end= (YYYY-MM-DD, expense date) and ?category=.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in exports.FORMATS:
+        return HttpResponse("Invalid format.", status=400)
+    try:
+        start = parse_date(request.GET.get('start', ''))
+        end = parse_date(request.GET.get('end', ''))
+    except ValueError:
+        return HttpResponse("Invalid date.", status=400)
+    category = request.GET.get('category', '').strip() or None
+
+    rows = exports.expense_rows(start, end, category)
+    response = StreamingHttpResponse(
+        exports.for_request(request, exports.stream(export_format, exports.EXPENSE_COLUMNS, rows)),
+        content_type=exports.FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="expenses_{now():%Y%m%d}.{export_format}"'
+    return response
 
-    pdf_file = HTML(string=html_string).write_pdf()
 
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="invoice_{invoice.invoice_number}.pdf"'
+# csv import views
+
+def data_import(request):
+    """
+    Bulk CSV import of clients, invoices or expenses. GET shows the upload form, POST queues the import
+    as a background job and responds with its progress fragment, which ends in a report of the rejected rows.
+    """
+    if request.method != 'POST':
+        return render(request, 'core/data_import.html', {'kinds': imports.KINDS})
+
+    kind = request.POST.get('kind')
+    upload = request.FILES.get('csv_file')
+    if kind not in imports.KINDS or not upload:
+        return HttpResponse("Choose what to import and a CSV file.", status=400)
+
+    # the worker decodes and parses the file line by line, never reading it into memory whole
+    job = jobs.enqueue(
+        'import_csv', path=jobs.spool(upload), kind=kind,
+        on_duplicate=receipts.duplicate_policy(request.POST.get('on_duplicate')),
+    )
+    return job_started(request, job)
+
+
+async def generate_invoice_pdf(request, pk):
+    invoice = await aget_object_or_404(Invoice.objects.select_related('client'), pk=pk)
+
+    # the cached file name is a hash of everything on the PDF, so it works as a strong ETag
+    etag = f'"{pdf.version(invoice)}"'
+    last_modified = int(invoice.updated_at.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified:
+        return not_modified
+
+    try:
+        pdf_path = await pdf.aget_or_render(invoice)
+    except pdf.RenderQueueFull:
+        response = HttpResponse("Too many PDFs are being rendered, try again shortly.", status=503)
+        response['Retry-After'] = '5'
+        return response
+
+    # invoice PDFs are small, sent in one piece rather than as a file iterator the ASGI handler
+    # would have to read chunk by chunk through a thread
+    response = HttpResponse(await sync_to_async(pdf_path.read_bytes)(), content_type='application/pdf')
+    response['Content-Disposition'] = content_disposition_header(True, f'invoice_{invoice.invoice_number}.pdf')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
 
     return response
 
-def invoice_list_partial(request):
+def export_invoice_pdfs(request):
     """
-    filtering and sorting for the invoice list.
+    streams a ZIP of invoice PDFs, filtered by ?start=&end= (YYYY-MM-DD) and/or ?client=<id>.
+    A POST with the same fields builds the ZIP in a background job and responds with its progress fragment.
     """
-    invoices = Invoice.objects.all()
+    params = request.POST if request.method == 'POST' else request.GET
+    try:
+        start = parse_date(params.get('start', ''))
+        end = parse_date(params.get('end', ''))
+    except ValueError:
+        return HttpResponse("Invalid date.", status=400)
+    client_id = params.get('client') or None
+    if client_id and not client_id.isdigit():
+        return HttpResponse("Invalid client.", status=400)
+
+    if request.method == 'POST':
+        job = jobs.enqueue(
+            'export_invoice_pdfs',
+            start=start and start.isoformat(),
+            end=end and end.isoformat(),
+            client_id=client_id,
+        )
+        return job_started(request, job)
+
+    invoices = pdf.invoices_for_export(start, end, client_id)
+
+    response = StreamingHttpResponse(
+        exports.for_request(request, pdf.export_zip(invoices)),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="invoices_{now():%Y%m%d}.zip"'
+    return response
+
+def export_invoices(request):
+    """
+    streams invoices with their client as CSV (default) or ?format=ndjson,
+    filtered by ?start=&end= (YYYY-MM-DD, invoice date) and ?status=.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in exports.FORMATS:
+        return HttpResponse("Invalid format.", status=400)
+    try:
+        start = parse_date(request.GET.get('start', ''))
+        end = parse_date(request.GET.get('end', ''))
+    except ValueError:
+        return HttpResponse("Invalid date.", status=400)
+    status = request.GET.get('status') or None
+    if status and status not in dict(Invoice.STATUS_CHOICES):
+        return HttpResponse("Invalid status.", status=400)
+
+    rows = exports.invoice_rows(start, end, status)
+    response = StreamingHttpResponse(
+        exports.for_request(request, exports.stream(export_format, exports.INVOICE_COLUMNS, rows)),
+        content_type=exports.FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="invoices_{now():%Y%m%d}.{export_format}"'
+    return response
+
+def invoice_page_context(request):
+    """
+    filtering, sorting and keyset pagination shared by the dashboard and the list partial.
+    """
+    invoices = Invoice.objects.select_related('client')
 
     # filtering
     search_text = request.GET.get('search', '').strip()
+    ranked = False
     if search_text:
-        invoices = invoices.filter(
-            Q(title__icontains=search_text) |
-            Q(client__name__icontains=search_text)
-        )
+        invoices, ranked = search.filter_invoices(invoices, search_text)
 
     # sorting
     sort_by = request.GET.get('sort_by', 'created_at') # Default sort
@@ -325,12 +556,158 @@ def invoice_list_partial(request):
 
     # validating the sort by parameter
     allowed_sort_fields = ['created_at', 'due_date', 'amount', 'client__name']
-    if sort_by not in allowed_sort_fields:
+    if sort_by == 'relevance' and not ranked:
+        sort_by = 'created_at' # relevance needs an indexed search
+    if sort_by not in allowed_sort_fields and sort_by != 'relevance':
         sort_by = 'created_at' # Fallback to default
+    if sort_order != 'asc':
+        sort_order = 'desc' # default to descending
+
+    # pagination
+    cursor = request.GET.get('cursor')
+    if sort_by == 'relevance':
+        # best matches first, bm25 ranks are lower for better matches
+        invoices, next_cursor = keyset_page(invoices, 'rank', False, cursor)
+    else:
+        invoices, next_cursor = keyset_page(invoices, sort_by, sort_order == 'desc', cursor)
+
+    next_query = None
+    if next_cursor:
+        next_query = urlencode({
+            'search': search_text,
+            'sort_by': sort_by,
+            'sort_order': sort_order,
+            'cursor': next_cursor,
+        })
+
+    return {'invoices': invoices, 'cursor': cursor, 'next_query': next_query}
+
+
+def invoice_list_partial(request):
+    """
+    filtering and sorting for the invoice list.
+    Requests with a cursor come from the infinite scroll and only get the next page of rows.
+    """
+    context = invoice_page_context(request)
+
+    # validators from the page's rows and the query string, so each search/sort/cursor combination
+    # has its own; a 304 skips rendering, the page query itself is only an index range scan
+    etag, last_modified = conditional.row_validators(
+        'invoice', context['invoices'], request.GET.urlencode(), context['next_query'],
+    )
+    not_modified = conditional.not_modified(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+
+    context['invoices'] = fragments.render_rows('invoice', context['invoices'])
+    if context['cursor']:
+        response = render(request, 'core/partials/invoice_list_page.html', context)
+    else:
+        response = render(request, 'core/partials/invoice_list_items.html', context)
+    return conditional.add_validators(response, etag, last_modified)
+
+
+# report views
+def aging_report(request):
+    # outstanding invoices per client by days past due, see reports.py.
+    # thousands of client rows take longer to render than to query, so the table is cached as HTML as well
+    today = localdate()
+    table = reports.cached(
+        'aging-table', today, lambda: render_to_string('core/partials/aging_table.html', reports.aging(today)),
+    )
+    return render(request, 'core/aging_report.html', {'table': table, 'today': today})
+
+
+def client_statement(request, pk):
+    client = get_object_or_404(Client, pk=pk)
+    return render(request, 'core/client_statement.html', {'client': client, **reports.statement(client)})
+
+
+PNL_COLUMNS = 8  # categories with their own column on the page, the rest are summed as "Other"
+
+
+def pnl_params(request):
+    period = request.GET.get('period')
+    return (period if period in reports.PERIODS else 'month'), request.GET.get('category') or None
+
+
+def pnl_report(request):
+    # income, expenses per category and net per month, quarter or year, see reports.py
+    period, category = pnl_params(request)
+    report = reports.profit_and_loss(period, category)
+    columns = report['categories'][:PNL_COLUMNS]
+    for row in report['rows'] + [report['totals']]:
+        row['columns'] = [row['expenses'].get(name, 0) for name in columns]
+        row['other'] = row['expense_total'] - sum(row['columns'])
+    return render(request, 'core/pnl_report.html', {
+        **report,
+        'columns': columns,
+        'has_other': len(report['categories']) > PNL_COLUMNS,
+        'periods': reports.PERIODS,
+    })
+
+
+def pnl_json(request):
+    period, category = pnl_params(request)
+    return JsonResponse(reports.profit_and_loss(period, category))
+
+
+MAX_FORECAST_MONTHS = 120
+
+
+def cash_forecast(request):
+    # projected cash balance from outstanding invoices and recurring expenses, see forecast.py
+    months = request.GET.get('months', '')
+    months = min(int(months), MAX_FORECAST_MONTHS) if months.isdigit() and int(months) else forecast.FORECAST_MONTHS
+    result = forecast.forecast(months=months)
+    rows = forecast.monthly_rows(result)
+    return render(request, 'core/cash_forecast.html', {
+        'rows': rows,
+        'months': months,
+        'recurring': sorted(result['recurring'].items(), key=lambda item: -item[1]),
+        'recurring_total': sum(result['recurring'].values()),
+        'chart': {
+            'labels': [row['month'].strftime('%b %Y') for row in rows],
+            'balance': [row['balance'] for row in rows],
+            'available': [round(row['balance'] - row['tax_pool'], 2) for row in rows],
+        },
+    })
+
+
+# background job views
+
+JOB_WAIT_HINT = timedelta(seconds=10)  # a job queued this long probably has no worker
+
+
+def job_context(job):
+    context = {'job': job}
+    spec = jobs.TASKS.get(job.task)
+    if job.status == Job.DONE and spec and spec.template:
+        context['result_template'] = spec.template
+        context.update(spec.context(job.result) if spec.context else job.result or {})
+    elif job.status == Job.FAILED:
+        # the exception line of the last attempt's traceback
+        context['error'] = job.error.strip().splitlines()[-1] if job.error.strip() else ''
+    elif job.status == Job.QUEUED:
+        context['waiting'] = not job.attempts and now() - job.created_at > JOB_WAIT_HINT
+    return context
+
+
+def job_started(request, job):
+    return render(request, 'core/partials/job_status.html', job_context(job), status=202)
+
+
+def job_status(request, pk):
+    """
+    progress fragment of a background job; it polls this view again until the job is finished.
+    """
+    job = get_object_or_404(Job, pk=pk)
+    return render(request, 'core/partials/job_status.html', job_context(job))
 
-    if sort_order == 'asc':
-        invoices = invoices.order_by(sort_by)
-    else: # default to descending
-        invoices = invoices.order_by(f'-{sort_by}')
 
-    return render(request, 'core/partials/invoice_list_items.html', {'invoices': invoices})
\ No newline at end of file
+def job_download(request, pk):
+    job = get_object_or_404(Job, pk=pk)
+    path = jobs.result_file(job)
+    if path is None:
+        raise Http404("This job has no file.")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=job.result['filename'])
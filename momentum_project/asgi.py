@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+The live dashboard stream (core.views.dashboard_events) needs this app, e.g.
+    uvicorn momentum_project.asgi:application
+A single worker process holds every open dashboard as an idle task, and
+updates are published in-process, so run one worker for the live updates.
 """
 
 import os
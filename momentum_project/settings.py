@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.assets.StaticAssetsMiddleware',  # collected static files are answered before anything else runs
+    'core.perf.PerformanceMiddleware',  # before the rest, so its timings cover the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +68,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.frontend',
             ],
         },
     },
@@ -81,6 +84,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # a file instead of the shared in-memory database, so the concurrency tests
+        # get real SQLite locking between connections
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -120,8 +126,102 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+# `manage.py build_assets` compiles the Tailwind stylesheet and runs collectstatic, which writes hashed,
+# precompressed copies here; core.assets.StaticAssetsMiddleware serves them with far-future cache headers
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+TAILWIND_CLI = 'tailwindcss'  # the Tailwind v3 standalone binary, no Node needed
+
+# uploaded files, receipts are served by core.views.expense_receipt rather than from MEDIA_URL
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_URL = 'media/'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.assets.CompressedManifestStaticFilesStorage'},
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Invoice PDFs
+# rendered PDFs are cached on disk per invoice version and warmed in the background on save
+
+INVOICE_PDF_CACHE_DIR = BASE_DIR / 'pdf_cache'
+INVOICE_PDF_PROCESSES = None  # bulk export render processes, defaults to the CPU count
+# the PDF view renders in its own process pool, warming on save uses its idle processes;
+# past the backlog the view answers 503 with Retry-After
+INVOICE_PDF_RENDER_PROCESSES = 2
+INVOICE_PDF_RENDER_BACKLOG = 8
+
+
+# Receipt ingestion
+# parser processes for batch imports, defaults to the CPU count
+
+RECEIPT_INGEST_WORKERS = None
+RECEIPT_DUPLICATES = 'skip'  # 'skip' re-imported receipts, or 'flag' them and import anyway
+# uploaded receipt files are kept once per content under MEDIA_ROOT/receipts and read by a background job
+# (PDFs need pypdf, images pytesseract and tesseract)
+RECEIPT_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+
+
+# Invoice numbers
+# handed out from a counter table in blocks per worker process, so numbers are unique but may have gaps
+
+INVOICE_NUMBER_FORMAT = 'INV-{year}-{number:05d}'
+INVOICE_NUMBER_BLOCK_SIZE = 10
+
+
+# Background jobs
+# PDF exports, receipt and CSV imports are queued in the database and run by `manage.py run_jobs`
+
+JOB_FILES_DIR = BASE_DIR / 'job_files'  # uploads waiting for their job and result files like export ZIPs
+JOB_WORKER_PROCESSES = 1
+JOB_WORKER_THREADS = 2  # per process
+JOB_POLL_INTERVAL = 1  # seconds an idle worker waits before looking for jobs again
+JOB_LEASE = 300  # seconds a running job may go without progress before it's taken for lost and retried
+JOB_RETRY_DELAY = 10  # seconds before the first retry of a failed job, doubled for each further attempt
+JOB_KEEP_DAYS = 7  # finished jobs and their files are deleted after this
+
+
+# Request instrumentation
+# Server-Timing header, one JSON log line per request on 'core.perf' and per URL histograms (manage.py perf_histograms).
+# the log lines are DEBUG, set the 'core.perf' level below to DEBUG to see them
+
+PERF_INSTRUMENTATION = True
+PERF_SLOW_QUERIES = 3  # slowest queries kept per request for the log line
+PERF_FLUSH_INTERVAL = 30  # seconds between histogram writes, by a background thread of each server process
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.perf': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'core.jobs': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
+# Caches
+# 'fragments' holds rendered invoice/expense list rows, see core/fragments.py. Any Django cache backend works, e.g.
+#   a file cache shared by the workers of one machine:
+#     {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': BASE_DIR / 'fragment_cache'}
+#   a local Redis or a Redis-compatible server (Valkey, KeyDB, Dragonfly), needs the redis package:
+#     {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}